@@ -1,11 +1,11 @@
 import os
-import time
-import requests
-import tweepy
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 import streamlit as st
 
+from src import metrics
+from src.hf_client import HFInferenceClient, BackgroundLoop
+
 # ---------------- Config & Secrets ---------------- #
 st.set_page_config(page_title="📊 Social Media Sentiment Analyzer", page_icon="📈", layout="centered")
 st.title("📊 Social Media Sentiment Analyzer")
@@ -23,67 +23,34 @@ if not HF_API_TOKEN:
     st.error("❌ Missing HF_API_TOKEN. Add it in Streamlit Secrets or as an env var.")
     st.stop()
 
-HF_API_URL = "https://api-inference.huggingface.co/models/finiteautomata/bertweet-base-sentiment-analysis"
+HF_MODEL_ID = "finiteautomata/bertweet-base-sentiment-analysis"
+HF_API_URL = f"https://api-inference.huggingface.co/models/{HF_MODEL_ID}"
 
 # ---------------- Hugging Face helper ---------------- #
-def analyze_sentiment(text, retries=3, timeout=30):
-    headers = {"Authorization": f"Bearer {HF_API_TOKEN}"}
-    payload = {
-        "inputs": text,
-        "options": {"wait_for_model": True, "use_cache": True}
-    }
-
-    for attempt in range(1, retries + 1):
-        try:
-            resp = requests.post(HF_API_URL, headers=headers, json=payload, timeout=timeout)
-
-            if resp.status_code in (503, 429):
-                time.sleep(2 * attempt)
-                continue
-            if resp.status_code != 200:
-                return "Error", 0.0, f"{resp.status_code}: {resp.text}"
-
-            data = resp.json()
-
-            # Handle error responses
-            if isinstance(data, dict) and "error" in data:
-                time.sleep(2 * attempt)
-                continue
-
-            if isinstance(data, list) and len(data) > 0:
-                candidates = data[0] if isinstance(data[0], list) else data
-                best = max(candidates, key=lambda x: x.get("score", 0.0))
-
-                raw_label = best.get("label", "")
-                score = float(best.get("score", 0.0))
-
-                # Normalize labels
-                map_3 = {"POS": "Positive", "NEG": "Negative", "NEU": "Neutral"}
-                if raw_label in map_3:
-                    label = map_3[raw_label]
-                elif raw_label.upper().startswith("LABEL_"):
-                    idx = int(raw_label.split("_")[-1])
-                    label = ["Negative", "Neutral", "Positive"][idx] if idx in (0, 1, 2) else "Neutral"
-                else:
-                    u = raw_label.upper()
-                    if "POS" in u: label = "Positive"
-                    elif "NEG" in u: label = "Negative"
-                    elif "NEU" in u: label = "Neutral"
-                    else: label = raw_label
-
-                return label, score, None
-
-            return "Error", 0.0, "Unexpected response format."
-        except requests.RequestException as e:
-            if attempt == retries:
-                return "Error", 0.0, f"Request failed: {e}"
-            time.sleep(2 * attempt)
-
-    return "Error", 0.0, "Failed after retries."
+@st.cache_resource(show_spinner=False)
+def get_hf_client():
+    # One pooled client + event loop per process, reused across reruns
+    client = HFInferenceClient(HF_API_URL, HF_API_TOKEN, HF_MODEL_ID)
+    return client, BackgroundLoop()
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server():
+    # HF API request/retry/429 counters on METRICS_PORT (if set), once per process
+    return metrics.start_http_server()
+
+start_metrics_server()
+
+def analyze_many(texts):
+    client, loop = get_hf_client()
+    return loop.run(client.analyze_many(list(texts)))
+
+def analyze_sentiment(text):
+    return analyze_many([text])[0]
 
 # ---------------- Twitter fetch function ---------------- #
 def fetch_tweets(query, count=10):
     try:
+        import tweepy
         client = tweepy.Client(bearer_token=TWITTER_BEARER_TOKEN)
         response = client.search_recent_tweets(
             query=query,
@@ -203,8 +170,9 @@ else:
                 # Batch sentiment
                 sentiments = {"Positive": 0, "Negative": 0, "Neutral": 0}
                 errors = 0
-                for t in tweets:
-                    label, _, err = analyze_sentiment(t)
+                with st.spinner("Analyzing tweets... ⏳"):
+                    results = analyze_many(tweets)
+                for label, _, err in results:
                     if err:
                         errors += 1
                         continue
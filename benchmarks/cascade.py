@@ -0,0 +1,72 @@
+# benchmarks/cascade.py
+"""Cascade evaluation: throughput gain vs agreement with the full model.
+
+Scores a text sample once with the transformer alone (the reference
+labels) and then with the lexicon-first cascade at each ``--thresholds``
+value. For each threshold it reports the share of texts the lexicon
+decided, label agreement with the reference (overall and on the
+lexicon-decided texts) and texts per second against the model alone.
+The cache is bypassed so every run does the full work. Texts come from
+``--csv`` (a ``text`` column, e.g. data/tweets.csv) or the tweet-like
+sample used by benchmarks.onnx_backend.
+
+    python -m benchmarks.cascade [--csv data/tweets.csv] [--texts 2000] [--thresholds 0.7 0.8 0.9]
+"""
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from benchmarks.onnx_backend import sample_texts
+from src.cascade import LEXICON, score_cascade
+from src.sentiment import score_texts
+
+def evaluate(texts, thresholds, max_words=None) -> dict:
+    score_texts(texts[:8], use_cache=False, cascade=False)  # load + warm up
+    t0 = time.perf_counter()
+    reference, _ = score_texts(texts, use_cache=False, cascade=False)
+    model_seconds = time.perf_counter() - t0
+
+    rows = []
+    for threshold in thresholds:
+        t0 = time.perf_counter()
+        labels, _, stages = score_cascade(texts, threshold, max_words, use_cache=False)
+        seconds = time.perf_counter() - t0
+        lex = [i for i, s in enumerate(stages) if s == LEXICON]
+        rows.append({
+            "threshold": threshold,
+            "lexicon_share": len(lex) / len(texts),
+            "agreement": sum(a == b for a, b in zip(labels, reference)) / len(texts),
+            "lexicon_agreement": sum(labels[i] == reference[i] for i in lex) / len(lex) if lex else None,
+            "texts_per_s": len(texts) / seconds,
+            "speedup": model_seconds / seconds,
+        })
+    return {"texts": len(texts), "model_texts_per_s": len(texts) / model_seconds, "cascade": rows}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--csv", help="score the text column of this CSV instead of the built-in sample")
+    ap.add_argument("--texts", type=int, default=2000)
+    ap.add_argument("--thresholds", type=float, nargs="+", default=[0.7, 0.8, 0.9])
+    ap.add_argument("--max-words", type=int, default=None)
+    ap.add_argument("--json", help="write results here")
+    args = ap.parse_args()
+    if args.csv:
+        texts = pd.read_csv(args.csv, usecols=["text"], nrows=args.texts)["text"].astype(str).tolist()
+    else:
+        texts = sample_texts(args.texts)
+
+    r = evaluate(texts, args.thresholds, args.max_words)
+    print(f"{r['texts']} texts, model alone {r['model_texts_per_s']:.0f} texts/s")
+    print(f"{'threshold':>9} {'lexicon':>8} {'agree':>7} {'agree(lex)':>10} {'texts/s':>9} {'speedup':>8}")
+    for row in r["cascade"]:
+        lex_agree = "-" if row["lexicon_agreement"] is None else f"{row['lexicon_agreement']:.1%}"
+        print(f"{row['threshold']:>9.2f} {row['lexicon_share']:>8.1%} {row['agreement']:>7.1%} "
+              f"{lex_agree:>10} {row['texts_per_s']:>9.0f} {row['speedup']:>7.1f}x")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(r, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/dedup.py
+"""Near-duplicate collapsing: reduction ratio, cluster quality, throughput.
+
+Builds a stream from ``--bases`` synthetic tweets, each appearing 1-4
+times as itself, a retweet ("RT @user: ..."), with a trailing URL, with
+an extra word, or upper-cased, shuffled. Runs it through
+NearDuplicateIndex and reports the reduction ratio against the ideal
+(one model call per base tweet), how many bases were split over several
+clusters, how many clusters merged different bases, and texts/s.
+
+    python -m benchmarks.dedup [--bases 3000] [--threshold 0.8]
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from benchmarks.synthetic import generate_tweets
+from src.dedup import NearDuplicateIndex
+
+def variants(bases, seed=0):
+    rng = random.Random(seed)
+    stream = []
+    for i, t in enumerate(bases):
+        for _ in range(rng.randint(1, 4)):
+            kind = rng.choice(["rt", "url", "word", "case", "same"])
+            text = {"rt": f"RT @user{rng.randint(0, 99)}: {t}",
+                    "url": f"{t} https://t.co/{rng.randint(0, 10 ** 6):x}",
+                    "word": f"{t} {rng.choice(['!!', 'lol', 'wow', 'yes'])}",
+                    "case": t.upper(), "same": t}[kind]
+            stream.append((text, i))
+    rng.shuffle(stream)
+    return stream
+
+def run(n_bases, threshold=None, seed=0) -> dict:
+    bases = generate_tweets(n_bases, seed=seed)["text"].tolist()
+    stream = variants(bases, seed)
+    texts = [t for t, _ in stream]
+    index = NearDuplicateIndex(threshold=threshold, window_seconds=0)
+    t0 = time.perf_counter()
+    *_, ids = index.score(texts, score=lambda reps: (reps,))
+    seconds = time.perf_counter() - t0
+
+    clusters_of, bases_of = defaultdict(set), defaultdict(set)
+    for cid, (_, base) in zip(ids, stream):
+        clusters_of[base].add(cid)
+        bases_of[cid].add(base)
+    return {
+        "texts": len(texts), "bases": n_bases, "clusters": len(bases_of),
+        "reduction": index.reduction_ratio, "ideal_reduction": 1 - n_bases / len(texts),
+        "split_bases": sum(len(c) > 1 for c in clusters_of.values()),
+        "merged_clusters": sum(len(b) > 1 for b in bases_of.values()),
+        "texts_per_s": len(texts) / seconds,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--bases", type=int, default=3000)
+    ap.add_argument("--threshold", type=float, default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    r = run(args.bases, args.threshold, args.seed)
+    print(f"{r['texts']:,} texts from {r['bases']:,} tweets -> {r['clusters']:,} clusters")
+    print(f"reduction {r['reduction']:.1%} (ideal {r['ideal_reduction']:.1%}), "
+          f"{r['split_bases']} tweets split, {r['merged_clusters']} clusters merged distinct tweets")
+    print(f"{r['texts_per_s']:,.0f} texts/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/filters.py
+"""Hashtag / text-search filter latency: regex scan vs. the inverted index.
+
+Builds a synthetic sentiment frame, then times ``apply_filters`` with and
+without a ``TweetIndex`` for a few queries of different selectivity and
+checks both return the same rows. Run from the repository root:
+
+    python -m benchmarks.filters [--rows 200000 400000] [--repeat 5] [--json out.json]
+"""
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_tweets
+from src.dashboard import apply_filters
+from src.index import TweetIndex
+from src.utils import enrich_sentiment_frame, token_tables
+
+QUERIES = [
+    ("rare hashtag", "#topic450", ""),
+    ("common hashtag", "#launch", ""),
+    ("rare search", "", "@user1900"),
+    ("common search", "", "battery"),
+    ("both", "#launch", "refund"),
+]
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    return enrich_sentiment_frame(generate_tweets(rows, seed))
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, nargs="+", default=[50000, 200000])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="write results here as well")
+    args = ap.parse_args()
+
+    results = []
+    for rows in args.rows:
+        df = synthetic_frame(rows)
+        index = TweetIndex(trigrams=True)
+        t0 = time.perf_counter()
+        index.sync(df, tokens=token_tables(df["text"]))
+        build = time.perf_counter() - t0
+        print(f"{rows} rows, index build {build:.2f}s")
+        for name, tag, search in QUERIES:
+            args_ = (tag, search, 0.2, "2024-01-02", "2024-01-05")
+            scan_s, expected = best_of(lambda: apply_filters(df, *args_), args.repeat)
+            index_s, got = best_of(lambda: apply_filters(df, *args_, index=index), args.repeat)
+            same = expected.index.equals(got.index)
+            print(f"  {name:15s} matches {len(got):7d}  regex {scan_s * 1000:8.1f}ms  "
+                  f"index {index_s * 1000:8.1f}ms  x{scan_s / max(index_s, 1e-9):6.1f}"
+                  + ("" if same else "  MISMATCH"))
+            results.append({"rows": rows, "query": name, "matches": len(got), "regex_s": scan_s,
+                            "index_s": index_s, "build_s": build, "same": same})
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
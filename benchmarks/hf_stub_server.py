@@ -0,0 +1,103 @@
+# benchmarks/hf_stub_server.py
+"""Local stand-in for the HF Inference API text-classification endpoint.
+
+Simulates a cold model (503 + estimated_time for the first few seconds)
+and throttling (429 on a fraction of requests) so src.hf_client can be
+exercised without a token:
+
+    python -m benchmarks.hf_stub_server --port 8765
+    python -m benchmarks.hf_stub_server --selftest   # server + client run
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import web
+
+def make_app(cold_seconds=2.0, throttle_rate=0.2, latency=0.05, seed=0):
+    rng = random.Random(seed)
+    started = time.monotonic()
+    counters = {"requests": 0, "inputs": 0, "cold": 0, "throttled": 0}
+
+    async def classify(request):
+        counters["requests"] += 1
+        body = await request.json()
+        inputs = body.get("inputs")
+        single = isinstance(inputs, str)
+        inputs = [inputs] if single else list(inputs or [])
+
+        elapsed = time.monotonic() - started
+        if elapsed < cold_seconds:
+            counters["cold"] += 1
+            return web.json_response(
+                {"error": "Model is currently loading", "estimated_time": cold_seconds - elapsed},
+                status=503,
+            )
+        if rng.random() < throttle_rate:
+            counters["throttled"] += 1
+            return web.json_response({"error": "Rate limit reached"}, status=429,
+                                     headers={"Retry-After": "0.2"})
+
+        await asyncio.sleep(latency)
+        counters["inputs"] += len(inputs)
+        out = []
+        for text in inputs:
+            # Deterministic fake scores derived from the text
+            pos = (sum(map(ord, text)) % 100) / 100
+            out.append([
+                {"label": "POS", "score": pos * 0.9},
+                {"label": "NEG", "score": (1 - pos) * 0.9},
+                {"label": "NEU", "score": 0.1},
+            ])
+        return web.json_response(out[0] if single else out)
+
+    app = web.Application()
+    app.router.add_post("/models/{model:.*}", classify)
+    app["counters"] = counters
+    return app
+
+async def selftest(args):
+    from src.hf_client import HFInferenceClient
+    from src.cache import SentimentCache
+    import src.cache
+
+    # Memory-only cache so repeated selftests actually hit the stub
+    src.cache._cache = SentimentCache(path="")
+    app = make_app(args.cold_seconds, args.throttle_rate, args.latency)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+
+    client = HFInferenceClient(f"http://127.0.0.1:{args.port}/models/stub", "stub-token", "stub",
+                               rate=args.rate, burst=args.rate, backoff=0.2)
+    texts = [f"tweet number {i} #launch" for i in range(args.n)]
+    t0 = time.perf_counter()
+    results = await client.analyze_many(texts)
+    took = time.perf_counter() - t0
+    await client.close()
+    await runner.cleanup()
+
+    errors = sum(1 for r in results if r[2] is not None)
+    print(f"{len(texts)} texts in {took:.2f}s, errors={errors}")
+    print("client:", client.stats)
+    print("server:", app["counters"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cold-seconds", type=float, default=2.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--selftest", action="store_true")
+    parser.add_argument("--n", type=int, default=200, help="texts to send in --selftest")
+    parser.add_argument("--rate", type=float, default=20.0, help="client requests/second in --selftest")
+    args = parser.parse_args()
+    if args.selftest:
+        asyncio.run(selftest(args))
+    else:
+        web.run_app(make_app(args.cold_seconds, args.throttle_rate, args.latency), host="127.0.0.1", port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/inference.py
+"""Inference server micro-batching under concurrent single-text clients.
+
+The model is a stub whose forward pass costs ``--fixed-ms`` per batch plus
+``--per-text-ms`` per text, which is roughly how a CPU transformer behaves.
+For each setting a server is started on a free local port, and ``--clients``
+threads each send ``--requests`` one-text requests through InferenceClient.
+max_batch=1 is the no-coalescing baseline (one forward pass per request).
+
+    python -m benchmarks.inference [--clients 32] [--requests 50] [--wait-ms 0 2 10]
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.suite import _stub_score_batched
+from src.inference_server import InferenceClient, MicroBatcher, serve
+
+def stub_model(fixed_ms, per_text_ms):
+    def score(texts):
+        time.sleep((fixed_ms + per_text_ms * len(texts)) / 1000)
+        return _stub_score_batched(texts)
+    return score
+
+def run(max_batch, wait_ms, clients, requests, fixed_ms, per_text_ms) -> dict:
+    batcher = MicroBatcher(stub_model(fixed_ms, per_text_ms), max_batch, wait_ms / 1000, max_queue=4096)
+    server = serve(batcher, "127.0.0.1", 0)
+    client = InferenceClient("http://{}:{}".format(*server.server_address[:2]))
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(k):
+        mine = []
+        for i in range(requests):
+            started = time.perf_counter()
+            client.score_texts([f"client {k} tweet {i}"])
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    report = client.stats()
+    server.shutdown()
+    server.server_close()
+    latencies.sort()
+    return {
+        "max_batch": max_batch, "wait_ms": wait_ms,
+        "req_per_s": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+        "batches": report["batches"], "fill": report["batch_fill_mean"],
+        "queue_p99_ms": report["queue_wait_p99_ms"],
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=50)
+    ap.add_argument("--max-batch", type=int, default=64)
+    ap.add_argument("--wait-ms", type=float, nargs="+", default=[0, 2, 10])
+    ap.add_argument("--fixed-ms", type=float, default=8.0)
+    ap.add_argument("--per-text-ms", type=float, default=0.3)
+    args = ap.parse_args()
+    settings = [(1, 0)] + [(args.max_batch, w) for w in args.wait_ms]
+    print(f"{'max_batch':>9} {'wait_ms':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'batches':>8} {'fill':>6} {'queue p99':>10}")
+    for max_batch, wait in settings:
+        r = run(max_batch, wait, args.clients, args.requests, args.fixed_ms, args.per_text_ms)
+        print(f"{r['max_batch']:>9} {r['wait_ms']:>7g} {r['req_per_s']:>8.0f} {r['p50_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['batches']:>8} {r['fill']:>6.2f} {r['queue_p99_ms']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
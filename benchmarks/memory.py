@@ -0,0 +1,76 @@
+# benchmarks/memory.py
+"""Memory footprint of the dashboard's CSV frame: current vs compact layout.
+
+"current" is the layout before the compact frame: string sentiment labels,
+float64 confidence, the text column in memory and hashtag/mention tables
+with one Python string per occurrence. "compact" is what the dashboard
+keeps with DASHBOARD_LAZY_TEXT=1: categorical sentiment, float32
+confidence, interned token codes, and one int64 byte offset per row
+instead of the text. Sizes are pandas' deep memory_usage, so string
+objects are counted.
+
+    python -m benchmarks.memory [--rows 100000 1000000] [--json out.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.synthetic import write_csv
+from src.utils import TailingCSVLoader
+
+def _current(loader):
+    frame = loader.frame.assign(sentiment=loader.frame["sentiment"].astype(str),
+                                confidence=loader.frame["confidence"].astype("float64"))
+    tokens = {name: t.assign(row=t["row"].astype(np.int64), token=t["token"].to_numpy(dtype=object))
+              for name, t in loader.tokens.items()}
+    return frame, tokens, None
+
+def _compact(loader):
+    return loader.frame, loader.tokens, loader.row_offsets
+
+def footprint(frame, tokens, offsets) -> dict:
+    """Bytes per component: each frame column, each token table, text offsets."""
+    usage = frame.memory_usage(deep=True, index=False)
+    out = {f"frame.{col}": int(n) for col, n in usage.items()}
+    for name, t in tokens.items():
+        out[f"tokens.{name}"] = int(t.memory_usage(deep=True, index=False).sum())
+    out["text_offsets"] = int(offsets.nbytes) if offsets is not None else 0
+    out["total"] = sum(out.values())
+    return out
+
+def report(rows: int, seed: int = 0) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_csv(os.path.join(tmp, "scored.csv"), rows, seed)
+        eager = TailingCSVLoader(path)
+        eager.load()
+        lazy = TailingCSVLoader(path, lazy_text=True)
+        lazy.load()
+        return {"rows": rows, "csv_bytes": os.path.getsize(path),
+                "current": footprint(*_current(eager)), "compact": footprint(*_compact(lazy))}
+
+def _print(r):
+    print(f"{r['rows']:,} rows ({r['csv_bytes'] / 2**20:.1f} MiB CSV)")
+    cur, com = r["current"], r["compact"]
+    for key in sorted(set(cur) | set(com), key=lambda k: (k == "total", k)):
+        a, b = cur.get(key, 0), com.get(key, 0)
+        ratio = f"x{a / b:6.1f}" if b else ""
+        print(f"  {key:<22} {a / 2**20:10.2f} MiB -> {b / 2**20:10.2f} MiB  {ratio}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, nargs="+", default=[100000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="write results here")
+    args = ap.parse_args()
+    results = [report(n, args.seed) for n in args.rows]
+    for r in results:
+        _print(r)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
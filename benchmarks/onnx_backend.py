@@ -0,0 +1,70 @@
+# benchmarks/onnx_backend.py
+"""Parity and throughput of the ONNX Runtime backend against torch.
+
+Scores a fixed sample of tweet-like texts with torch, ONNX fp32 and ONNX
+int8, reports label agreement and score deltas against torch, then texts
+per second for each. Exports the model first if needed. Run from the
+repository root:
+
+    python -m benchmarks.onnx_backend [--texts 2000] [--threads 4] [--json out.json]
+"""
+import argparse
+import itertools
+import json
+import time
+
+import numpy as np
+
+from src import config
+from src.sentiment import _score_batched
+
+SUBJECTS = ["the new update", "customer support", "this launch", "the battery", "delivery",
+            "the app", "their pricing", "the camera", "today's keynote", "the refund process"]
+VERDICTS = ["is amazing", "is terrible", "is fine I guess", "could be better", "made my day",
+            "is a total mess", "works as expected", "keeps crashing", "is not bad at all",
+            "is honestly the worst"]
+TAILS = ["", " #launch", " @support", " lol", "!!!", " 🙄", " - would not recommend", " 10/10"]
+
+def sample_texts(n: int):
+    combos = itertools.cycle(itertools.product(SUBJECTS, VERDICTS, TAILS))
+    return [f"{s} {v}{t}" for s, v, t in itertools.islice(combos, n)]
+
+def run(texts, backend, quantize=None, batch_size=None):
+    _score_batched(texts[:8], batch_size, backend=backend, quantize=quantize)  # load + warm up
+    t0 = time.perf_counter()
+    labels, scores = _score_batched(texts, batch_size, backend=backend, quantize=quantize)
+    return labels, np.asarray(scores), time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--texts", type=int, default=2000)
+    ap.add_argument("--parity-texts", type=int, default=500)
+    ap.add_argument("--batch-size", type=int, default=None)
+    ap.add_argument("--threads", type=int, default=None, help="SENTIMENT_ONNX_THREADS override")
+    ap.add_argument("--json", help="write results here as well")
+    args = ap.parse_args()
+    if args.threads is not None:
+        config.SENTIMENT_ONNX_THREADS = args.threads
+        import torch
+        torch.set_num_threads(args.threads)
+
+    texts = sample_texts(args.texts)
+    ref_labels, ref_scores, ref_s = run(texts, "torch", batch_size=args.batch_size)
+    results = {"texts": len(texts), "torch": {"seconds": ref_s, "texts_per_s": len(texts) / ref_s}}
+    print(f"torch      {len(texts) / ref_s:8.1f} texts/s")
+    n = min(args.parity_texts, len(texts))
+    for name, quantize in (("onnx_fp32", False), ("onnx_int8", True)):
+        labels, scores, secs = run(texts, "onnx", quantize, args.batch_size)
+        agree = float(np.mean([a == b for a, b in zip(labels[:n], ref_labels[:n])]))
+        delta = np.abs(scores[:n] - ref_scores[:n])
+        results[name] = {"seconds": secs, "texts_per_s": len(texts) / secs,
+                         "speedup": ref_s / secs, "label_agreement": agree,
+                         "score_delta_mean": float(delta.mean()), "score_delta_max": float(delta.max())}
+        print(f"{name:10s} {len(texts) / secs:8.1f} texts/s  x{ref_s / secs:4.2f}  "
+              f"labels agree {agree:.2%}  |score delta| mean {delta.mean():.4f} max {delta.max():.4f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
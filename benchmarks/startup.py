@@ -0,0 +1,84 @@
+# benchmarks/startup.py
+"""Cold-import and first-prediction latency for each entry point.
+
+Every measurement runs in a fresh interpreter so nothing is already in
+sys.modules. Run from the repository root:
+
+    python -m benchmarks.startup [--runs 3] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> module imported as the entry point
+ENTRY_POINTS = {
+    "dashboard": "src.dashboard",
+    "collect_data": "src.collect_data",
+    "sentiment": "src.sentiment",
+    "main (streamlit)": "main",
+    "app (streamlit)": "app",
+}
+
+# Entry points that can score text in-process
+PREDICT = {
+    "sentiment": "mod.score_texts(['what a great launch'], use_cache=False)",
+    "main (streamlit)": "mod.score_texts(['what a great launch'], use_cache=False)",
+}
+
+_CHILD = r"""
+import importlib, json, time
+t0 = time.perf_counter()
+out = {}
+try:
+    mod = importlib.import_module(%(module)r)
+    out["import_s"] = time.perf_counter() - t0
+    predict = %(predict)r
+    if predict:
+        t1 = time.perf_counter()
+        exec(predict)
+        out["first_prediction_s"] = time.perf_counter() - t1
+except BaseException as e:  # st.stop() and friends raise non-Exception errors
+    out.setdefault("import_s", time.perf_counter() - t0)
+    out["error"] = f"{type(e).__name__}: {e}"
+print("__RESULT__" + json.dumps(out))
+"""
+
+def measure(name: str, module: str) -> dict:
+    code = _CHILD % {"module": module, "predict": PREDICT.get(name, "")}
+    env = dict(os.environ, SENTIMENT_WARMUP="0", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith("__RESULT__"):
+            return json.loads(line[len("__RESULT__"):])
+    return {"error": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, module in ENTRY_POINTS.items():
+        runs = [measure(name, module) for _ in range(args.runs)]
+        ok = [r for r in runs if "error" not in r] or runs
+        best = min(ok, key=lambda r: r.get("import_s", float("inf")))
+        results[name] = best
+        line = f"{name:<18} import {best.get('import_s', float('nan')):7.3f}s"
+        if "first_prediction_s" in best:
+            line += f"   first prediction {best['first_prediction_s']:7.3f}s"
+        if "error" in best:
+            line += f"   ({best['error']})"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# benchmarks/suite.py
+"""Micro and end-to-end benchmarks over synthetic tweets, as JSON.
+
+For each size, a deterministic synthetic CSV (benchmarks.synthetic) is
+written to a temp dir and every benchmark is timed ``--repeat`` times
+(setup excluded). Scoring paths run against a stub model so they measure
+our own overhead (cache, parsing, writing), not torch. Benchmarks whose
+dependencies are missing are recorded with an error instead of a time.
+
+    python -m benchmarks.suite [--sizes 10000 100000 1000000] [--json out.json]
+    python -m benchmarks.suite --compare before.json after.json
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import write_csv
+from src import config
+
+BENCHMARKS = []  # (name, setup(env) -> zero-argument callable)
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+def _dashboard(env):
+    """src.dashboard pointed at this run's CSV, with fresh incremental state."""
+    from src import dashboard
+    from src.index import TweetIndex
+    from src.rollup import MinuteRollup
+    from src.terms import TermFrequencyIndex
+    from src.utils import TailingCSVLoader
+    config.DASHBOARD_SOURCE = "csv"
+    dashboard._loader = TailingCSVLoader(env["csv"], lazy_text=config.DASHBOARD_LAZY_TEXT)
+    dashboard._rollup, dashboard._terms, dashboard._index = MinuteRollup(), TermFrequencyIndex(), TweetIndex()
+    dashboard._memo.clear()
+    dashboard._table_orders.clear()
+    dashboard._refresher.snapshot = None  # no background refresher: each call loads
+    _clear_render_cache()
+    return dashboard
+
+def _clear_render_cache():
+    import src.terms
+    src.terms._render_cache.clear()  # measure counting + rendering, not the cache
+
+FILTERS = dict(conf=0.5, start_date="2024-01-02", end_date="2024-01-05")
+
+# ---------- Loading ----------
+@benchmark("load_sentiment_csv")
+def _(env):
+    from src.utils import load_sentiment_csv
+    return lambda: load_sentiment_csv(env["csv"])
+
+@benchmark("tailing_loader_cold")
+def _(env):
+    from src.utils import TailingCSVLoader
+    return lambda: TailingCSVLoader(env["csv"]).load()
+
+# ---------- Dashboard helpers ----------
+@benchmark("apply_filters_none")
+def _(env):
+    apply_filters = _dashboard(env).apply_filters
+    return lambda: apply_filters(env["frame"], "", "", **FILTERS)
+
+@benchmark("apply_filters_hashtag")
+def _(env):
+    apply_filters = _dashboard(env).apply_filters
+    return lambda: apply_filters(env["frame"], "#launch", "", **FILTERS)
+
+@benchmark("apply_filters_search")
+def _(env):
+    apply_filters = _dashboard(env).apply_filters
+    return lambda: apply_filters(env["frame"], "", "battery", **FILTERS)
+
+@benchmark("apply_filters_hashtag_indexed")
+def _(env):
+    from src.index import TweetIndex
+    apply_filters = _dashboard(env).apply_filters
+    index = TweetIndex(trigrams=True)
+    index.sync(env["frame"], tokens=env["tokens"])
+    return lambda: apply_filters(env["frame"], "#launch", "", **FILTERS, index=index)
+
+@benchmark("aggregate_time")
+def _(env):
+    aggregate_time = _dashboard(env).aggregate_time
+    return lambda: aggregate_time(env["frame"], freq="min")
+
+@benchmark("top_tokens")
+def _(env):
+    top_tokens = _dashboard(env).top_tokens
+    return lambda: top_tokens(env["tokens"]["hashtags"])
+
+@benchmark("wordcloud_image")
+def _(env):
+    dashboard = _dashboard(env)
+    def run():
+        _clear_render_cache()
+        return dashboard.wordcloud_image(env["frame"]["text"])
+    return run
+
+# ---------- End to end ----------
+def _refresh(dashboard, hashtag="", search="", rendered=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return dashboard.update_dashboard(0, None, hashtag, search, FILTERS["conf"], FILTERS["start_date"],
+                                          FILTERS["end_date"], "min", rendered)
+
+@benchmark("update_dashboard_cold")
+def _(env):
+    def run():
+        return _refresh(_dashboard(env))  # first refresh: load, sync, build every panel
+    return run
+
+@benchmark("update_dashboard_filtered")
+def _(env):
+    dashboard = _dashboard(env)
+    _refresh(dashboard)
+    def run():
+        dashboard._memo.clear()
+        _clear_render_cache()
+        return _refresh(dashboard, hashtag="#launch", search="refund")
+    return run
+
+@benchmark("update_dashboard_unchanged")
+def _(env):
+    dashboard = _dashboard(env)
+    keys = _refresh(dashboard)[-1]
+    return lambda: _refresh(dashboard, rendered=keys)
+
+def _table(dashboard, page, rendered=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return dashboard.update_table(0, None, "", "", FILTERS["conf"], FILTERS["start_date"], FILTERS["end_date"],
+                                      page, 10, [], "", rendered)
+
+@benchmark("update_table_first_page")
+def _(env):
+    dashboard = _dashboard(env)
+    def run():
+        dashboard._memo.clear()
+        dashboard._table_orders.clear()
+        return _table(dashboard, 0)
+    return run
+
+@benchmark("update_table_deep_page")
+def _(env):
+    dashboard = _dashboard(env)
+    _table(dashboard, 0)  # view ordered once, then each page is a slice
+    pages = iter(range(1000, 10 ** 9))
+    return lambda: _table(dashboard, next(pages))
+
+# ---------- Scoring (stub model) ----------
+def _stub_score_batched(texts, batch_size=None, max_length=None, backend=None, quantize=None):
+    labels, scores = [], []
+    for t in texts:
+        h = hashlib.md5(t.encode("utf-8")).digest()
+        labels.append("POSITIVE" if h[0] & 1 else "NEGATIVE")
+        scores.append(0.5 + h[1] / 512)
+    return labels, scores
+
+def _stub_model():
+    import src.cache
+    import src.sentiment
+    src.sentiment._score_batched = _stub_score_batched
+    src.cache._cache = None  # fresh memory-only cache (SENTIMENT_CACHE_PATH="")
+
+@benchmark("score_texts_cold_cache")
+def _(env):
+    from src.sentiment import score_texts
+    texts = env["texts"]
+    def run():
+        _stub_model()
+        return score_texts(texts)
+    return run
+
+@benchmark("score_texts_warm_cache")
+def _(env):
+    from src.sentiment import score_texts
+    _stub_model()
+    score_texts(env["texts"])
+    return lambda: score_texts(env["texts"])
+
+@benchmark("analyze_sentiment_csv")
+def _(env):
+    from src.sentiment import analyze_sentiment
+    def run():
+        _stub_model()
+        return analyze_sentiment(env["raw"])
+    return run
+
+@benchmark("streaming_scorer_drain")
+def _(env):
+    from src.scorer import StreamingScorer
+    def run():
+        _stub_model()
+        out = tempfile.mkdtemp(dir=env["dir"])
+        scorer = StreamingScorer(env["raw"], os.path.join(out, "scored.csv"), os.path.join(out, "ckpt.json"),
+                                 max_batch_bytes=4 * 1024 * 1024)
+        with contextlib.redirect_stdout(io.StringIO()):
+            while scorer.run_once():
+                pass
+        return scorer.rows_scored
+    return run
+
+# ---------- Harness ----------
+def _meta():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": sys.version.split()[0], "pandas": pd.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(), "time": time.time()}
+
+def run_size(rows, repeat, seed, only):
+    from src.utils import TailingCSVLoader
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"rows": rows, "dir": tmp,
+               "csv": write_csv(os.path.join(tmp, "scored.csv"), rows, seed),
+               "raw": write_csv(os.path.join(tmp, "raw.csv"), rows, seed, raw=True)}
+        loader = TailingCSVLoader(env["csv"])
+        env["frame"], env["tokens"] = loader.load(), loader.tokens
+        env["texts"] = env["frame"]["text"].tolist()
+        results = []
+        for name, setup in BENCHMARKS:
+            if only and not any(o in name for o in only):
+                continue
+            entry = {"name": name, "rows": rows}
+            try:
+                fn = setup(env)
+                times = []
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    fn()
+                    times.append(time.perf_counter() - t0)
+                entry.update(best_s=min(times), median_s=statistics.median(times), runs_s=times)
+                print(f"{rows:>9} {name:<32} best {min(times) * 1000:10.1f}ms  median {statistics.median(times) * 1000:10.1f}ms")
+            except Exception as e:  # missing optional dependency, etc.
+                entry["error"] = f"{type(e).__name__}: {e}"
+                print(f"{rows:>9} {name:<32} skipped ({entry['error']})")
+            results.append(entry)
+        return results
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {(r["name"], r["rows"]): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    for r in after:
+        b = before.get((r["name"], r["rows"]))
+        if b is None or "best_s" not in b or "best_s" not in r:
+            continue
+        ratio = r["best_s"] / b["best_s"] if b["best_s"] else float("inf")
+        print(f"{r['rows']:>9} {r['name']:<32} {b['best_s'] * 1000:10.1f}ms -> {r['best_s'] * 1000:10.1f}ms  x{ratio:5.2f}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    ap.add_argument("--json", help="write results here")
+    ap.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = ap.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    config.SENTIMENT_CACHE_PATH = ""  # keep the stub model's scores out of the real cache
+    results = []
+    for rows in args.sizes:
+        results += run_size(rows, args.repeat, args.seed, args.only)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"meta": _meta(), "sizes": args.sizes, "seed": args.seed, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/synthetic.py
+"""Deterministic synthetic tweets for benchmarks.
+
+Same seed, same rows: hashtags and mentions follow a Zipf-like popularity
+curve, timestamps follow a day/night cycle over ``days`` days, and
+sentiment/confidence are drawn per label (confident positives and
+negatives, less confident neutrals), roughly like the scored stream.
+
+    python -m benchmarks.synthetic out.csv --rows 100000 [--raw]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+WORDS = ("the a this that new launch update price support battery screen camera app team "
+         "service delivery order refund phone love hate great terrible fast slow really "
+         "just never always again today finally why how best worst working broken thanks "
+         "waiting buy sale deal review bug crash fix feature release version night morning").split()
+HASHTAGS = ["#launch", "#YourCampaignHashtag", "#tech", "#ai", "#deal", "#fail", "#win",
+            "#mondaymotivation", "#support", "#update"] + [f"#topic{i}" for i in range(490)]
+MENTIONS = ["@support", "@brand", "@ceo", "@news"] + [f"@user{i}" for i in range(1996)]
+SENTIMENTS = np.array(["POSITIVE", "NEGATIVE", "NEUTRAL"])
+SENTIMENT_P = [0.5, 0.3, 0.2]
+
+def _zipf_choice(rng, items, size, a=1.1):
+    weights = 1.0 / np.arange(1, len(items) + 1) ** a
+    return np.asarray(items, dtype=object)[rng.choice(len(items), size=size, p=weights / weights.sum())]
+
+def generate_tweets(rows: int, seed: int = 0, start="2024-01-01", days: int = 7) -> pd.DataFrame:
+    """Scored tweets in the sentiment CSV's columns (timestamp, text, sentiment, confidence)."""
+    rng = np.random.default_rng(seed)
+
+    # Timestamps: uniform day, hour weighted towards the afternoon/evening
+    hour_w = 1.0 + np.sin((np.arange(24) - 9) / 24 * 2 * np.pi)
+    hours = rng.choice(24, size=rows, p=hour_w / hour_w.sum())
+    secs = rng.integers(0, days, rows) * 86400 + hours * 3600 + rng.integers(0, 3600, rows)
+    ts = pd.Timestamp(start, tz="UTC") + pd.to_timedelta(np.sort(secs), unit="s")
+
+    n_words = rng.integers(5, 25, rows)
+    words = _zipf_choice(rng, WORDS, int(n_words.sum()), a=0.8)
+    n_tags = rng.choice([0, 1, 2, 3], size=rows, p=[0.35, 0.4, 0.18, 0.07])
+    tags = _zipf_choice(rng, HASHTAGS, int(n_tags.sum()))
+    n_ments = rng.choice([0, 1, 2], size=rows, p=[0.6, 0.32, 0.08])
+    ments = _zipf_choice(rng, MENTIONS, int(n_ments.sum()))
+    w_ends, t_ends, m_ends = np.cumsum(n_words), np.cumsum(n_tags), np.cumsum(n_ments)
+    texts = []
+    for i in range(rows):
+        parts = list(ments[m_ends[i] - n_ments[i]:m_ends[i]])
+        parts += list(words[w_ends[i] - n_words[i]:w_ends[i]])
+        parts += list(tags[t_ends[i] - n_tags[i]:t_ends[i]])
+        texts.append(" ".join(parts))
+
+    sentiment = SENTIMENTS[rng.choice(3, size=rows, p=SENTIMENT_P)]
+    confidence = np.where(sentiment == "NEUTRAL", rng.beta(4, 3, rows), rng.beta(9, 1.2, rows))
+    return pd.DataFrame({
+        "timestamp": ts.strftime("%Y-%m-%d %H:%M:%S+00:00"),
+        "text": texts,
+        "sentiment": sentiment,
+        "confidence": confidence.round(4),
+    })
+
+def write_csv(path: str, rows: int, seed: int = 0, raw: bool = False) -> str:
+    """Write the sentiment CSV (or, with ``raw``, the collector's timestamp,text CSV)."""
+    df = generate_tweets(rows, seed)
+    if raw:
+        df = df[["timestamp", "text"]]
+    df.to_csv(path, index=False)
+    return path
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("path")
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--raw", action="store_true", help="timestamp,text only (unscored)")
+    args = ap.parse_args()
+    write_csv(args.path, args.rows, args.seed, args.raw)
+    print(f"wrote {args.rows} rows to {args.path}")
@@ -0,0 +1,70 @@
+# benchmarks/ticks.py
+"""Bytes sent per dashboard refresh tick, with and without figure patches.
+
+A synthetic CSV is written with ``--rows`` tweets over two days, then each
+tick appends ``--per-tick`` newer rows and calls update_dashboard the way a
+browser would (passing back the render keys it got last time). Outputs
+are serialized like Dash does for the response; dash.no_update outputs are
+not sent. The first refresh (full page) is reported separately.
+
+    python -m benchmarks.ticks [--rows 50000] [--ticks 20] [--per-tick 50] [--gran min]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+
+import dash
+from plotly.io.json import to_json_plotly
+
+from benchmarks.suite import _dashboard
+from benchmarks.synthetic import generate_tweets
+from src import config
+
+START, DAYS = "2024-01-01", 2
+
+def run(rows, ticks, per_tick, gran, patch) -> dict:
+    config.DASHBOARD_PATCH_FIGURES = patch
+    df = generate_tweets(rows + ticks * per_tick, seed=0, start=START, days=DAYS)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scored.csv")
+        df.iloc[:rows].to_csv(path, index=False)
+        dashboard = _dashboard({"csv": path})
+        names = [name for name, _, _ in dashboard.PANELS]
+        end = (dashboard.pd.Timestamp(START) + dashboard.pd.Timedelta(days=DAYS)).date().isoformat()
+        rendered, first, per_panel = None, 0, {name: 0 for name in names}
+        for tick in range(ticks + 1):
+            if tick:
+                lo = rows + (tick - 1) * per_tick
+                df.iloc[lo:lo + per_tick].to_csv(path, mode="a", header=False, index=False)
+            with contextlib.redirect_stdout(io.StringIO()):
+                out = dashboard.update_dashboard(tick, None, "", "", 0.5, START, end, gran, rendered)
+            rendered = out[-1]
+            sizes = {name: len(to_json_plotly(v)) for name, v in zip(names, out) if v is not dash.no_update}
+            if tick == 0:
+                first = sum(sizes.values())
+                continue
+            for name, n in sizes.items():
+                per_panel[name] += n
+    return {"first": first, "per_tick": {k: v / ticks for k, v in per_panel.items()}}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--ticks", type=int, default=20)
+    ap.add_argument("--per-tick", type=int, default=50)
+    ap.add_argument("--gran", default="min")
+    args = ap.parse_args()
+    full = run(args.rows, args.ticks, args.per_tick, args.gran, patch=False)
+    patched = run(args.rows, args.ticks, args.per_tick, args.gran, patch=True)
+    print(f"first refresh: {full['first']:,} B (whole figures) / {patched['first']:,} B (patching on)")
+    print(f"{'panel':<12} {'whole':>12} {'patched':>12}   bytes per tick")
+    for name in full["per_tick"]:
+        a, b = full["per_tick"][name], patched["per_tick"][name]
+        print(f"{name:<12} {a:12,.0f} {b:12,.0f}")
+    a, b = sum(full["per_tick"].values()), sum(patched["per_tick"].values())
+    print(f"{'total':<12} {a:12,.0f} {b:12,.0f}   x{a / b if b else float('inf'):.1f}")
+
+if __name__ == "__main__":
+    main()
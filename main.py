@@ -1,10 +1,62 @@
+import os
+import tempfile
+from collections import Counter
+
 import streamlit as st
 import pandas as pd
-from transformers import pipeline
 import plotly.express as px
 
-# Load sentiment analysis pipeline
-sentiment_analyzer = pipeline("sentiment-analysis")
+from src import config
+from src.cascade import score_cascade
+from src.dedup import NearDuplicateIndex
+from src.sentiment import score_texts, warm_up
+
+# The model is a process-wide singleton owned by src.sentiment: it is loaded
+# once (in the background, while the page renders) rather than on every rerun.
+@st.cache_resource(show_spinner=False)
+def _start_model_warm_up():
+    return warm_up(background=True)
+
+if config.SENTIMENT_WARMUP:
+    _start_model_warm_up()
+
+def analyze_texts(texts, dedup=None):
+    # With the cascade on, also record which stage (lexicon or model) decided each
+    # label; with a dedup index, near-duplicates share one score and get a cluster_id
+    if config.SENTIMENT_CASCADE:
+        score, keys = score_cascade, ["label", "score", "stage"]
+    else:
+        score, keys = score_texts, ["label", "score"]
+    if dedup is not None:
+        results = dedup.score(texts, score=score)
+        keys.append("cluster_id")
+    else:
+        results = score(texts)
+    return [dict(zip(keys, r)) for r in zip(*results)]
+
+def _draw_distribution(counts, pie_slot, bar_slot, key):
+    sentiment_counts = pd.DataFrame(sorted(counts.items()), columns=["Sentiment", "Count"])
+
+    # Interactive Pie Chart
+    pie_fig = px.pie(
+        sentiment_counts,
+        names="Sentiment",
+        values="Count",
+        hole=0.4,
+        color="Sentiment",
+    )
+    pie_slot.plotly_chart(pie_fig, use_container_width=True, key=f"pie-{key}")
+
+    # Interactive Bar Chart
+    bar_fig = px.bar(
+        sentiment_counts,
+        x="Sentiment",
+        y="Count",
+        color="Sentiment",
+        text="Count",
+    )
+    bar_fig.update_traces(textposition="outside")
+    bar_slot.plotly_chart(bar_fig, use_container_width=True, key=f"bar-{key}")
 
 st.set_page_config(page_title="Social Media Sentiment Analyzer", layout="wide")
 
@@ -17,72 +69,88 @@ if input_type == "Single Text":
     text = st.text_area("Enter text here:")
     if st.button("Analyze"):
         if text.strip() != "":
-            result = sentiment_analyzer(text)[0]
+            result = analyze_texts([text])[0]
             st.subheader("📊 Analysis Result")
             st.write(f"**Text**   : {text}")
             st.write(f"**Label**  : {result['label']}")
             st.write(f"**Score**  : {result['score']*100:.2f}%")
+            if "stage" in result:
+                st.caption(f"Decided by the {result['stage']} stage")
         else:
             st.warning("⚠️ Please enter some text.")
 
 elif input_type == "CSV File":
     uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        # Only the first rows are parsed up front; the file is scored in chunks below
+        head = pd.read_csv(uploaded_file, nrows=5)
+        uploaded_file.seek(0)
 
-        if "text" not in df.columns:
+        if "text" not in head.columns:
             st.error("CSV must have a column named **text** ❌")
         else:
             st.write("📄 Preview of Uploaded File")
-            st.dataframe(df.head())
+            st.dataframe(head)
 
             if st.button("Analyze All"):
-                # Run sentiment analysis on all rows
-                results = sentiment_analyzer(df["text"].tolist())
-
-                df["label"] = [r["label"] for r in results]
-                df["score"] = [r["score"] for r in results]
-
-                st.subheader("📊 Analysis Results")
-                st.dataframe(df)
-
-                # Sentiment distribution
-                sentiment_counts = df["label"].value_counts().reset_index()
-                sentiment_counts.columns = ["Sentiment", "Count"]
-
-                # Interactive Pie Chart
-                st.subheader("🍩 Sentiment Distribution (Interactive Pie)")
-                pie_fig = px.pie(
-                    sentiment_counts,
-                    names="Sentiment",
-                    values="Count",
-                    hole=0.4,
-                    color="Sentiment",
-                )
-                st.plotly_chart(pie_fig, use_container_width=True)
-
-                # Interactive Bar Chart
-                st.subheader("📊 Sentiment Distribution (Interactive Bar)")
-                bar_fig = px.bar(
-                    sentiment_counts,
-                    x="Sentiment",
-                    y="Count",
-                    color="Sentiment",
-                    text="Count",
-                )
-                bar_fig.update_traces(textposition="outside")
-                st.plotly_chart(bar_fig, use_container_width=True)
-
-                # Download option
-                csv = df.to_csv(index=False).encode("utf-8")
-                st.download_button(
-                    "⬇️ Download Results as CSV",
-                    data=csv,
-                    file_name="sentiment_results.csv",
-                    mime="text/csv",
+                # Stream the upload: read CHUNK rows, score them (in model-sized
+                # batches), append them to a results file on disk and fold them
+                # into running counts, so scoring memory doesn't grow with the file.
+                progress = st.progress(0.0, text="Scoring…")
+                st.subheader("🍩 Sentiment Distribution (running)")
+                pie_slot, bar_slot = st.empty(), st.empty()
+                counts = Counter()
+                preview = []
+                rows = 0
+                total_bytes = getattr(uploaded_file, "size", 0) or 0
+                os.makedirs(config.MAIN_RESULTS_DIR, exist_ok=True)
+                results_file = tempfile.NamedTemporaryFile(
+                    prefix="sentiment_results-", suffix=".csv",
+                    dir=config.MAIN_RESULTS_DIR, delete=False,
                 )
+                # One index per upload; DEDUP_MAX_CLUSTERS bounds it, no time window
+                dedup = NearDuplicateIndex(window_seconds=0) if config.DEDUP_ENABLED else None
+
+                for i, chunk in enumerate(pd.read_csv(uploaded_file, chunksize=config.MAIN_CSV_CHUNK_ROWS)):
+                    results = analyze_texts(chunk["text"].astype(str).tolist(), dedup)
+                    for key in results[0] if results else ():
+                        chunk[key] = [r[key] for r in results]
+                    results_file.write(chunk.to_csv(index=False, header=i == 0).encode("utf-8"))
+
+                    counts.update(chunk["label"])
+                    rows += len(chunk)
+                    if rows - len(chunk) < config.MAIN_PREVIEW_ROWS:
+                        preview.append(chunk.head(config.MAIN_PREVIEW_ROWS - (rows - len(chunk))))
+                    done = min(uploaded_file.tell() / total_bytes, 1.0) if total_bytes else 0.0
+                    progress.progress(done, text=f"Scored {rows:,} rows")
+                    _draw_distribution(counts, pie_slot, bar_slot, key=i)
+
+                progress.progress(1.0, text=f"Scored {rows:,} rows")
+                if dedup is not None:
+                    st.caption(f"Near-duplicates: {dedup.reduction_ratio:.1%} of rows reused another row's score")
 
-                )
-
-
-
+                st.subheader("📊 Analysis Results")
+                if preview:
+                    st.caption(f"First {min(rows, config.MAIN_PREVIEW_ROWS):,} of {rows:,} rows")
+                    st.dataframe(pd.concat(preview, ignore_index=True))
+
+                # Download option. The results stay on disk; Streamlit's download
+                # button holds its data in memory, so it is only offered for files
+                # up to MAIN_DOWNLOAD_MAX_BYTES and larger ones are served by path.
+                results_file.close()
+                size = os.path.getsize(results_file.name)
+                st.caption(f"Results saved to `{os.path.abspath(results_file.name)}` ({size / 1e6:,.1f} MB)")
+                if size <= config.MAIN_DOWNLOAD_MAX_BYTES:
+                    with open(results_file.name, "rb") as f:
+                        st.download_button(
+                            "⬇️ Download Results as CSV",
+                            data=f,
+                            file_name="sentiment_results.csv",
+                            mime="text/csv",
+                        )
+                else:
+                    st.info(
+                        "Results are too large to download through the browser without "
+                        "loading them into memory; open the saved file above instead "
+                        "(raise MAIN_DOWNLOAD_MAX_BYTES to allow it)."
+                    )
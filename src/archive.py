@@ -0,0 +1,361 @@
+# src/archive.py
+import io
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src import config
+from src.utils import (TOKEN_PATTERNS, TailingCSVLoader, concat_frames, concat_tokens, enrich_sentiment_frame,
+                       read_csv_header, record_ends, select_tokens, token_tables)
+
+CSV_PATH = "data/tweets_with_sentiment.csv"
+ARCHIVE_DIR = "data/archive"
+MANIFEST = "_manifest.json"
+
+SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("text", pa.string()),
+    ("sentiment", pa.dictionary(pa.int8(), pa.string())),
+    ("confidence", pa.float32()),
+    ("hashtags", pa.list_(pa.string())),
+    ("mentions", pa.list_(pa.string())),
+])
+LIST_COLUMNS = list(TOKEN_PATTERNS)  # stored as list<string>, loaded as flat token tables
+
+# ---------- Manifest ----------
+def read_manifest(archive_dir: str = ARCHIVE_DIR) -> dict:
+    try:
+        with open(os.path.join(archive_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_manifest(archive_dir: str, manifest: dict):
+    path = os.path.join(archive_dir, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _partition_dir(archive_dir: str, hour: pd.Timestamp) -> str:
+    return os.path.join(archive_dir, f"date={hour:%Y-%m-%d}", f"hour={hour:%H}")
+
+# ---------- Compaction ----------
+def compact(csv_path: str = CSV_PATH, archive_dir: str = ARCHIVE_DIR, grace_minutes: float = None,
+            chunk_bytes: int = 64 * 1024 * 1024, now: pd.Timestamp = None) -> int:
+    """Move sealed hours of the sentiment CSV into hour partitions.
+
+    An hour is sealed once ``grace_minutes`` have passed since it ended.
+    Records are taken in file order up to the first one that belongs to an
+    unsealed hour; the byte offset of that record is stored in the manifest
+    so readers only parse the CSV from there. Each run writes one part file
+    per partition named after the CSV offset it started at, so re-running
+    after a crash overwrites rather than duplicates. Returns rows archived.
+    """
+    grace = config.ARCHIVE_GRACE_MINUTES if grace_minutes is None else grace_minutes
+    now = pd.Timestamp.now(tz="UTC") if now is None else now
+    boundary = (now - pd.Timedelta(minutes=grace)).floor("h")
+
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return 0
+    os.makedirs(archive_dir, exist_ok=True)
+    manifest = read_manifest(archive_dir)
+    if manifest.get("csv_inode") != st.st_ino or st.st_size < manifest.get("csv_offset", 0):
+        manifest = {"csv_inode": st.st_ino, "csv_offset": 0, "rows": manifest.get("rows", 0)}
+
+    header = read_csv_header(csv_path)
+    if not header:
+        return 0
+    offset = manifest["csv_offset"]
+    archived = undated = 0
+    with open(csv_path, "rb") as f:
+        while True:
+            f.seek(offset)
+            buf = f.read(chunk_bytes)
+            ends = record_ends(buf)
+            if offset == 0 and len(ends):
+                # Skip the header record
+                offset, buf, ends = int(ends[0]), buf[ends[0]:], ends[1:] - ends[0]
+            if not len(ends):
+                break
+            data = buf[:ends[-1]]
+            df = pd.read_csv(io.BytesIO(data), names=header, header=None, dtype={"text": str},
+                             skip_blank_lines=False)
+            if len(df) != len(ends):
+                raise ValueError(f"{csv_path}: could not align records at offset {offset}")
+            df = enrich_sentiment_frame(df)
+
+            unsealed = ~(df["timestamp"] < boundary) & df["timestamp"].notna()
+            cut = int(unsealed.values.argmax()) if unsealed.any() else len(df)
+            if cut:
+                skipped = _write_parts(archive_dir, df.iloc[:cut], offset)
+                undated += skipped
+                archived += cut - skipped
+                offset += int(ends[cut - 1])
+                manifest.update(csv_offset=offset, rows=manifest.get("rows", 0) + cut,
+                                undated_rows=manifest.get("undated_rows", 0) + skipped,
+                                sealed_until=boundary.isoformat(), updated=time.time())
+                _write_manifest(archive_dir, manifest)
+            if cut < len(df) or len(buf) < chunk_bytes:
+                break
+    if undated:
+        print(f"[ARCHIVE] skipped {undated} rows without a parseable timestamp "
+              f"({manifest.get('undated_rows', 0)} so far, undated_rows in the manifest)")
+    return archived
+
+def _write_parts(archive_dir: str, df: pd.DataFrame, offset: int) -> int:
+    """Write ``df`` into hour partitions; returns the rows left out for lack of a timestamp."""
+    # Rows without a parseable timestamp can never match a date range: drop them
+    dated = df["timestamp"].notna()
+    undated = int((~dated).sum())
+    df = df[dated]
+    if df.empty:
+        return undated
+    base = [n for n in SCHEMA.names if n not in LIST_COLUMNS]
+    df = df.assign(
+        sentiment=df["sentiment"].astype("category"),
+        confidence=df["confidence"].astype("float32"),
+    )[base]
+    for hour, part in df.groupby(df["timestamp"].dt.floor("h"), sort=True):
+        out_dir = _partition_dir(archive_dir, hour)
+        os.makedirs(out_dir, exist_ok=True)
+        table = pa.Table.from_pandas(part, schema=pa.schema([SCHEMA.field(n) for n in base]),
+                                     preserve_index=False)
+        for name, flat in token_tables(part["text"]).items():
+            table = table.append_column(SCHEMA.field(name), _list_array(flat, len(part)))
+        path = os.path.join(out_dir, f"part-{offset:015d}.parquet")
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+    return undated
+
+def _list_array(flat: pd.DataFrame, n: int) -> pa.ListArray:
+    """Flat (row, token) table -> one list<string> per row."""
+    offsets = np.searchsorted(flat["row"].to_numpy(), np.arange(n + 1)).astype(np.int32)
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(flat["token"].to_numpy(), pa.string()))
+
+def _flat_tokens(column: pa.ChunkedArray) -> pd.DataFrame:
+    """list<string> column -> flat (row, token) table, without a Python loop per row.
+    Tokens are dictionary-encoded by Arrow straight into interned codes."""
+    arr = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    tokens = pc.dictionary_encode(pc.list_flatten(arr))
+    return pd.DataFrame({
+        "row": pc.list_parent_indices(arr).to_numpy().astype(np.int32),
+        "token": pd.Categorical.from_codes(tokens.indices.to_numpy(zero_copy_only=False),
+                                           categories=pd.Index(tokens.dictionary.to_pylist(), dtype=object)),
+    })
+
+# ---------- Reading ----------
+def _partition_files(archive_dir: str, start_date, end_date):
+    """Part files whose hour can fall inside [start_date, end_date + 1 day]."""
+    files = []
+    if not os.path.isdir(archive_dir):
+        return files
+    start = pd.Timestamp(start_date).floor("D") if start_date else None
+    end = pd.Timestamp(end_date).floor("D") + pd.Timedelta(days=1) if end_date else None
+    for date_dir in sorted(os.listdir(archive_dir)):
+        if not date_dir.startswith("date="):
+            continue
+        day = pd.Timestamp(date_dir[5:])
+        if (start is not None and day < start) or (end is not None and day > end):
+            continue
+        for hour_dir in sorted(os.listdir(os.path.join(archive_dir, date_dir))):
+            if not hour_dir.startswith("hour="):
+                continue
+            if end is not None and day == end and hour_dir != "hour=00":
+                continue
+            part_dir = os.path.join(archive_dir, date_dir, hour_dir)
+            files.extend(os.path.join(part_dir, p) for p in sorted(os.listdir(part_dir))
+                         if p.endswith(".parquet"))
+    return files
+
+_BUILDS = itertools.count(1)  # frame builds, unique across readers (part of each window's version)
+
+class ArchiveReader:
+    """Date-range views over the archive plus the live CSV tail.
+
+    ``window(start_date, end_date, min_conf)`` returns the view for that
+    window; up to ARCHIVE_READER_WINDOWS of them are kept (least recently
+    used dropped first), so dashboards on different windows don't throw
+    away each other's frames. The CSV tail (rows past the manifest's
+    offset, i.e. not archived yet) is parsed once and shared by all views.
+    ``load`` / ``snapshot`` are shorthands for ``window(...).load()`` etc.
+    """
+
+    def __init__(self, csv_path: str = CSV_PATH, archive_dir: str = ARCHIVE_DIR, columns=None,
+                 max_windows: int = None):
+        self.csv_path = csv_path
+        self.archive_dir = archive_dir
+        self.columns = list(columns or SCHEMA.names)
+        self.max_windows = max_windows or config.ARCHIVE_READER_WINDOWS
+        self._windows = OrderedDict()
+        self._tail = None
+        self._tail_key = None
+        self._lock = threading.RLock()
+
+    def available(self) -> bool:
+        return bool(read_manifest(self.archive_dir))
+
+    def window(self, start_date=None, end_date=None, min_conf=0.0) -> "ArchiveWindow":
+        key = (start_date, end_date, float(min_conf or 0))
+        with self._lock:
+            win = self._windows.pop(key, None) or ArchiveWindow(self, *key)
+            self._windows[key] = win
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+            return win
+
+    def snapshot(self, start_date=None, end_date=None, min_conf=0.0):
+        return self.window(start_date, end_date, min_conf).snapshot()
+
+    def load(self, start_date=None, end_date=None, min_conf=0.0) -> pd.DataFrame:
+        return self.window(start_date, end_date, min_conf).load()
+
+    def _tail_loader(self, manifest: dict) -> TailingCSVLoader:
+        # One loader per compaction state: a new offset means a new tail
+        key = (manifest.get("csv_offset", 0), manifest.get("csv_inode"))
+        if key != self._tail_key:
+            self._tail = TailingCSVLoader(self.csv_path, start_offset=key[0])
+            self._tail_key = key
+        self._tail.load()
+        return self._tail
+
+class ArchiveWindow:
+    """One (start_date, end_date, min_conf) view of an ArchiveReader.
+
+    Only partitions overlapping the dates are opened, only the reader's
+    columns are read, and the confidence threshold is pushed down into the
+    Parquet scan. While the partitions and manifest stay the same, each
+    ``load()`` only appends tail rows that arrived since the last one; a
+    compaction run or a replaced CSV rebuilds the frame (``full_reloads``).
+    Hashtags and mentions come back as flat token tables in ``tokens``
+    (see src.utils.token_tables) rather than as list columns.
+    """
+
+    def __init__(self, reader: ArchiveReader, start_date, end_date, min_conf):
+        self.reader = reader
+        self.start_date, self.end_date, self.min_conf = start_date, end_date, min_conf
+        self.start = pd.Timestamp(start_date).tz_localize("UTC") if start_date else None
+        self.end = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).tz_localize("UTC") if end_date else None
+        self.frame = None
+        self.tokens = {}
+        self.last_new_rows = 0
+        self.full_reloads = 0
+        self._build = None
+        self._key = None
+        self._tail_seen = 0  # tail rows already looked at
+        self._tail_reloads = None
+
+    @property
+    def version(self):
+        """Changes whenever the loaded frame does (appends only grow it)."""
+        return (self._build, 0 if self.frame is None else len(self.frame))
+
+    def snapshot(self):
+        """load(), plus the tokens, reload count and version of that same frame."""
+        with self.reader._lock:
+            frame = self.load()
+            return frame, self.tokens, self.full_reloads, self.version
+
+    def load(self) -> pd.DataFrame:
+        with self.reader._lock:
+            manifest = read_manifest(self.reader.archive_dir)
+            files = _partition_files(self.reader.archive_dir, self.start_date, self.end_date)
+            key = (tuple(files), manifest.get("csv_offset", 0), manifest.get("csv_inode"))
+            tail = self.reader._tail_loader(manifest)
+            if key != self._key or tail.full_reloads != self._tail_reloads:
+                self._rebuild(key, files, tail)
+            else:
+                self._append_tail(tail)
+            return self.frame
+
+    def _window_mask(self, df: pd.DataFrame):
+        mask = df["confidence"].fillna(0) >= self.min_conf
+        if self.start is not None:
+            mask &= df["timestamp"] >= self.start
+        if self.end is not None:
+            mask &= df["timestamp"] <= self.end
+        return mask
+
+    def _rebuild(self, key, files, tail):
+        columns = self.reader.columns
+        lists = [c for c in LIST_COLUMNS if c in columns]
+        plain = [c for c in columns if c not in LIST_COLUMNS]
+        min_conf = self.min_conf
+
+        parts = []
+        tokens = {name: _flat_tokens(pa.chunked_array([], SCHEMA.field(name).type)) for name in lists}
+        if files:
+            expr = ds.field("confidence") >= min_conf
+            if min_conf <= 0:
+                # Unscored rows pass a zero threshold, like fillna(0) on the CSV tail
+                expr |= ds.field("confidence").is_null(nan_is_null=True)
+            if self.start is not None:
+                expr &= ds.field("timestamp") >= pa.scalar(self.start.to_pydatetime(), SCHEMA.field("timestamp").type)
+            if self.end is not None:
+                expr &= ds.field("timestamp") <= pa.scalar(self.end.to_pydatetime(), SCHEMA.field("timestamp").type)
+            table = ds.dataset(files, schema=SCHEMA, format="parquet").to_table(columns=columns, filter=expr)
+            tokens = {name: _flat_tokens(table.column(name)) for name in lists}
+            parts.append(table.drop(lists).to_pandas())
+
+        rows = tail.frame
+        if rows is not None and len(rows):
+            keep = np.flatnonzero(self._window_mask(rows).to_numpy())
+            parts.append(rows.iloc[keep][[c for c in plain if c in rows.columns]])
+            tail_tokens = select_tokens(tail.tokens, keep, len(rows))
+            offset = len(parts[0]) if len(parts) == 2 else 0
+            tokens = concat_tokens(tokens, {n: tail_tokens[n] for n in lists}, offset)
+
+        self.frame = concat_frames(parts, ignore_index=True) if parts else pd.DataFrame(columns=plain)
+        self.tokens = tokens
+        self._key = key
+        self._tail_seen = 0 if rows is None else len(rows)
+        self._tail_reloads = tail.full_reloads
+        self._build = next(_BUILDS)
+        self.full_reloads += 1
+        self.last_new_rows = len(self.frame)
+
+    def _append_tail(self, tail):
+        rows = tail.frame
+        if rows is None:  # CSV missing for now; its reappearance reloads the tail
+            self.last_new_rows = 0
+            return
+        first = self._tail_seen
+        new = rows.iloc[first:]
+        self._tail_seen = len(rows)
+        keep = np.flatnonzero(self._window_mask(new).to_numpy())
+        new = new.iloc[keep][[c for c in self.reader.columns if c in new.columns]]
+        self.last_new_rows = len(new)
+        if len(new):
+            new_tokens = select_tokens(tail.tokens, keep + first, len(rows), len(self.frame))
+            self.tokens = concat_tokens(self.tokens, {n: new_tokens[n] for n in self.tokens}, 0)
+            new.index = pd.RangeIndex(len(self.frame), len(self.frame) + len(new))
+            self.frame = concat_frames([self.frame, new])
+
+    def texts(self, rows) -> pd.Series:
+        """Text of the given frame rows (positions); see TailingCSVLoader.texts."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return self.frame["text"].iloc[rows].set_axis(rows)
+
+if __name__ == "__main__":
+    # Run once, or keep compacting every ARCHIVE_COMPACT_EVERY seconds with --watch
+    import sys
+    while True:
+        n = compact()
+        print(f"[ARCHIVE] archived {n} rows; manifest {read_manifest()}")
+        if "--watch" not in sys.argv:
+            break
+        time.sleep(config.ARCHIVE_COMPACT_EVERY)
@@ -0,0 +1,29 @@
+// src/assets/push.js
+// Re-render on server pushes instead of polling: every /events message
+// (one per data change, see Refresher in src/dashboard.py) bumps
+// store-push, which triggers the dashboard and table callbacks. While the
+// stream is down the dcc.Interval fallback polls instead.
+(function () {
+    function setProps(id, props) {
+        if (window.dash_clientside && window.dash_clientside.set_props) {
+            window.dash_clientside.set_props(id, props);
+        }
+    }
+    if (!window.EventSource) {
+        window.addEventListener("load", function () {
+            setProps("interval-refresh", {disabled: false});
+        });
+        return;
+    }
+    var source = new EventSource("/events");
+    source.onopen = function () {
+        setProps("interval-refresh", {disabled: true});
+    };
+    source.onmessage = function (event) {
+        setProps("store-push", {data: event.data});
+    };
+    source.onerror = function () {
+        // EventSource reconnects by itself; poll until it does
+        setProps("interval-refresh", {disabled: false});
+    };
+})();
@@ -0,0 +1,155 @@
+# src/cache.py
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from src import config
+
+_WS_RE = re.compile(r"\s+")
+
+def normalize_text(text) -> str:
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", str(text))).strip()
+
+def cache_key(text, model_id: str) -> str:
+    h = hashlib.sha256()
+    h.update(model_id.encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.hexdigest()
+
+class SentimentCache:
+    """(label, score) results keyed by normalized-text hash + model id.
+
+    A bounded in-memory LRU sits in front of a SQLite file so results are
+    shared across processes and survive restarts. Entries older than
+    ``ttl`` seconds are treated as misses; the disk store is trimmed to
+    ``max_entries`` (oldest first).
+    """
+
+    def __init__(self, path=None, memory_entries=None, max_entries=None, ttl=None):
+        self.path = config.SENTIMENT_CACHE_PATH if path is None else path
+        self.memory_entries = config.SENTIMENT_CACHE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self.max_entries = config.SENTIMENT_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = config.SENTIMENT_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_trim = 0
+        self._db = None
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, label TEXT NOT NULL, score REAL NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            self._db.commit()
+
+    def _fresh(self, created: float, now: float) -> bool:
+        return not self.ttl or now - created < self.ttl
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    def get_many(self, texts, model_id: str):
+        """Return a list aligned with ``texts``: (label, score) or None on miss."""
+        keys = [cache_key(t, model_id) for t in texts]
+        now = time.time()
+        found = {}
+        with self._lock:
+            pending = []
+            for key in set(keys):
+                entry = self._lru.get(key)
+                if entry is not None and self._fresh(entry[2], now):
+                    self._lru.move_to_end(key)
+                    found[key] = entry
+                else:
+                    pending.append(key)
+            if pending and self._db is not None:
+                # SQLite caps the number of bound parameters per statement
+                for i in range(0, len(pending), 500):
+                    chunk = pending[i:i + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, label, score, created FROM results WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                    for key, label, score, created in rows:
+                        if self._fresh(created, now):
+                            found[key] = (label, score, created)
+                            self._remember(key, found[key])
+            out = []
+            for key in keys:
+                entry = found.get(key)
+                if entry is None:
+                    self.misses += 1
+                    out.append(None)
+                else:
+                    self.hits += 1
+                    out.append((entry[0], entry[1]))
+        return out
+
+    def get(self, text, model_id: str):
+        return self.get_many([text], model_id)[0]
+
+    def put_many(self, texts, results, model_id: str):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, (label, score) in zip(texts, results):
+                key = cache_key(text, model_id)
+                self._remember(key, (label, float(score), now))
+                rows.append((key, label, float(score), now))
+            if self._db is not None and rows:
+                self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+                self._puts_since_trim += len(rows)
+                if self._puts_since_trim >= 1000:
+                    self._trim(now)
+                self._db.commit()
+
+    def put(self, text, label, score, model_id: str):
+        self.put_many([text], [(label, score)], model_id)
+
+    def _trim(self, now: float):
+        self._puts_since_trim = 0
+        if self.ttl:
+            self._db.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+        if self.max_entries:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM results").fetchone()
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._lru),
+        }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> SentimentCache:
+    """Process-wide cache shared by every scoring path."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SentimentCache()
+    return _cache
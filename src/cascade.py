@@ -0,0 +1,71 @@
+# src/cascade.py
+"""Cheap-first sentiment cascade.
+
+TextBlob's pattern lexicon looks at every text first. A short text whose
+lexicon confidence clears SENTIMENT_CASCADE_THRESHOLD is labelled right
+there; neutral, weak, long or out-of-vocabulary texts go on to the
+transformer through src.sentiment.score_texts (cache and inference server
+included). Lexicon labels use the model's POSITIVE/NEGATIVE names and
+confidence = 0.5 + |polarity| / 2, so the output reads the same whichever
+stage answered; the stage itself is returned alongside.
+"""
+import threading
+
+import pandas as pd
+
+from src import config, metrics
+
+LEXICON, MODEL = "lexicon", "model"
+
+STAGE_TEXTS = metrics.counter("sentiment_cascade_texts_total", "Texts labelled by each cascade stage", ["stage"])
+
+_analyzer = None
+_lock = threading.Lock()
+
+def get_analyzer():
+    """Process-wide TextBlob PatternAnalyzer (lexicon loaded on first use)."""
+    global _analyzer
+    if _analyzer is None:
+        with _lock:
+            if _analyzer is None:
+                from textblob.en.sentiments import PatternAnalyzer
+                analyzer = PatternAnalyzer()
+                analyzer.analyze("warm up")  # loads the lexicon once, under the lock
+                _analyzer = analyzer
+    return _analyzer
+
+def lexicon_label(text, threshold=None, max_words=None):
+    """(label, confidence) when the lexicon is sure enough, else None."""
+    threshold = config.SENTIMENT_CASCADE_THRESHOLD if threshold is None else threshold
+    max_words = max_words or config.SENTIMENT_CASCADE_MAX_WORDS
+    if not text or len(text.split()) > max_words:
+        return None
+    polarity = get_analyzer().analyze(text)[0]
+    confidence = 0.5 + abs(polarity) / 2
+    if polarity == 0 or confidence < threshold:
+        return None
+    return ("POSITIVE" if polarity > 0 else "NEGATIVE"), confidence
+
+def score_cascade(texts, threshold=None, max_words=None, batch_size=None, max_length=None, use_cache=True):
+    """(labels, scores, stages) in input order; stages[i] is "lexicon" or "model"."""
+    from src.sentiment import score_texts
+
+    texts = ["" if pd.isna(t) else str(t) for t in texts]
+    quick = {t: lexicon_label(t, threshold, max_words) for t in dict.fromkeys(texts)}
+    rest = [t for t, hit in quick.items() if hit is None]
+    fresh = {}
+    if rest:
+        labels, scores = score_texts(rest, batch_size, max_length, use_cache=use_cache, cascade=False)
+        fresh = dict(zip(rest, zip(labels, scores)))
+
+    labels, scores, stages = [], [], []
+    for t in texts:
+        hit = quick[t]
+        label, score = hit if hit is not None else fresh[t]
+        labels.append(label)
+        scores.append(score)
+        stages.append(LEXICON if hit is not None else MODEL)
+    decided = stages.count(LEXICON)
+    STAGE_TEXTS.inc(decided, stage=LEXICON)
+    STAGE_TEXTS.inc(len(texts) - decided, stage=MODEL)
+    return labels, scores, stages
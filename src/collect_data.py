@@ -1,30 +1,62 @@
 # src/collect_data.py
+import time
 import tweepy
-import pandas as pd
-import os
 from datetime import datetime
-from src import config
+from src import config, metrics
+from src.writer import BufferedCSVWriter
 
 CSV_FILE = "data/tweets.csv"
+STATS_EVERY = 60  # seconds between writer stats lines
+
+TWEETS_INGESTED = metrics.counter("tweets_ingested_total", "Tweets received from the stream")
+TWEETS_DROPPED = metrics.counter("tweets_dropped_total", "Tweets dropped because the writer queue was full")
+WRITER_QUEUE = metrics.gauge("tweet_writer_queue_rows", "Rows waiting in the CSV writer queue")
+WRITER_RATE = metrics.gauge("tweet_writer_rows_per_second", "Average rows written per second since start")
 
 class TweetStreamer(tweepy.StreamingClient):
+    def __init__(self, bearer_token, **kwargs):
+        super().__init__(bearer_token, **kwargs)
+        # Disk writes happen on the writer's thread, never on the stream callback
+        self.writer = BufferedCSVWriter(
+            CSV_FILE, ["timestamp", "text"],
+            max_queue=config.TWEET_WRITER_MAX_QUEUE,
+            flush_rows=config.TWEET_WRITER_FLUSH_ROWS,
+            flush_interval=config.TWEET_WRITER_FLUSH_INTERVAL,
+            fsync=config.TWEET_WRITER_FSYNC,
+            rotate_bytes=config.TWEET_WRITER_ROTATE_BYTES,
+            rotate_hourly=config.TWEET_WRITER_ROTATE_HOURLY,
+        ).start()
+        self._last_stats = self._last_gauges = time.monotonic()
+
     def on_tweet(self, tweet):
         # Prepare tweet data
         data = {
             "timestamp": datetime.utcnow().isoformat(),
             "text": tweet.text
         }
-        df = pd.DataFrame([data])
-
-        # If file doesn't exist, create it with header
-        if not os.path.isfile(CSV_FILE):
-            df.to_csv(CSV_FILE, mode='w', header=True, index=False)
-        else:
-            df.to_csv(CSV_FILE, mode='a', header=False, index=False)
+        TWEETS_INGESTED.inc()
+        if not self.writer.write(data):
+            TWEETS_DROPPED.inc()
+            print("[DROPPED] writer queue full")
 
         print(f"[NEW TWEET] {tweet.text}")
 
+        now = time.monotonic()
+        if metrics.ENABLED and now - self._last_gauges >= 1.0:
+            self._last_gauges = now
+            stats = self.writer.stats()
+            WRITER_QUEUE.set(stats["queue_depth"])
+            WRITER_RATE.set(stats["rows_per_sec"])
+        if now - self._last_stats >= STATS_EVERY:
+            self._last_stats = now
+            print(f"[WRITER] {self.writer.stats()}")
+
+    def close(self):
+        self.writer.close()
+        print(f"[WRITER] closed {self.writer.stats()}")
+
 def start_stream():
+    metrics.start_http_server()  # only if METRICS_PORT is set
     streamer = TweetStreamer(config.BEARER_TOKEN)
 
     # Clean old rules before adding a new one
@@ -36,7 +68,11 @@ def start_stream():
     # Add new hashtag rule
     streamer.add_rules(tweepy.StreamRule(config.HASHTAG))
     print(f"📡 Streaming tweets for {config.HASHTAG}...")
-    streamer.filter(tweet_fields=["created_at", "lang"])
+    try:
+        streamer.filter(tweet_fields=["created_at", "lang"])
+    finally:
+        # Flush whatever is still buffered before exiting
+        streamer.close()
 
 if __name__ == "__main__":
     start_stream()
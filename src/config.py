@@ -6,3 +6,105 @@ import os
 BEARER_TOKEN = os.getenv("AAAAAAAAAAAAAAAAAAAAADhm3gEAAAAALOH%2FqKz4OrZCMIsck%2FGg%2B7YgVmk%3DE43rJv7OvnRjFWq9lW7GsnYABlznjNUH4h7V1DTqB6ga8DIP97")
 HASHTAG = os.getenv("HASHTAG", "#YourCampaignHashtag")
 
+# Sentiment model / batched inference
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english")
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "64"))
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", "128"))
+
+# Sentiment result cache (set SENTIMENT_CACHE_PATH="" for memory only)
+SENTIMENT_CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", "data/sentiment_cache.sqlite")
+SENTIMENT_CACHE_MEMORY_ENTRIES = int(os.getenv("SENTIMENT_CACHE_MEMORY_ENTRIES", "50000"))
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.getenv("SENTIMENT_CACHE_MAX_ENTRIES", "2000000"))
+SENTIMENT_CACHE_TTL = float(os.getenv("SENTIMENT_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Load the model on a background thread at startup instead of on first request
+SENTIMENT_WARMUP = os.getenv("SENTIMENT_WARMUP", "1") == "1"
+
+# Hugging Face Inference API client (app.py)
+HF_API_BATCH_SIZE = int(os.getenv("HF_API_BATCH_SIZE", "8"))
+HF_API_CONCURRENCY = int(os.getenv("HF_API_CONCURRENCY", "4"))
+HF_API_RATE = float(os.getenv("HF_API_RATE", "5"))  # requests per second
+HF_API_BURST = float(os.getenv("HF_API_BURST", "10"))
+HF_API_RETRIES = int(os.getenv("HF_API_RETRIES", "5"))
+
+# Buffered tweet writer (src/collect_data.py)
+TWEET_WRITER_MAX_QUEUE = int(os.getenv("TWEET_WRITER_MAX_QUEUE", "20000"))
+TWEET_WRITER_FLUSH_ROWS = int(os.getenv("TWEET_WRITER_FLUSH_ROWS", "200"))
+TWEET_WRITER_FLUSH_INTERVAL = float(os.getenv("TWEET_WRITER_FLUSH_INTERVAL", "1.0"))
+TWEET_WRITER_FSYNC = os.getenv("TWEET_WRITER_FSYNC", "interval")  # always | interval | never
+TWEET_WRITER_ROTATE_BYTES = int(os.getenv("TWEET_WRITER_ROTATE_BYTES", "0"))  # 0 = no size rotation
+TWEET_WRITER_ROTATE_HOURLY = os.getenv("TWEET_WRITER_ROTATE_HOURLY", "0") == "1"
+
+# Streaming scorer (src/scorer.py)
+SCORER_MAX_BATCH_BYTES = int(os.getenv("SCORER_MAX_BATCH_BYTES", str(256 * 1024)))
+SCORER_POLL_INTERVAL = float(os.getenv("SCORER_POLL_INTERVAL", "1.0"))
+
+# Hour-partitioned Parquet archive (src/archive.py)
+ARCHIVE_GRACE_MINUTES = float(os.getenv("ARCHIVE_GRACE_MINUTES", "5"))
+ARCHIVE_COMPACT_EVERY = float(os.getenv("ARCHIVE_COMPACT_EVERY", "300"))
+ARCHIVE_READER_WINDOWS = int(os.getenv("ARCHIVE_READER_WINDOWS", "4"))  # date/confidence windows kept loaded
+# "auto" reads from the archive once one exists, "csv" always reads the whole CSV
+DASHBOARD_SOURCE = os.getenv("DASHBOARD_SOURCE", "auto")
+
+# Inference backend: "torch", or "onnx" for ONNX Runtime on CPU (src/onnx_backend.py)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+SENTIMENT_ONNX_DIR = os.getenv("SENTIMENT_ONNX_DIR", "models/onnx")
+SENTIMENT_ONNX_QUANTIZE = os.getenv("SENTIMENT_ONNX_QUANTIZE", "1") == "1"  # dynamic int8
+SENTIMENT_ONNX_THREADS = int(os.getenv("SENTIMENT_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+
+# Multi-process CSV scoring (src/parallel.py); 0 workers = cores // threads per worker
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", "0"))
+PARALLEL_THREADS_PER_WORKER = int(os.getenv("PARALLEL_THREADS_PER_WORKER", "2"))
+PARALLEL_CHUNK_ROWS = int(os.getenv("PARALLEL_CHUNK_ROWS", "2000"))
+PARALLEL_RETRIES = int(os.getenv("PARALLEL_RETRIES", "2"))
+
+# Metrics (src/metrics.py): /metrics on the dashboard, or METRICS_PORT for other processes
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = no standalone server
+
+# Streamlit CSV upload (main.py): rows scored per chunk, rows kept for the preview
+MAIN_CSV_CHUNK_ROWS = int(os.getenv("MAIN_CSV_CHUNK_ROWS", "5000"))
+MAIN_PREVIEW_ROWS = int(os.getenv("MAIN_PREVIEW_ROWS", "1000"))
+# Scored uploads are saved here; only files up to MAIN_DOWNLOAD_MAX_BYTES also
+# get a browser download button (Streamlit holds the download in memory)
+MAIN_RESULTS_DIR = os.getenv("MAIN_RESULTS_DIR", "data/results")
+MAIN_DOWNLOAD_MAX_BYTES = int(os.getenv("MAIN_DOWNLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Compact dashboard frame: keep only byte offsets of tweet text and read the
+# text back for the rows a table, search or word cloud needs (CSV source)
+DASHBOARD_LAZY_TEXT = os.getenv("DASHBOARD_LAZY_TEXT", "1") == "1"
+# Send figures whose filters did not change as dash.Patch point updates
+DASHBOARD_PATCH_FIGURES = os.getenv("DASHBOARD_PATCH_FIGURES", "1") == "1"
+# One background refresher per dashboard process; tabs get changes over /events (SSE)
+DASHBOARD_PUSH = os.getenv("DASHBOARD_PUSH", "1") == "1"
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "2"))
+
+# Local inference server (src/inference_server.py). With INFERENCE_SERVER_URL set
+# (http://127.0.0.1:8766 or unix:///path/to.sock) score_texts sends cache misses
+# there instead of loading the model in every process.
+INFERENCE_SERVER_URL = os.getenv("INFERENCE_SERVER_URL", "")
+INFERENCE_SERVER_HOST = os.getenv("INFERENCE_SERVER_HOST", "127.0.0.1")
+INFERENCE_SERVER_PORT = int(os.getenv("INFERENCE_SERVER_PORT", "8766"))
+INFERENCE_SERVER_SOCKET = os.getenv("INFERENCE_SERVER_SOCKET", "")
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "256"))  # texts per coalesced batch
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "4096"))  # queued texts before 503
+INFERENCE_CLIENT_CHUNK = int(os.getenv("INFERENCE_CLIENT_CHUNK", "1024"))
+INFERENCE_CLIENT_TIMEOUT = float(os.getenv("INFERENCE_CLIENT_TIMEOUT", "120"))
+INFERENCE_CLIENT_RETRIES = int(os.getenv("INFERENCE_CLIENT_RETRIES", "8"))
+
+# Cheap-first cascade (src/cascade.py): TextBlob labels short texts whose lexicon
+# confidence (0.5 + |polarity| / 2) reaches the threshold; the rest go to the model
+SENTIMENT_CASCADE = os.getenv("SENTIMENT_CASCADE", "0") == "1"
+SENTIMENT_CASCADE_THRESHOLD = float(os.getenv("SENTIMENT_CASCADE_THRESHOLD", "0.8"))
+SENTIMENT_CASCADE_MAX_WORDS = int(os.getenv("SENTIMENT_CASCADE_MAX_WORDS", "30"))
+
+# Near-duplicate collapsing before inference (src/dedup.py): MinHash over byte
+# shingles, LSH with DEDUP_BANDS bands, clusters kept for a window of tweet time
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "0") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))  # estimated Jaccard to join a cluster
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_SHINGLE = int(os.getenv("DEDUP_SHINGLE", "5"))  # bytes per shingle, 1-8
+DEDUP_WINDOW_SECONDS = float(os.getenv("DEDUP_WINDOW_SECONDS", "3600"))
+DEDUP_MAX_CLUSTERS = int(os.getenv("DEDUP_MAX_CLUSTERS", "100000"))
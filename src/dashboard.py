@@ -1,32 +1,88 @@
 # src/dashboard.py
+import json
 import os
-import io
-import base64
+import re
+import time
+import contextlib
+import hashlib
+import math
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import timedelta
 
 import numpy as np
 import pandas as pd
-from wordcloud import WordCloud, STOPWORDS
-import nltk
 
 import dash
+import flask
 from dash import Dash, dcc, html, dash_table, Input, Output, State
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
 
-from src.utils import load_sentiment_csv
-
-# Ensure stopwords available (safe if already present)
-try:
-    nltk.data.find("corpora/stopwords")
-except LookupError:
-    import nltk
-    nltk.download("stopwords")
+from src import config, metrics
+from src.index import TweetIndex, filter_with_index
+from src.rollup import SENTIMENT_ORDER, MinuteRollup, finish_time_aggregate
+from src.terms import TermFrequencyIndex, count_terms, render_wordcloud
+from src.utils import TailingCSVLoader
 
 CSV_PATH = "data/tweets_with_sentiment.csv"
+ARCHIVE_DIR = "data/archive"
+TABLE_PAGE_SIZE = 10
+TABLE_ORDER_CACHE = 8  # filtered + sorted table views kept for paging
+
+# Shared across callbacks: each refresh only parses rows appended since the last one
+_loader = TailingCSVLoader(CSV_PATH, lazy_text=config.DASHBOARD_LAZY_TEXT)
+# Archive mode: windows asked for by tabs, and the refresher's own reader so
+# tabs on other windows never evict (and rebuild) the default view
+_archive = None
+_archive_refresher = None
+# Per-minute counts, per-hour word counts and the search index kept in step
+# with the CSV frame; each archive window gets its own (see indexes_for)
+_rollup = MinuteRollup()
+_terms = TermFrequencyIndex()
+_index = TweetIndex()
+_window_indexes = weakref.WeakKeyDictionary()
+_window_indexes_lock = threading.Lock()
+
+def indexes_for(source):
+    """(rollup, terms, index) for the frame ``source`` loads."""
+    if source is _loader:
+        return _rollup, _terms, _index
+    with _window_indexes_lock:
+        found = _window_indexes.get(source)
+        if found is None:
+            found = _window_indexes[source] = (MinuteRollup(), TermFrequencyIndex(), TweetIndex())
+        return found
+
+def load_base(start_date, end_date, conf, refresher=False):
+    """Return (frame, tokens, source, generation, version), all taken from the
+    same load: tokens are the flat hashtag/mention tables for the frame,
+    source is the loader, whose ``source.texts(rows)`` gives the text of
+    given rows (the CSV frame may have no text column, see
+    DASHBOARD_LAZY_TEXT); generation changes whenever the frame is rebuilt
+    rather than appended to, version whenever it changes. Callbacks and the
+    refresher load concurrently, so nothing else is read off the loader."""
+    # Once `python -m src.archive` has compacted sealed hours, read only the
+    # partitions for the selected dates (plus the live CSV tail).
+    global _archive, _archive_refresher
+    if config.DASHBOARD_SOURCE != "csv" and os.path.exists(os.path.join(ARCHIVE_DIR, "_manifest.json")):
+        from src.archive import ArchiveReader  # pyarrow is only needed in archive mode
+        if refresher:
+            if _archive_refresher is None:
+                _archive_refresher = ArchiveReader(CSV_PATH, ARCHIVE_DIR, max_windows=1)
+            reader = _archive_refresher
+        else:
+            if _archive is None:
+                _archive = ArchiveReader(CSV_PATH, ARCHIVE_DIR)
+            reader = _archive
+        window = reader.window(start_date, end_date, conf)
+        df, tokens, reloads, version = window.snapshot()
+        return df, tokens, window, ("archive", reloads), ("archive", version)
+    df, tokens, reloads, version = _loader.snapshot()
+    return df, tokens, _loader, ("csv", reloads), ("csv", version)
 
 # ---------- Helpers ----------
-SENTIMENT_ORDER = ["NEGATIVE", "NEUTRAL", "POSITIVE"]
 SENTIMENT_COLORS = {
     "NEGATIVE": "#EF553B",
     "NEUTRAL":  "#636EFA",
@@ -40,56 +96,74 @@ def compute_rsi(df: pd.DataFrame) -> float:
     tot = len(df)
     return (pos - neg) / tot if tot else 0.0
 
-def aggregate_time(df: pd.DataFrame, freq: str = "T") -> pd.DataFrame:
+def aggregate_time(df: pd.DataFrame, freq: str = "min") -> pd.DataFrame:
     if df.empty:
         idx = pd.date_range(pd.Timestamp.utcnow().floor(freq), periods=1, freq=freq)
         return pd.DataFrame(index=idx)
     g = (
         df.set_index("timestamp")
-          .groupby([pd.Grouper(freq=freq), "sentiment"])
+          .groupby([pd.Grouper(freq=freq), "sentiment"], observed=True)
           .size()
           .unstack(fill_value=0)
-          .reindex(columns=SENTIMENT_ORDER, fill_value=0)
-          .sort_index()
     )
-    g["TOTAL"] = g.sum(axis=1)
-    # Rolling RSI (centered not ideal for streaming; use simple trailing window)
-    window = max(3, min(30, int(len(g) * 0.2)))  # adaptive
-    pos = g.get("POSITIVE", pd.Series(0, index=g.index))
-    neg = g.get("NEGATIVE", pd.Series(0, index=g.index))
-    rsi = (pos - neg) / g["TOTAL"].replace({0: np.nan})
-    g["RSI"] = rsi.rolling(window=window, min_periods=1).mean().fillna(0)
-    return g
+    return finish_time_aggregate(g)
+
+_stopwords_checked = False
+
+def _ensure_stopwords():
+    # Ensure stopwords available (safe if already present); deferred to the
+    # first word-cloud render so importing the dashboard stays fast.
+    global _stopwords_checked
+    if _stopwords_checked:
+        return
+    _stopwords_checked = True
+    try:
+        import nltk
+    except ImportError:
+        return
+    try:
+        nltk.data.find("corpora/stopwords")
+    except LookupError:
+        nltk.download("stopwords")
 
 def wordcloud_image(texts: pd.Series) -> str:
-    text_blob = " ".join(texts.dropna().astype(str))
-    if not text_blob.strip():
-        text_blob = "no data"
-    wc = WordCloud(width=900, height=450, background_color="white",
-                   stopwords=STOPWORDS, collocations=False).generate(text_blob)
-    buf = io.BytesIO()
-    wc.to_image().save(buf, format="PNG")
-    encoded = base64.b64encode(buf.getvalue()).decode()
-    return f"data:image/png;base64,{encoded}"
-
-def top_tokens(df: pd.DataFrame, col: str, k: int = 15):
-    # col is "hashtags" or "mentions" (lists)
-    if df.empty: return pd.DataFrame(columns=["token","count"])
-    s = df[col].explode().dropna()
-    s = s[s.str.len() > 1]
-    return s.value_counts().head(k).reset_index().rename(columns={"index":"token", col:"count"})
+    _ensure_stopwords()
+    return render_wordcloud(count_terms(texts.dropna().astype(str)))
+
+def rank_tokens(tokens: pd.Series, k: int = 15):
+    # Interned tokens: value_counts is a bincount over the codes, with a zero
+    # for every vocabulary entry not in this selection
+    counts = tokens.value_counts(sort=False)
+    counts = counts[counts > 0]
+    counts.index = counts.index.astype(object)
+    return (counts.sort_index().sort_values(ascending=False).head(k)
+                  .rename_axis("token").reset_index(name="count"))
+
+def top_tokens(flat: pd.DataFrame, k: int = 15):
+    # flat is a (row, token) hashtag or mention table, see token_tables
+    if flat.empty: return pd.DataFrame(columns=["token","count"])
+    s = flat["token"]
+    return rank_tokens(s[s.str.len() > 1], k)
 
 def kpi_card(title: str, value: str, sub: str = ""):
     return dbc.Card(
         dbc.CardBody([
-            html.div(title, className="text-sm text-gray-500"),
-            html.h2(value, className="text-2xl fw-bold mb-0"),
-            html.div(sub, className="text-xs text-muted mt-1"),
+            html.Div(title, className="text-sm text-gray-500"),
+            html.H2(value, className="text-2xl fw-bold mb-0"),
+            html.Div(sub, className="text-xs text-muted mt-1"),
         ]),
         className="shadow-sm rounded-3"
     )
 
 # ---------- App ----------
+# Filters a freshly opened tab starts with; the refresher prebuilds this view
+DEFAULT_VIEW = {
+    "hashtag": None, "search": None, "conf": 0.50,
+    "start_date": (pd.Timestamp.utcnow() - pd.Timedelta(days=2)).date().isoformat(),
+    "end_date": pd.Timestamp.utcnow().date().isoformat(),
+    "gran": "min",
+}
+
 app: Dash = dash.Dash(
     __name__,
     external_stylesheets=[dbc.themes.BOOTSTRAP],
@@ -97,7 +171,11 @@ app: Dash = dash.Dash(
 )
 app.layout = dbc.Container([
     dcc.Store(id="store-hashtags"),
-    dcc.Interval(id="interval-refresh", interval=10_000, n_intervals=0),  # 10s
+    dcc.Store(id="store-rendered"),  # per-panel render keys this client shows
+    dcc.Store(id="store-table-rendered"),  # render key of the table page this client shows
+    dcc.Store(id="store-push"),  # bumped by assets/push.js on each server refresh
+    # Polling fallback: off while /events pushes refreshes (push.js turns it on if the stream drops)
+    dcc.Interval(id="interval-refresh", interval=10_000, n_intervals=0, disabled=config.DASHBOARD_PUSH),
 
     html.H2("Social Media Sentiment Analyzer", className="mt-3 mb-1"),
     html.Div("Live rolling analytics for campaign hashtags", className="text-muted mb-3"),
@@ -116,15 +194,15 @@ app.layout = dbc.Container([
         ], md=3),
         dbc.Col([
             dbc.Label("Confidence ≥"),
-            dcc.Slider(id="slider-conf", min=0.0, max=1.0, step=0.05, value=0.50,
+            dcc.Slider(id="slider-conf", min=0.0, max=1.0, step=0.05, value=DEFAULT_VIEW["conf"],
                        tooltip={"always_visible": False, "placement": "bottom"})
         ], md=3),
         dbc.Col([
             dbc.Label("Time granularity"),
             dcc.RadioItems(
                 id="radio-gran",
-                options=[{"label":"Minute","value":"T"},{"label":"Hour","value":"H"},{"label":"Day","value":"D"}],
-                value="T",
+                options=[{"label":"Minute","value":"min"},{"label":"Hour","value":"h"},{"label":"Day","value":"D"}],
+                value=DEFAULT_VIEW["gran"],
                 inline=True
             ),
         ], md=3),
@@ -137,8 +215,8 @@ app.layout = dbc.Container([
                 id="date-range",
                 min_date_allowed=pd.Timestamp("2023-01-01"),
                 max_date_allowed=pd.Timestamp.utcnow().date(),
-                start_date=(pd.Timestamp.utcnow() - pd.Timedelta(days=2)).date(),
-                end_date=pd.Timestamp.utcnow().date(),
+                start_date=DEFAULT_VIEW["start_date"],
+                end_date=DEFAULT_VIEW["end_date"],
                 display_format="YYYY-MM-DD"
             )
         ], md=6),
@@ -177,7 +255,16 @@ app.layout = dbc.Container([
             {"name":"Confidence","id":"confidence","type":"numeric","format":dash_table.FormatTemplate.percentage(2)},
             {"name":"Text","id":"text","type":"text"},
         ],
-        page_size=10,
+        # Paging, sorting and filtering run on the server (update_table):
+        # only the rows of the visible page are ever sent
+        page_action="custom",
+        page_current=0,
+        page_size=TABLE_PAGE_SIZE,
+        sort_action="custom",
+        sort_mode="single",
+        sort_by=[],
+        filter_action="custom",
+        filter_query="",
         style_cell={"textAlign":"left","whiteSpace":"normal","height":"auto"},
         style_header={"fontWeight":"bold"},
         style_data_conditional=[
@@ -207,8 +294,14 @@ app.layout = dbc.Container([
 def set_refresh_interval(seconds):
     return int(seconds) * 1000
 
-def apply_filters(df, hashtag, search, conf, start_date, end_date):
+def apply_filters(df, hashtag, search, conf, start_date, end_date, index=None, texts=None):
+    # texts(rows) gives the text of frame rows when df has no text column
     if df.empty: return df
+    if index is not None:
+        # Hashtag / text filters answered from posting lists when possible
+        fdf = filter_with_index(df, index, hashtag, search, conf, start_date, end_date, texts)
+        if fdf is not None:
+            return fdf
     # Date range filter
     if start_date:
         df = df[df["timestamp"] >= pd.Timestamp(start_date).tz_localize("UTC")]
@@ -216,65 +309,104 @@ def apply_filters(df, hashtag, search, conf, start_date, end_date):
         df = df[df["timestamp"] <= (pd.Timestamp(end_date) + pd.Timedelta(days=1)).tz_localize("UTC")]
     # Confidence
     df = df[df["confidence"].fillna(0) >= float(conf)]
+    if not (hashtag and hashtag.strip()) and not (search and search.strip()):
+        return df
+    lowered = (df["text"] if "text" in df.columns else texts(df.index.to_numpy())).str.lower()
     # Hashtag exact (case-insensitive)
     if hashtag and hashtag.strip():
         tag = hashtag.strip().lower()
-        df = df[df["text"].str.lower().str.contains(rf"(?<!\w){pd.re.escape(tag)}(?!\w)", regex=True, na=False)]
+        keep = lowered.str.contains(rf"(?<!\w){re.escape(tag)}(?!\w)", regex=True, na=False)
+        df, lowered = df[keep], lowered[keep]
     # Text search contains
     if search and search.strip():
         s = search.strip().lower()
-        df = df[df["text"].str.lower().str.contains(pd.re.escape(s), na=False)]
+        df = df[lowered.str.contains(re.escape(s), na=False)]
     return df
 
-@app.callback(
-    Output("row-kpis", "children"),
-    Output("ts-stacked", "figure"),
-    Output("pie-dist", "figure"),
-    Output("bar-hourly", "figure"),
-    Output("img-wordcloud", "src"),
-    Output("bar-hashtags", "figure"),
-    Output("bar-mentions", "figure"),
-    Output("table-tweets", "data"),
-    Input("interval-refresh", "n_intervals"),
-    Input("input-hashtag", "value"),
-    Input("input-search", "value"),
-    Input("slider-conf", "value"),
-    Input("date-range", "start_date"),
-    Input("date-range", "end_date"),
-    Input("radio-gran", "value"),
-)
-def update_dashboard(_, hashtag, search, conf, start_date, end_date, gran):
-    df = load_sentiment_csv(CSV_PATH)
-
-    # Apply filters
-    fdf = apply_filters(df, hashtag, search, conf, start_date, end_date)
-
-    # KPIs
-    total = len(fdf)
-    pos = (fdf["sentiment"] == "POSITIVE").sum()
-    neu = (fdf["sentiment"] == "NEUTRAL").sum()
-    neg = (fdf["sentiment"] == "NEGATIVE").sum()
-    avg_conf = fdf["confidence"].mean() if total else 0.0
-    rsi_now = compute_rsi(fdf)
-
-    kpis = dbc.Row([
+class RefreshContext:
+    """Inputs of one refresh. The filtered frame and the sentiment counts are
+    built on first use, so panels served from the memo cost nothing."""
+
+    def __init__(self, df, tokens, source, hashtag, search, conf, start_date, end_date, gran, generation=None,
+                 shared=False):
+        self.df = df
+        self.tokens = tokens
+        self.source = source
+        self.generation = generation
+        self.shared = shared  # df is the refresher's snapshot, which keeps the indexes in step
+        self.rollup, self.terms, self.index = indexes_for(source)
+        self.hashtag, self.search, self.conf = hashtag, search, conf
+        self.start_date, self.end_date, self.gran = start_date, end_date, gran
+        # Without text filters, counts come from the per-minute rollup
+        self.use_rollup = (not (hashtag and hashtag.strip()) and not (search and search.strip())
+                           and MinuteRollup.threshold_bin(conf) is not None)
+        self._fdf = None
+        self._counts = None
+
+    @property
+    def fdf(self) -> pd.DataFrame:
+        if self._fdf is None:
+            index = None
+            if (self.hashtag or "").strip() or (self.search or "").strip():
+                # Built on the first text query, then only new rows are indexed. On
+                # the refresher's snapshot only the refresher syncs it; until it has,
+                # filter_with_index sees the row count differ and scans instead.
+                if self.shared:
+                    _refresher.want_index()
+                else:
+                    self.index.sync(self.df, self.generation, self.tokens, self.source.texts)
+                index = self.index
+            self._fdf = apply_filters(self.df, self.hashtag, self.search, self.conf,
+                                      self.start_date, self.end_date, index=index, texts=self.source.texts)
+        return self._fdf
+
+    def text(self, frame: pd.DataFrame) -> pd.Series:
+        """Text of rows of ``df`` (loaded from disk when the frame has no text column)."""
+        return frame["text"] if "text" in frame.columns else self.source.texts(frame.index.to_numpy())
+
+    def counts(self):
+        """(total, positive, neutral, negative, mean confidence)"""
+        if self._counts is None:
+            if self.use_rollup:
+                totals = self.rollup.totals(self.conf, self.start_date, self.end_date)
+                self._counts = (totals["TOTAL"],) + tuple(
+                    totals.get(s, 0) for s in ("POSITIVE", "NEUTRAL", "NEGATIVE")) + (totals["AVG_CONF"],)
+            else:
+                fdf = self.fdf
+                total = len(fdf)
+                self._counts = (
+                    total,
+                    (fdf["sentiment"] == "POSITIVE").sum(),
+                    (fdf["sentiment"] == "NEUTRAL").sum(),
+                    (fdf["sentiment"] == "NEGATIVE").sum(),
+                    fdf["confidence"].mean() if total else 0.0,
+                )
+        return self._counts
+
+# ---------- Panels ----------
+def panel_kpis(ctx: RefreshContext):
+    total, pos, neu, neg, avg_conf = ctx.counts()
+    return dbc.Row([
         dbc.Col(kpi_card("Total Tweets", f"{total:,}"), md=3),
         dbc.Col(kpi_card("Positive", f"{(pos/total*100 if total else 0):.1f}%", f"{pos} tweets"), md=3),
         dbc.Col(kpi_card("Neutral", f"{(neu/total*100 if total else 0):.1f}%", f"{neu} tweets"), md=3),
         dbc.Col(kpi_card("Negative", f"{(neg/total*100 if total else 0):.1f}%", f"{neg} tweets"), md=3),
     ], className="g-3")
 
-    # Time series
-    agg = aggregate_time(fdf, freq=gran)
+def panel_timeseries(ctx: RefreshContext):
+    if ctx.use_rollup:
+        agg = ctx.rollup.aggregate(ctx.gran, ctx.conf, ctx.start_date, ctx.end_date)
+    else:
+        agg = aggregate_time(ctx.fdf, freq=ctx.gran)
     ts_traces = []
     for snt in SENTIMENT_ORDER:
         if snt in agg.columns:
             ts_traces.append(go.Bar(
-                x=agg.index, y=agg[snt], name=snt, marker_color=SENTIMENT_COLORS[snt], opacity=0.9
+                x=agg.index, y=agg[snt].tolist(), name=snt, marker_color=SENTIMENT_COLORS[snt], opacity=0.9
             ))
-    # RSI overlay
+    # RSI overlay (y as plain lists so figure_patch can update single points)
     ts_traces.append(go.Scatter(
-        x=agg.index, y=agg["RSI"], name="Rolling Sentiment Index",
+        x=agg.index, y=agg["RSI"].tolist() if "RSI" in agg.columns else [], name="Rolling Sentiment Index",
         mode="lines", line={"width":2, "dash":"solid"}, yaxis="y2"
     ))
     ts_layout = go.Layout(
@@ -286,67 +418,538 @@ def update_dashboard(_, hashtag, search, conf, start_date, end_date, gran):
         legend={"orientation":"h"},
         margin={"t":40, "l":50, "r":50, "b":40},
     )
-    fig_ts = go.Figure(data=ts_traces, layout=ts_layout)
+    return go.Figure(data=ts_traces, layout=ts_layout)
 
-    # Pie distribution
-    pie_vals = [neg, neu, pos]
+def panel_pie(ctx: RefreshContext):
+    _, pos, neu, neg, _ = ctx.counts()
     pie_fig = go.Figure(data=[go.Pie(
-        labels=SENTIMENT_ORDER, values=[neg, neu, pos],
+        labels=SENTIMENT_ORDER, values=[int(neg), int(neu), int(pos)],
         marker={"colors":[SENTIMENT_COLORS[c] for c in SENTIMENT_ORDER]},
         hole=0.35
     )])
     pie_fig.update_layout(title="Sentiment Distribution", margin={"t":40, "l":20, "r":20, "b":20})
+    return pie_fig
 
-    # Hourly bar (based on filtered df)
-    if not fdf.empty:
-        hour_counts = (fdf.set_index("timestamp")
-                         .groupby(fdf["timestamp"].dt.floor("H"))
-                         .size())
-        fig_hour = go.Figure(data=[go.Bar(x=hour_counts.index, y=hour_counts.values)])
+def panel_hourly(ctx: RefreshContext):
+    if ctx.use_rollup:
+        hour_counts = ctx.rollup.hourly(ctx.conf, ctx.start_date, ctx.end_date)
+    elif not ctx.fdf.empty:
+        hour_counts = ctx.fdf.groupby(ctx.fdf["timestamp"].dt.floor("h")).size()
+    else:
+        hour_counts = pd.Series(dtype="int64")
+    if not hour_counts.empty:
+        fig_hour = go.Figure(data=[go.Bar(x=hour_counts.index, y=hour_counts.tolist())])
         fig_hour.update_layout(title="Tweets per Hour", xaxis_title="Hour (UTC)", yaxis_title="Tweets")
     else:
         fig_hour = go.Figure()
         fig_hour.update_layout(title="Tweets per Hour")
-
-    # Word cloud
-    wc_src = wordcloud_image(fdf["text"]) if not fdf.empty else wordcloud_image(pd.Series([""]))
-
-    # Top hashtags / mentions
-    def _bar_for(df_counts, title):
-        if df_counts.empty:
-            fig = go.Figure(); fig.update_layout(title=title)
-            return fig
-        fig = go.Figure(data=[go.Bar(x=df_counts["token"], y=df_counts["count"])])
-        fig.update_layout(title=title, xaxis_tickangle=-30, margin={"b":80})
+    return fig_hour
+
+def panel_wordcloud(ctx: RefreshContext):
+    if ctx.use_rollup:
+        _ensure_stopwords()
+        return render_wordcloud(ctx.terms.counts(ctx.conf, ctx.start_date, ctx.end_date))
+    fdf = ctx.fdf
+    return wordcloud_image(ctx.text(fdf)) if not fdf.empty else wordcloud_image(pd.Series([""]))
+
+def _bar_for(df_counts, title):
+    if df_counts.empty:
+        fig = go.Figure(); fig.update_layout(title=title)
         return fig
+    fig = go.Figure(data=[go.Bar(x=df_counts["token"].tolist(), y=df_counts["count"].tolist())])
+    fig.update_layout(title=title, xaxis_tickangle=-30, margin={"b":80})
+    return fig
+
+def _token_counts(ctx, col):
+    # Tokens of the filtered rows, straight from the flat table
+    flat = ctx.tokens[col]
+    selected = np.zeros(len(ctx.df), dtype=bool)
+    selected[ctx.df.index.get_indexer(ctx.fdf.index)] = True
+    return rank_tokens(flat["token"][selected[flat["row"].to_numpy()]])
+
+def panel_hashtags(ctx: RefreshContext):
+    return _bar_for(_token_counts(ctx, "hashtags"), "Top Hashtags")
+
+def panel_mentions(ctx: RefreshContext):
+    return _bar_for(_token_counts(ctx, "mentions"), "Top Mentions")
+
+# ---------- Table ----------
+TABLE_COLUMNS = ["timestamp", "sentiment", "confidence", "text"]
+# One clause of a DataTable filter_query: {column} [s|i]op value
+FILTER_CLAUSE_RE = re.compile(
+    r"\{(?P<col>[^}]+)\}\s*[si]?(?P<op>>=|<=|!=|=|<|>|(?:ge|le|lt|gt|ne|eq|contains|datestartswith)(?=\s))"
+    r"\s*(?P<value>.*)$")
+FILTER_SYMBOLS = {">=": "ge", "<=": "le", "<": "lt", ">": "gt", "!=": "ne", "=": "eq"}
+_COMPARE = {"ge": "__ge__", "le": "__le__", "lt": "__lt__", "gt": "__gt__", "ne": "__ne__", "eq": "__eq__"}
+
+_table_orders = OrderedDict()  # (version, filters, sort, query) -> row positions in display order
+_table_lock = threading.Lock()
+
+def split_filter_part(filter_part):
+    """'{col} op value' -> (col, op, value); (None, None, None) if unparsable."""
+    m = FILTER_CLAUSE_RE.match(filter_part.strip())
+    if not m:
+        return None, None, None
+    op = FILTER_SYMBOLS.get(m["op"], m["op"])
+    value = m["value"].strip()
+    if len(value) > 1 and value[0] == value[-1] and value[0] in ("'", '"', "`"):
+        value = value[1:-1].replace("\\" + value[0], value[0])
+    else:
+        try:
+            value = float(value)
+        except ValueError:
+            pass
+    return m["col"], op, value
+
+def _filter_mask(col, op, value, values: pd.Series) -> pd.Series:
+    if col == "timestamp":
+        if op == "datestartswith":
+            return values.dt.strftime("%Y-%m-%d %H:%M:%S").str.startswith(str(value), na=False)
+        try:
+            value = pd.Timestamp(str(value))
+        except ValueError:
+            return pd.Series(False, index=values.index)
+        value = value.tz_localize("UTC") if value.tzinfo is None else value
+    elif col == "confidence":
+        values = values.astype("float64")
+    else:
+        # sentiment / text: case-insensitive
+        values = values.astype(object).str.lower()
+        value = str(value).lower()
+        if op == "contains":
+            return values.str.contains(value, regex=False, na=False)
+    if op not in _COMPARE:
+        return pd.Series(True, index=values.index)
+    if col == "confidence" and not isinstance(value, float):
+        return pd.Series(False, index=values.index)
+    return getattr(values, _COMPARE[op])(value).fillna(False).astype(bool)
+
+def table_order(ctx: RefreshContext, version, sort_by, filter_query) -> np.ndarray:
+    """Positions of the filtered rows that pass ``filter_query``, in ``sort_by``
+    order (default: most recent first). Cached per data version and query, so
+    paging through the same view only slices this array."""
+    key = (version, (ctx.hashtag, ctx.search, ctx.conf, ctx.start_date, ctx.end_date),
+           repr(sort_by), filter_query or "")
+    with _table_lock:
+        if key in _table_orders:
+            _table_orders.move_to_end(key)
+            return _table_orders[key]
+    fdf = ctx.fdf[["timestamp", "sentiment", "confidence"]]
+    text = None
+    for part in (filter_query or "").split(" && "):
+        col, op, value = split_filter_part(part)
+        if col not in TABLE_COLUMNS or fdf.empty:
+            continue
+        if col == "text":
+            text = ctx.text(fdf) if text is None else text
+            keep = _filter_mask(col, op, value, text).to_numpy()
+            text = text[keep]
+        else:
+            keep = _filter_mask(col, op, value, fdf[col]).to_numpy()
+        fdf = fdf[keep]
+
+    sort = (sort_by or [{"column_id": "timestamp", "direction": "desc"}])[0]
+    col, ascending = sort["column_id"], sort["direction"] == "asc"
+    if col == "text":
+        values = (ctx.text(fdf) if text is None else text).astype(object)
+    elif col in fdf.columns:
+        values = fdf[col]
+    else:
+        values = fdf["timestamp"]
+    order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+
+    with _table_lock:
+        _table_orders[key] = order
+        while len(_table_orders) > TABLE_ORDER_CACHE:
+            _table_orders.popitem(last=False)
+    return order
+
+def table_page(ctx: RefreshContext, rows: np.ndarray):
+    """Records for one page of rows; only these rows' text is read."""
+    page = ctx.df.iloc[rows][["timestamp", "sentiment", "confidence"]]
+    page["text"] = ctx.text(page)
+    # Confidence stays 0-1: the column's percentage format does the x100
+    page["confidence"] = page["confidence"].astype("float64").fillna(0).round(4)
+    return page.to_dict("records")
+
+# (name, builder, depends on granularity) in callback output order
+PANELS = [
+    ("kpis", panel_kpis, False),
+    ("timeseries", panel_timeseries, True),
+    ("pie", panel_pie, False),
+    ("hourly", panel_hourly, False),
+    ("wordcloud", panel_wordcloud, False),
+    ("hashtags", panel_hashtags, False),
+    ("mentions", panel_mentions, False),
+]
+
+# ---------- Memo ----------
+MEMO_SIZE = 128
+REFRESH_SECONDS = metrics.histogram("dashboard_refresh_seconds", "update_dashboard callback latency")
+PANEL_SECONDS = metrics.histogram("dashboard_panel_seconds", "Time to build one dashboard output", ["panel"])
+PANEL_RESULTS = metrics.counter("dashboard_panel_results_total",
+                                "Dashboard outputs per refresh: built, served from the memo, or unchanged; "
+                                "patched counts outputs sent as a dash.Patch",
+                                ["panel", "result"])
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+def _memo_get(key):
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    return None
+
+def _memo_put(key, value):
+    with _memo_lock:
+        _memo[key] = value
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+
+def _render_key(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+# ---------- Patches ----------
+PATCH_MAX_CHANGED = 0.5  # share of an array's points above which it is resent whole
+
+def figure_patch(old, new):
+    """dash.Patch turning figure ``old`` into ``new``, point by point: changed
+    points of x/y/... arrays are assigned, points past the old end appended.
+    Both are compared in their JSON form, as the browser holds them. Returns
+    None when the layout or traces differ (send the whole figure) and
+    dash.no_update when nothing changed."""
+    if not isinstance(old, go.Figure) or not isinstance(new, go.Figure):
+        return None
+    old, new = json.loads(old.to_json()), json.loads(new.to_json())
+    if old["layout"] != new["layout"] or len(old["data"]) != len(new["data"]):
+        return None
+    patch, ops = dash.Patch(), 0
+    for i, (old_trace, new_trace) in enumerate(zip(old["data"], new["data"])):
+        if old_trace.keys() != new_trace.keys():
+            return None
+        for attr, value in new_trace.items():
+            before = old_trace[attr]
+            if before == value:
+                continue
+            if isinstance(before, list) and isinstance(value, list) and len(value) >= len(before):
+                changed = [j for j, (a, b) in enumerate(zip(before, value)) if a != b]
+                if len(changed) <= PATCH_MAX_CHANGED * len(value):
+                    for j in changed:
+                        patch["data"][i][attr][j] = value[j]
+                    if len(value) > len(before):
+                        patch["data"][i][attr].extend(value[len(before):])
+                    ops += len(changed) + 1
+                    continue
+            patch["data"][i][attr] = value
+            ops += 1
+    return patch if ops else dash.no_update
+
+def _patch_for(name, old_key, key, value):
+    """Patch from what the client shows (``old_key``) to ``value``, if it only
+    differs in data version: same filters and granularity, old figure still
+    in the memo. Patches are memoized, so clients on the same version share one."""
+    if not config.DASHBOARD_PATCH_FIGURES or not old_key or old_key.split(".")[0] != key.split(".")[0]:
+        return None
+    patch = _memo_get(("patch", old_key, key))
+    if patch is None:
+        old = _memo_get(old_key)
+        if old is None:
+            return None
+        patch = figure_patch(old, value)
+        if patch is None:
+            return None
+        _memo_put(("patch", old_key, key), patch)
+    PANEL_RESULTS.inc(panel=name, result="patched")
+    return patch
 
-    bar_hashtags = _bar_for(
-        (fdf.assign(x=1)
-            .explode("hashtags")
-            .dropna(subset=["hashtags"])
-            .groupby("hashtags")["x"].count()
-            .sort_values(ascending=False).head(15)
-            .reset_index().rename(columns={"hashtags":"token","x":"count"})),
-        "Top Hashtags"
-    )
-
-    bar_mentions = _bar_for(
-        (fdf.assign(x=1)
-            .explode("mentions")
-            .dropna(subset=["mentions"])
-            .groupby("mentions")["x"].count()
-            .sort_values(ascending=False).head(15)
-            .reset_index().rename(columns={"mentions":"token","x":"count"})),
-        "Top Mentions"
-    )
-
-    # Table data (most recent first)
-    table_df = fdf.sort_values("timestamp", ascending=False)\
-                  .head(100)[["timestamp","sentiment","confidence","text"]]
-    # Confidence 0-1 to 0-100%
-    table_df["confidence"] = (table_df["confidence"].fillna(0) * 100).round(1)
+@app.callback(
+    Output("row-kpis", "children"),
+    Output("ts-stacked", "figure"),
+    Output("pie-dist", "figure"),
+    Output("bar-hourly", "figure"),
+    Output("img-wordcloud", "src"),
+    Output("bar-hashtags", "figure"),
+    Output("bar-mentions", "figure"),
+    Output("store-rendered", "data"),
+    Input("interval-refresh", "n_intervals"),
+    Input("store-push", "data"),
+    Input("input-hashtag", "value"),
+    Input("input-search", "value"),
+    Input("slider-conf", "value"),
+    Input("date-range", "start_date"),
+    Input("date-range", "end_date"),
+    Input("radio-gran", "value"),
+    State("store-rendered", "data"),
+)
+def update_dashboard(_, _push, hashtag, search, conf, start_date, end_date, gran, rendered):
+    with REFRESH_SECONDS.time():
+        return _update_dashboard(hashtag, search, conf, start_date, end_date, gran, rendered)
+
+def _update_dashboard(hashtag, search, conf, start_date, end_date, gran, rendered, quiet=False):
+    with _refresher.view(start_date, end_date, conf) as (snap, shared):
+        return _build_dashboard(snap, shared, hashtag, search, conf, start_date, end_date, gran, rendered, quiet)
+
+def _build_dashboard(snap, shared, hashtag, search, conf, start_date, end_date, gran, rendered, quiet):
+    df, tokens, source, generation, version = snap
+    rendered = rendered or {}
+
+    # Each panel is keyed by the filters it depends on and the data version
+    # ("<filters>.<version>"); panels whose key matches what this client
+    # already shows are skipped, figures whose filters match are patched.
+    filters = (hashtag, search, conf, start_date, end_date)
+    data_key = _render_key(version)
+    keys = {name: _render_key(name, filters, gran if by_gran else None) + "." + data_key
+            for name, _, by_gran in PANELS}
+    if all(rendered.get(name) == key for name, key in keys.items()):
+        for name in keys:
+            PANEL_RESULTS.inc(panel=name, result="unchanged")
+        return (dash.no_update,) * (len(PANELS) + 1)
+
+    ctx = RefreshContext(df, tokens, source, hashtag, search, conf, start_date, end_date, gran, generation, shared)
+    if not shared:
+        ctx.rollup.sync(df, generation)
+        ctx.terms.sync(df, generation, source.texts)
+    outputs, timings = [], []
+    for name, build, _ in PANELS:
+        key = keys[name]
+        if rendered.get(name) == key:
+            PANEL_RESULTS.inc(panel=name, result="unchanged")
+            outputs.append(dash.no_update)
+            continue
+        value = _memo_get(key)
+        if value is None:
+            t0 = time.perf_counter()
+            value = build(ctx)
+            elapsed = time.perf_counter() - t0
+            PANEL_SECONDS.observe(elapsed, panel=name)
+            PANEL_RESULTS.inc(panel=name, result="built")
+            timings.append(f"{name}={elapsed * 1000:.1f}ms")
+            _memo_put(key, value)
+        else:
+            PANEL_RESULTS.inc(panel=name, result="memo")
+        patch = _patch_for(name, rendered.get(name), key, value)
+        outputs.append(value if patch is None else patch)
+    if timings and not quiet:
+        print(f"[DASH] recomputed {' '.join(timings)}")
+
+    return (*outputs, keys)
 
-    return kpis, fig_ts, pie_fig, fig_hour, wc_src, bar_hashtags, bar_mentions, table_df.to_dict("records")
+@app.callback(
+    Output("table-tweets", "data"),
+    Output("table-tweets", "page_count"),
+    Output("table-tweets", "page_current"),
+    Output("store-table-rendered", "data"),
+    Input("interval-refresh", "n_intervals"),
+    Input("store-push", "data"),
+    Input("input-hashtag", "value"),
+    Input("input-search", "value"),
+    Input("slider-conf", "value"),
+    Input("date-range", "start_date"),
+    Input("date-range", "end_date"),
+    Input("table-tweets", "page_current"),
+    Input("table-tweets", "page_size"),
+    Input("table-tweets", "sort_by"),
+    Input("table-tweets", "filter_query"),
+    State("store-table-rendered", "data"),
+)
+def update_table(_, _push, hashtag, search, conf, start_date, end_date, page, page_size, sort_by, filter_query,
+                 rendered):
+    with _refresher.view(start_date, end_date, conf) as (snap, shared):
+        return _build_table(snap, shared, hashtag, search, conf, start_date, end_date, page, page_size, sort_by,
+                            filter_query, rendered)
+
+def _build_table(snap, shared, hashtag, search, conf, start_date, end_date, page, page_size, sort_by,
+                 filter_query, rendered):
+    df, tokens, source, generation, version = snap
+    page, page_size = int(page or 0), int(page_size or TABLE_PAGE_SIZE)
+    key = _render_key("table", version, (hashtag, search, conf, start_date, end_date),
+                      page, page_size, sort_by, filter_query)
+    if rendered == key:
+        PANEL_RESULTS.inc(panel="table", result="unchanged")
+        return (dash.no_update,) * 4
+    value = _memo_get(key)
+    if value is None:
+        t0 = time.perf_counter()
+        ctx = RefreshContext(df, tokens, source, hashtag, search, conf, start_date, end_date, None, generation,
+                             shared)
+        order = table_order(ctx, version, sort_by, filter_query)
+        page_count = max(1, math.ceil(len(order) / page_size))
+        shown = min(page, page_count - 1)  # the view shrank under the current page
+        value = (table_page(ctx, order[shown * page_size:(shown + 1) * page_size]), page_count, shown)
+        PANEL_SECONDS.observe(time.perf_counter() - t0, panel="table")
+        PANEL_RESULTS.inc(panel="table", result="built")
+        _memo_put(key, value)
+    else:
+        PANEL_RESULTS.inc(panel="table", result="memo")
+    data, page_count, shown = value
+    return data, page_count, shown if shown != page else dash.no_update, key
+
+# ---------- Push ----------
+PUSH_CLIENTS = metrics.gauge("dashboard_push_clients", "Browser tabs connected to /events")
+PUSH_EVENTS = metrics.counter("dashboard_push_events_total", "Data changes pushed to /events subscribers")
+
+class Refresher:
+    """One background thread that owns loading for the dashboard.
+
+    Every DASHBOARD_REFRESH_SECONDS it loads the base frame; when the data
+    version changed it keeps the result as the shared snapshot, builds the
+    DEFAULT_VIEW panels, patches from the previous version and first table
+    page into the memo, then wakes /events subscribers. Tabs re-render on
+    the push and find the default view already built; tabs with their own
+    filters are computed from the same snapshot, without loading again.
+    Started by the first /events subscriber.
+
+    The refresher is the only writer of the rollup, term and search
+    indexes for that snapshot (see indexes_for): it syncs them and publishes
+    the snapshot together while no callback is reading, so a callback always
+    sees the indexes at its snapshot's version. In archive mode the snapshot
+    only covers DEFAULT_VIEW's window and comes from the refresher's own
+    reader; tabs on other windows load theirs from the shared reader, each
+    with private indexes, and never change the refresher's version.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.snapshot = None  # load_base() result: (frame, tokens, source, generation, version)
+        self.seq = 0  # bumped once per data change
+        self._keys = None
+        self._table_key = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._index_wanted = False  # a text query ran: keep the search index synced too
+        self._state = threading.Condition()  # readers/writer guard for the shared indexes
+        self._readers = 0
+        self._writing = False
+
+    def ensure_started(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="dashboard-refresher", daemon=True)
+                self._thread.start()
+
+    @contextlib.contextmanager
+    def view(self, start_date, end_date, conf):
+        """Yield (load_base result, shared). When the snapshot covers the request
+        (CSV source, or the refresher's own archive window) it is served with
+        shared=True, and its indexes stay at its version until the block
+        exits. Otherwise the caller loads its own frame and syncs that
+        frame's indexes itself."""
+        with self._reading():
+            snap = self.snapshot
+            if snap is not None and (snap[3][0] == "csv" or _is_default_window(start_date, end_date, conf)):
+                yield snap, True
+                return
+        yield load_base(start_date, end_date, conf), False
+
+    def want_index(self):
+        self._index_wanted = True
+
+    @contextlib.contextmanager
+    def _reading(self):
+        with self._state:
+            self._state.wait_for(lambda: not self._writing)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._state:
+                self._readers -= 1
+                self._state.notify_all()
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        # A waiting writer holds off new readers, so a busy dashboard can't starve it
+        with self._state:
+            self._state.wait_for(lambda: not self._writing)
+            self._writing = True
+            self._state.wait_for(lambda: self._readers == 0)
+        try:
+            yield
+        finally:
+            with self._state:
+                self._writing = False
+                self._state.notify_all()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh_once()
+            except Exception as e:
+                print(f"[REFRESH] failed: {type(e).__name__}: {e}")
+            time.sleep(self.interval)
+
+    def refresh_once(self) -> bool:
+        view = DEFAULT_VIEW
+        snap = load_base(view["start_date"], view["end_date"], view["conf"], refresher=True)
+        df, tokens, source, generation, version = snap
+        rollup, terms, index = indexes_for(source)
+        changed = self.snapshot is None or version != self.snapshot[4]
+        index_due = self._index_wanted and index.stale(len(df))
+        if not changed and not index_due:
+            return False
+        with self._exclusive():
+            rollup.sync(df, generation)
+            terms.sync(df, generation, source.texts)
+            if self._index_wanted:
+                index.sync(df, generation, tokens, source.texts)
+            self.snapshot = snap
+        if not changed:
+            return False
+        self._keys = _update_dashboard(view["hashtag"], view["search"], view["conf"], view["start_date"],
+                                       view["end_date"], view["gran"], self._keys, quiet=True)[-1]
+        self._table_key = update_table(None, None, view["hashtag"], view["search"], view["conf"],
+                                       view["start_date"], view["end_date"], 0, TABLE_PAGE_SIZE, [], "", None)[-1]
+        with self._cond:
+            self.seq += 1
+            self._cond.notify_all()
+        PUSH_EVENTS.inc()
+        return True
+
+    def wait(self, seq, timeout: float):
+        """Block until ``seq`` is out of date (or ``timeout``); returns the current seq."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq != seq, timeout)
+            return self.seq
+
+def _is_default_window(start_date, end_date, conf) -> bool:
+    view = DEFAULT_VIEW
+    return (start_date == view["start_date"] and end_date == view["end_date"]
+            and abs(float(conf or 0) - view["conf"]) < 1e-9)
+
+_refresher = Refresher(config.DASHBOARD_REFRESH_SECONDS)
+
+@app.server.route("/events")
+def events():
+    # Server-sent events: one "data: <seq>" message per data change, comments as keep-alives
+    if not config.DASHBOARD_PUSH:
+        return flask.Response("push disabled\n", status=404, mimetype="text/plain")
+    _refresher.ensure_started()
+
+    def stream():
+        PUSH_CLIENTS.inc()
+        try:
+            seq = None
+            while True:
+                current = _refresher.wait(seq, timeout=15)
+                if current == seq:
+                    yield ": keep-alive\n\n"
+                    continue
+                seq = current
+                yield f"data: {seq}\n\n"
+        finally:
+            PUSH_CLIENTS.inc(-1)
+    return flask.Response(stream(), mimetype="text/event-stream",
+                          headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Prometheus scrape target on the underlying Flask server
+@app.server.route("/metrics")
+def metrics_endpoint():
+    if not metrics.ENABLED:
+        return flask.Response("metrics disabled\n", status=404, mimetype="text/plain")
+    return flask.Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 if __name__ == "__main__":
     # Create folders if missing
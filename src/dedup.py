@@ -0,0 +1,203 @@
+# src/dedup.py
+"""Near-duplicate collapsing ahead of inference.
+
+Retweets ("RT @user: ..."), campaign spam and copies with different
+trailing URLs or mentions are the same text as far as sentiment goes.
+Each text is normalized (RT prefix, URLs and mentions stripped, case and
+whitespace folded), turned into a MinHash signature over byte shingles
+of its UTF-8 form, and matched to an existing cluster through LSH band buckets;
+a candidate only counts when the signatures agree on at least
+DEDUP_THRESHOLD of their positions (estimated Jaccard similarity).
+
+One representative per cluster (its first member, unmodified) is scored
+and the result fans out to every member, including later ones. Clusters
+not seen for DEDUP_WINDOW_SECONDS of tweet time (at most
+DEDUP_MAX_CLUSTERS of them) are forgotten, so memory stays bounded on an
+endless stream. Cluster ids are a 63-bit hash of the representative's
+normalized text, so they stay stable across restarts.
+"""
+import re
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+
+import numpy as np
+import pandas as pd
+
+from src import config, metrics
+
+RT_RE = re.compile(r"^(\s*rt\s+@\w+:?)+", re.IGNORECASE)
+URL_RE = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+MENTION_RE = re.compile(r"@\w+")
+SPACE_RE = re.compile(r"\s+")
+
+_PRIME = np.uint64(4294967311)  # first prime above 2**32: (a * x + b) stays below 2**64
+_MIX = np.uint64(0x9E3779B97F4A7C15)  # multiplicative hashing constant (wraps mod 2**64)
+
+DEDUP_TEXTS = metrics.counter("dedup_texts_total", "Texts through the dedup stage by outcome", ["result"])
+DEDUP_CLUSTERS = metrics.gauge("dedup_window_clusters", "Clusters held in the dedup window")
+
+def normalize(text) -> str:
+    text = "" if pd.isna(text) else str(text)
+    text = MENTION_RE.sub(" ", URL_RE.sub(" ", RT_RE.sub("", text)))
+    return SPACE_RE.sub(" ", text).strip().lower()
+
+def cluster_id(norm: str) -> int:
+    return int.from_bytes(blake2b(norm.encode("utf-8"), digest_size=8).digest(), "big") >> 1
+
+class _Cluster:
+    __slots__ = ("id", "signature", "norm", "rep", "result", "last_seen")
+
+    def __init__(self, norm, rep, signature, now):
+        self.id = cluster_id(norm)
+        self.norm = norm
+        self.rep = rep
+        self.signature = signature
+        self.result = None
+        self.last_seen = now
+
+class NearDuplicateIndex:
+    """MinHash/LSH clusters over a sliding window of tweet time."""
+
+    def __init__(self, num_perm=None, bands=None, threshold=None, shingle=None,
+                 window_seconds=None, max_clusters=None, seed=1):
+        self.num_perm = num_perm or config.DEDUP_NUM_PERM
+        self.bands = bands or config.DEDUP_BANDS
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm {self.num_perm} is not a multiple of bands {self.bands}")
+        self.rows = self.num_perm // self.bands
+        self.threshold = config.DEDUP_THRESHOLD if threshold is None else threshold
+        self.shingle = shingle or config.DEDUP_SHINGLE
+        if not 1 <= self.shingle <= 8:
+            raise ValueError("shingle must be 1..8 bytes")
+        self.window = config.DEDUP_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.max_clusters = max_clusters or config.DEDUP_MAX_CLUSTERS
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 32, self.num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, 2 ** 32, self.num_perm, dtype=np.uint64)[:, None]
+        self._clusters = OrderedDict()  # id -> _Cluster, least recently seen first
+        self._exact = {}    # normalized text -> cluster id
+        self._buckets = {}  # hash of (band, band rows) -> ids of the clusters in that bucket
+        self._clock = None  # newest tweet time seen
+        self.stats = {"texts": 0, "scored": 0, "clusters": 0, "evicted": 0}
+
+    def signature(self, norm: str) -> np.ndarray:
+        # Each k-byte shingle packed into one integer, mixed down to 32 bits,
+        # then min over num_perm hash functions (a * x + b) mod prime.
+        k = self.shingle
+        data = np.frombuffer(norm.encode("utf-8").ljust(k, b"\0"), dtype=np.uint8).astype(np.uint64)
+        n = len(data) - k + 1
+        grams = data[:n].copy()
+        for j in range(1, k):
+            grams |= data[j:j + n] << np.uint64(8 * j)
+        x = (grams * _MIX) >> np.uint64(32)
+        return ((self._a * x + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig):
+        rows = sig.reshape(self.bands, self.rows)
+        return [hash((band, rows[band].tobytes())) for band in range(self.bands)]
+
+    def _match(self, sig, keys):
+        best, best_sim = None, self.threshold
+        checked = set()
+        for key in keys:
+            for cid in self._buckets.get(key, ()):
+                if cid in checked:
+                    continue
+                checked.add(cid)
+                cluster = self._clusters.get(cid)
+                if cluster is None:
+                    continue
+                sim = float(np.mean(cluster.signature == sig))
+                if sim > best_sim or (sim == best_sim and best is None):
+                    best, best_sim = cluster, sim
+        return best
+
+    def _touch(self, cluster, now):
+        cluster.last_seen = max(cluster.last_seen, now)
+        self._clusters.move_to_end(cluster.id)
+
+    def assign(self, text, now) -> _Cluster:
+        """The cluster ``text`` belongs to, created if it has none."""
+        norm = normalize(text)
+        cluster = self._clusters.get(self._exact.get(norm))
+        if cluster is None:
+            sig = self.signature(norm)
+            keys = self._band_keys(sig)
+            cluster = self._match(sig, keys)
+            if cluster is None:
+                cluster = _Cluster(norm, "" if pd.isna(text) else str(text), sig, now)
+                # Same normalized text as an evicted cluster: reuse the id slot
+                self._clusters.pop(cluster.id, None)
+                self._clusters[cluster.id] = cluster
+                self._exact[norm] = cluster.id
+                for key in keys:
+                    self._buckets.setdefault(key, set()).add(cluster.id)
+                self.stats["clusters"] += 1
+        self._touch(cluster, now)
+        return cluster
+
+    def expire(self):
+        """Drop clusters older than the window, and the oldest past max_clusters."""
+        horizon = None if self._clock is None or not self.window else self._clock - self.window
+        while self._clusters:
+            cluster = next(iter(self._clusters.values()))
+            if len(self._clusters) <= self.max_clusters and (horizon is None or cluster.last_seen >= horizon):
+                break
+            self._evict(cluster)
+        DEDUP_CLUSTERS.set(len(self._clusters))
+
+    def _evict(self, cluster):
+        del self._clusters[cluster.id]
+        if self._exact.get(cluster.norm) == cluster.id:
+            del self._exact[cluster.norm]
+        for key in self._band_keys(cluster.signature):
+            ids = self._buckets.get(key)
+            if ids is not None:
+                ids.discard(cluster.id)
+                if not ids:
+                    del self._buckets[key]
+        self.stats["evicted"] += 1
+
+    def score(self, texts, timestamps=None, score=None):
+        """Score one representative per cluster and fan the results out.
+
+        ``score(texts)`` returns a tuple of per-text lists (default
+        src.sentiment.score_texts: labels, scores); the same lists come
+        back for ``texts`` followed by their cluster ids.
+        """
+        if score is None:
+            from src.sentiment import score_texts as score
+        if not len(texts):
+            return (*score([]), [])
+        if timestamps is None:
+            now = np.full(len(texts), time.time())
+        else:
+            ts = pd.to_datetime(pd.Series(list(timestamps)), errors="coerce", utc=True)
+            now = (ts - pd.Timestamp(0, tz="UTC")).dt.total_seconds().fillna(time.time()).to_numpy()
+        if len(now):
+            self._clock = max(self._clock or now.max(), now.max())
+
+        clusters = [self.assign(t, when) for t, when in zip(texts, now.tolist())]
+        todo = list({id(c): c for c in clusters if c.result is None}.values())
+        if todo:
+            results = score([c.rep for c in todo])
+            for i, c in enumerate(todo):
+                c.result = tuple(r[i] for r in results)
+        self.expire()
+
+        n = len(texts)
+        self.stats["texts"] += n
+        self.stats["scored"] += len(todo)
+        DEDUP_TEXTS.inc(len(todo), result="scored")
+        DEDUP_TEXTS.inc(n - len(todo), result="fanned_out")
+        fanned = tuple([c.result[k] for c in clusters] for k in range(len(clusters[0].result)))
+        return (*fanned, [c.id for c in clusters])
+
+    def __len__(self):
+        return len(self._clusters)
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Share of texts answered without their own model call."""
+        return 1 - self.stats["scored"] / self.stats["texts"] if self.stats["texts"] else 0.0
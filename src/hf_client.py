@@ -0,0 +1,214 @@
+# src/hf_client.py
+import asyncio
+import json
+import random
+import threading
+import time
+
+import aiohttp
+
+from src import config, metrics
+from src.cache import get_cache
+
+HF_RESPONSES = metrics.counter("hf_api_responses_total", "Inference API responses by HTTP status", ["status"])
+HF_RETRIES = metrics.counter("hf_api_retries_total", "Inference API batch retries")
+HF_SECONDS = metrics.histogram("hf_api_request_seconds", "Inference API request latency")
+
+def normalize_label(raw_label: str) -> str:
+    map_3 = {"POS": "Positive", "NEG": "Negative", "NEU": "Neutral"}
+    if raw_label in map_3:
+        return map_3[raw_label]
+    if raw_label.upper().startswith("LABEL_"):
+        idx = int(raw_label.split("_")[-1])
+        return ["Negative", "Neutral", "Positive"][idx] if idx in (0, 1, 2) else "Neutral"
+    u = raw_label.upper()
+    if "POS" in u: return "Positive"
+    if "NEG" in u: return "Negative"
+    if "NEU" in u: return "Neutral"
+    return raw_label
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests/second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class HFInferenceClient:
+    """Pooled, rate-limited async client for the HF Inference API.
+
+    Texts are sent ``batch_size`` at a time (the endpoint accepts a list of
+    inputs), at most ``concurrency`` requests are in flight, and 429/503
+    responses are retried with jittered exponential backoff on the event
+    loop instead of sleeping the caller's thread.
+    """
+
+    def __init__(self, api_url, api_token, model_id, batch_size=None, concurrency=None,
+                 rate=None, burst=None, retries=None, timeout=30, backoff=1.0, max_backoff=30.0):
+        self.api_url = api_url
+        self.model_id = model_id
+        self.headers = {"Authorization": f"Bearer {api_token}"}
+        self.batch_size = batch_size or config.HF_API_BATCH_SIZE
+        self.concurrency = concurrency or config.HF_API_CONCURRENCY
+        self.retries = retries or config.HF_API_RETRIES
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._rate = rate or config.HF_API_RATE
+        self._burst = burst or config.HF_API_BURST
+        self._session = None
+        self._bucket = None
+        self._semaphore = None
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "unavailable": 0, "failed_batches": 0}
+
+    async def _ensure_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self.timeout)
+            self._bucket = TokenBucket(self._rate, self._burst)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _sleep_for(self, attempt: int, retry_after=None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after) + random.uniform(0, self.backoff)
+            except ValueError:
+                pass
+        # Full jitter: spread retries out so concurrent batches don't re-collide
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _estimated_time(self, body) -> float:
+        # Cold model: the API reports how long loading will take
+        if isinstance(body, str):
+            try:
+                body = json.loads(body)
+            except ValueError:
+                return 0.0
+        if not isinstance(body, dict):
+            return 0.0
+        try:
+            return min(self.max_backoff, float(body.get("estimated_time") or 0)) + random.uniform(0, self.backoff)
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _parse(data, n: int):
+        if isinstance(data, list) and n == 1 and data and isinstance(data[0], dict):
+            data = [data]
+        if not isinstance(data, list) or len(data) != n:
+            return None
+        out = []
+        for candidates in data:
+            if not isinstance(candidates, list) or not candidates or \
+                    not all(isinstance(c, dict) for c in candidates):
+                out.append(("Error", 0.0, "Unexpected response format."))
+                continue
+            try:
+                best = max(candidates, key=lambda x: float(x.get("score", 0.0)))
+                out.append((normalize_label(str(best.get("label", ""))), float(best.get("score", 0.0)), None))
+            except (TypeError, ValueError):
+                out.append(("Error", 0.0, "Unexpected response format."))
+        return out
+
+    async def _post_batch(self, batch):
+        payload = {"inputs": batch, "options": {"wait_for_model": True, "use_cache": True}}
+        err = "Failed after retries."
+        for attempt in range(self.retries):
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self.stats["requests"] += 1
+                started = time.perf_counter()
+                try:
+                    async with self._session.post(self.api_url, json=payload) as resp:
+                        HF_RESPONSES.inc(status=resp.status)
+                        HF_SECONDS.observe(time.perf_counter() - started)
+                        if resp.status in (429, 503):
+                            self.stats["throttled" if resp.status == 429 else "unavailable"] += 1
+                            body = await resp.text()
+                            err = f"{resp.status}: {body}"
+                            delay = self._sleep_for(attempt, resp.headers.get("Retry-After"))
+                            if resp.status == 503:
+                                delay = max(delay, self._estimated_time(body))
+                        elif resp.status != 200:
+                            self.stats["failed_batches"] += 1
+                            return [("Error", 0.0, f"{resp.status}: {await resp.text()}")] * len(batch)
+                        else:
+                            try:
+                                data = await resp.json(content_type=None)
+                            except ValueError:  # 200 with a body that isn't JSON
+                                self.stats["failed_batches"] += 1
+                                return [("Error", 0.0, "Unexpected response format.")] * len(batch)
+                            if isinstance(data, dict) and "error" in data:
+                                err = str(data["error"])
+                                delay = max(self._sleep_for(attempt), self._estimated_time(data))
+                            else:
+                                parsed = self._parse(data, len(batch))
+                                if parsed is None:
+                                    self.stats["failed_batches"] += 1
+                                    return [("Error", 0.0, "Unexpected response format.")] * len(batch)
+                                return parsed
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    HF_RESPONSES.inc(status="error")
+                    err = f"Request failed: {e}"
+                    delay = self._sleep_for(attempt)
+            if attempt < self.retries - 1:
+                self.stats["retries"] += 1
+                HF_RETRIES.inc()
+                await asyncio.sleep(delay)
+        self.stats["failed_batches"] += 1
+        return [("Error", 0.0, err)] * len(batch)
+
+    async def analyze_many(self, texts, on_batch=None):
+        """Return a list of (label, score, error) aligned with ``texts``."""
+        await self._ensure_session()
+        cache = get_cache()
+        cached = cache.get_many(texts, self.model_id)
+        todo = list(dict.fromkeys(t for t, hit in zip(texts, cached) if hit is None))
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+
+        fresh = {}
+        async def run(batch):
+            results = await self._post_batch(batch)
+            ok = [(t, (label, score)) for t, (label, score, e) in zip(batch, results) if e is None]
+            if ok:
+                cache.put_many([t for t, _ in ok], [r for _, r in ok], self.model_id)
+            fresh.update(zip(batch, results))
+            if on_batch is not None:
+                on_batch(len(batch))
+        await asyncio.gather(*(run(b) for b in batches))
+
+        return [(hit[0], hit[1], None) if hit is not None else fresh[t] for t, hit in zip(texts, cached)]
+
+class BackgroundLoop:
+    """An event loop on a daemon thread, so sync callers (Streamlit) can share
+    one pooled client across reruns without blocking on its retries."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="hf-client-loop", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
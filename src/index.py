@@ -0,0 +1,159 @@
+# src/index.py
+import re
+import threading
+from array import array
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+HASHTAG_TOKEN_RE = re.compile(r"#\w+")
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TweetIndex:
+    """Posting lists from hashtags, mentions and text trigrams to row positions.
+
+    Built incrementally with ``sync(frame, generation, tokens)`` (as
+    MinuteRollup). Lookups return sorted candidate row positions that are a
+    superset of the true matches; callers verify the candidates, so the
+    work done depends on how many rows match rather than on corpus size.
+
+    Postings are int32 row positions. Hashtag and mention postings come
+    from the token tables; the trigram postings need every row's text (a
+    read back from the CSV in lazy-text mode) and take ~100 entries per
+    tweet, so they are only built once a substring lookup has asked for
+    them (or up front with ``trigrams=True``). Until then
+    ``substring_rows`` returns None and callers scan.
+    """
+
+    def __init__(self, trigrams: bool = False):
+        self.trigrams_wanted = trigrams
+        self._reset(None)
+        self._lock = threading.Lock()
+
+    def _reset(self, generation):
+        self.hashtags = defaultdict(lambda: array("i"))
+        self.mentions = defaultdict(lambda: array("i"))
+        self.trigrams = defaultdict(lambda: array("i"))
+        self._rows_seen = 0
+        self._trigram_rows = 0
+        self._generation = generation
+
+    def sync(self, frame: pd.DataFrame, generation=None, tokens=None, texts=None):
+        """``tokens`` are the frame's hashtag/mention tables (src.utils.token_tables);
+        ``texts(rows)`` supplies the text of new rows when the frame has no text
+        column (TailingCSVLoader with lazy_text)."""
+        with self._lock:
+            if generation != self._generation:
+                self._reset(generation)
+            elif len(frame) < self._rows_seen:
+                return  # an older snapshot of the same frame: already folded in
+            start = self._rows_seen
+            self._rows_seen = len(frame)
+            for col, postings in (("hashtags", self.hashtags), ("mentions", self.mentions)):
+                if not tokens or col not in tokens:
+                    continue
+                flat = tokens[col]
+                flat = flat[flat["row"].to_numpy() >= start].drop_duplicates()
+                for tok, rows in flat.groupby("token", sort=False, observed=True)["row"]:
+                    postings[tok].frombytes(rows.to_numpy(np.int32).tobytes())
+            if not self.trigrams_wanted:
+                return
+            start = self._trigram_rows
+            text = frame["text"].iloc[start:] if "text" in frame.columns else texts(np.arange(start, len(frame)))
+            for row, text in enumerate(text, start):
+                if isinstance(text, str):
+                    for tri in _trigrams(text.lower()):
+                        self.trigrams[tri].append(row)
+            self._trigram_rows = len(frame)
+
+    @property
+    def rows(self) -> int:
+        return self._rows_seen
+
+    def stale(self, n: int) -> bool:
+        """Whether a sync to an ``n``-row frame would add anything."""
+        return self._rows_seen != n or (self.trigrams_wanted and self._trigram_rows != n)
+
+    @staticmethod
+    def _as_array(postings) -> np.ndarray:
+        return np.frombuffer(postings, dtype=np.int32) if len(postings) else np.empty(0, dtype=np.int32)
+
+    def _intersect(self, lists):
+        lists = sorted(lists, key=len)
+        if not lists:
+            return None
+        out = self._as_array(lists[0])
+        for postings in lists[1:]:
+            if not len(out):
+                break
+            out = np.intersect1d(out, self._as_array(postings), assume_unique=True)
+        return out
+
+    def hashtag_rows(self, tag: str) -> np.ndarray:
+        with self._lock:
+            return self._as_array(self.hashtags.get(tag.lower(), array("i"))).copy()
+
+    def mention_rows(self, mention: str) -> np.ndarray:
+        with self._lock:
+            return self._as_array(self.mentions.get(mention.lower(), array("i"))).copy()
+
+    def substring_rows(self, needle: str):
+        """Rows whose lowercased text may contain ``needle`` (already lowercased),
+        or None when it is too short for the trigram index or the trigrams
+        aren't built up to date yet (the next sync builds them)."""
+        if len(needle) < 3:
+            return None
+        with self._lock:
+            if self._trigram_rows != self._rows_seen or not self.trigrams_wanted:
+                self.trigrams_wanted = True
+                return None
+            lists = []
+            for tri in _trigrams(needle):
+                postings = self.trigrams.get(tri)
+                if postings is None:
+                    return np.empty(0, dtype=np.int32)
+                lists.append(postings)
+            return self._intersect(lists).copy()
+
+def filter_with_index(df: pd.DataFrame, index: TweetIndex, hashtag, search, conf, start_date, end_date,
+                      texts=None):
+    """``apply_filters`` driven by the index: returns None if the index can't
+    narrow the query (no text filter, or a text filter under 3 characters).
+    Without a text column, candidate texts come from ``texts(rows)``."""
+    tag = hashtag.strip().lower() if hashtag and hashtag.strip() else None
+    needle = search.strip().lower() if search and search.strip() else None
+    if tag is None and needle is None or index.rows != len(df):
+        return None
+
+    candidates = []
+    if tag is not None:
+        rows = index.hashtag_rows(tag) if HASHTAG_TOKEN_RE.fullmatch(tag) else index.substring_rows(tag)
+        if rows is None:
+            return None
+        candidates.append(rows)
+    if needle is not None:
+        rows = index.substring_rows(needle)
+        if rows is None:
+            return None
+        candidates.append(rows)
+    ids = candidates[0] if len(candidates) == 1 else np.intersect1d(*candidates, assume_unique=True)
+
+    sub = df.iloc[ids]
+    # Date range and confidence masks, evaluated on the candidates only
+    if start_date:
+        sub = sub[sub["timestamp"] >= pd.Timestamp(start_date).tz_localize("UTC")]
+    if end_date:
+        sub = sub[sub["timestamp"] <= (pd.Timestamp(end_date) + pd.Timedelta(days=1)).tz_localize("UTC")]
+    sub = sub[sub["confidence"].fillna(0) >= float(conf)]
+    # Verify candidates with the exact semantics of the regex path
+    text = sub["text"] if "text" in sub.columns else texts(sub.index.to_numpy())
+    lowered = text.str.lower()
+    if tag is not None:
+        sub = sub[lowered.str.contains(rf"(?<!\w){re.escape(tag)}(?!\w)", regex=True, na=False)]
+        lowered = lowered[sub.index]
+    if needle is not None:
+        sub = sub[lowered.str.contains(needle, regex=False, na=False)]
+    return sub
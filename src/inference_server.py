@@ -0,0 +1,401 @@
+# src/inference_server.py
+"""Local sentiment inference server with cross-request micro-batching.
+
+One process loads the model once and serves it over HTTP on localhost or
+a Unix socket:
+
+    python -m src.inference_server [--port 8766 | --socket /tmp/sentiment.sock]
+
+Concurrent requests are coalesced by one batcher thread. A batch is cut
+when it holds ``max_batch`` texts, or ``max_wait`` seconds after its oldest
+text was queued, whichever comes first. Large requests are split across
+batches. Admission is bounded: once ``max_queue`` texts are waiting, new
+requests get 503 with Retry-After instead of growing the queue.
+
+Endpoints: POST /score {"texts": [...]} -> {"labels": [...], "scores": [...]},
+GET /stats (queue wait, batch fill, p50/p99 latency as JSON), GET /metrics.
+
+Set INFERENCE_SERVER_URL (http://127.0.0.1:8766 or unix:///tmp/sentiment.sock)
+and src.sentiment.score_texts, and everything built on it, sends its
+cache misses here through InferenceClient instead of running the model
+in-process. The server runs that same local model (SENTIMENT_MODEL,
+POSITIVE/NEGATIVE labels). app.py is not routed here: it keeps calling
+the HF Inference API for its 3-class bertweet model. The default port is
+8766 so it doesn't clash with benchmarks.hf_stub_server on 8765.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from src import config, metrics
+
+FILL_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+QUEUE_SECONDS = metrics.histogram("inference_queue_wait_seconds", "Time a request waited before its first batch started")
+REQUEST_SECONDS = metrics.histogram("inference_request_seconds", "Server-side latency per request, queued to scored")
+BATCH_FILL = metrics.histogram("inference_batch_fill_ratio", "Texts per micro-batch / max batch", buckets=FILL_BUCKETS)
+BATCH_REQUESTS = metrics.histogram("inference_batch_requests", "Requests coalesced into one micro-batch",
+                                   buckets=metrics.SIZE_BUCKETS)
+QUEUE_DEPTH = metrics.gauge("inference_queue_texts", "Texts waiting for a micro-batch")
+REJECTED = metrics.counter("inference_rejected_total", "Requests turned away because the queue was full")
+
+class QueueFull(Exception):
+    pass
+
+class InferenceUnavailable(RuntimeError):
+    pass
+
+class _Pending:
+    __slots__ = ("texts", "labels", "scores", "left", "queued", "started", "error", "done")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.labels = [None] * len(texts)
+        self.scores = [0.0] * len(texts)
+        self.left = len(texts)
+        self.queued = time.perf_counter()
+        self.started = None
+        self.error = None
+        self.done = threading.Event()
+
+class MicroBatcher:
+    """Coalesce texts from concurrent submit() calls into batches for ``score``.
+
+    ``score(texts)`` returns (labels, scores) and is only ever called from
+    the batcher thread, so it needs no locking of its own.
+    """
+
+    def __init__(self, score, max_batch=None, max_wait=None, max_queue=None, window=10000):
+        self.score = score
+        self.max_batch = max_batch or config.INFERENCE_MAX_BATCH
+        self.max_wait = config.INFERENCE_MAX_WAIT_MS / 1000 if max_wait is None else max_wait
+        self.max_queue = max_queue or config.INFERENCE_MAX_QUEUE
+        self._queue = deque()  # [pending, next index]
+        self._queued = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        # Recent samples for /stats percentiles; the histograms above keep totals
+        self._latency = deque(maxlen=window)
+        self._wait = deque(maxlen=window)
+        self._fill = deque(maxlen=window)
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "rejected": 0, "errors": 0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, texts, timeout=None):
+        """Block until ``texts`` are scored; raises QueueFull when saturated."""
+        if not texts:
+            return [], []
+        pending = _Pending(list(texts))
+        with self._cond:
+            # An oversized request is still admitted into an empty queue
+            if self._queued and self._queued + len(texts) > self.max_queue:
+                self.stats["rejected"] += 1
+                REJECTED.inc()
+                raise QueueFull(f"{self._queued} texts queued")
+            self._queue.append([pending, 0])
+            self._queued += len(texts)
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(texts)
+            QUEUE_DEPTH.set(self._queued)
+            self._cond.notify()
+        if not pending.done.wait(timeout):
+            raise TimeoutError("inference request timed out")
+        if pending.error is not None:
+            raise pending.error
+        return pending.labels, pending.scores
+
+    def _take(self):
+        # Called with the lock held: wait for the first text, then up to
+        # max_wait past its enqueue time for the batch to fill.
+        while not self._queue:
+            self._cond.wait()
+        deadline = self._queue[0][0].queued + self.max_wait
+        while self._queued < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self._cond.wait(remaining)
+        now = time.perf_counter()
+        parts, n = [], 0
+        while self._queue and n < self.max_batch:
+            entry = self._queue[0]
+            pending, start = entry
+            if pending.error is not None:
+                # An earlier slice failed and the caller has its answer
+                self._queue.popleft()
+                self._queued -= len(pending.texts) - start
+                continue
+            stop = min(len(pending.texts), start + self.max_batch - n)
+            if pending.started is None:
+                pending.started = now
+                QUEUE_SECONDS.observe(now - pending.queued)
+                self._wait.append(now - pending.queued)
+            parts.append((pending, start, stop))
+            n += stop - start
+            if stop == len(pending.texts):
+                self._queue.popleft()
+            else:
+                entry[1] = stop
+        self._queued -= n
+        QUEUE_DEPTH.set(self._queued)
+        return parts, n
+
+    def _run(self):
+        while True:
+            with self._cond:
+                parts, n = self._take()
+            if not n:
+                continue
+            texts = [t for pending, start, stop in parts for t in pending.texts[start:stop]]
+            try:
+                labels, scores = self.score(texts)
+                error = None
+            except Exception as e:
+                error = e
+                self.stats["errors"] += 1
+                print(f"[INFERENCE] batch of {n} failed: {e}")
+            self.stats["batches"] += 1
+            self._fill.append(n / self.max_batch)
+            BATCH_FILL.observe(n / self.max_batch)
+            BATCH_REQUESTS.observe(len({id(p) for p, _, _ in parts}))
+            offset = 0
+            for pending, start, stop in parts:
+                if error is not None:
+                    pending.error = error
+                else:
+                    pending.labels[start:stop] = labels[offset:offset + stop - start]
+                    pending.scores[start:stop] = scores[offset:offset + stop - start]
+                offset += stop - start
+                pending.left -= stop - start
+                if pending.left == 0 or error is not None:
+                    if pending.left == 0:
+                        elapsed = time.perf_counter() - pending.queued
+                        REQUEST_SECONDS.observe(elapsed)
+                        self._latency.append(elapsed)
+                    pending.done.set()
+
+    def report(self) -> dict:
+        def ms(samples, q):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+        latency, wait, fill = list(self._latency), list(self._wait), list(self._fill)
+        return {
+            **self.stats,
+            "queued": self._queued,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "latency_p50_ms": ms(latency, 0.5),
+            "latency_p99_ms": ms(latency, 0.99),
+            "queue_wait_p50_ms": ms(wait, 0.5),
+            "queue_wait_p99_ms": ms(wait, 0.99),
+            "batch_fill_mean": sum(fill) / len(fill) if fill else None,
+        }
+
+def _handler(batcher):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so clients reuse one connection
+
+        def _send(self, status, body, content_type="application/json", headers=()):
+            data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/stats":
+                self._send(200, batcher.report())
+            elif path == "/metrics":
+                self._send(200, metrics.render().encode("utf-8"), metrics.CONTENT_TYPE)
+            elif path == "/health":
+                self._send(200, {"ok": True})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path.split("?")[0] != "/score":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(raw or b"{}")
+                texts = ["" if t is None else str(t) for t in body["texts"]]
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, {"error": f"bad request: {e}"})
+                return
+            try:
+                labels, scores = batcher.submit(texts)
+            except QueueFull as e:
+                retry = max(batcher.max_wait, 0.05)
+                self._send(503, {"error": f"queue full: {e}"}, headers=[("Retry-After", f"{retry:.3f}")])
+                return
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+                return
+            self._send(200, {"labels": labels, "scores": scores})
+
+        def address_string(self):
+            # Unix socket peers have no (host, port)
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+def serve(batcher, host=None, port=None, unix_socket=None):
+    """Start serving ``batcher`` from a daemon thread; returns the server."""
+    handler = _handler(batcher.start())
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = _UnixHTTPServer(unix_socket, handler)
+        where = f"unix://{unix_socket}"
+    else:
+        server = ThreadingHTTPServer((host or config.INFERENCE_SERVER_HOST,
+                                      config.INFERENCE_SERVER_PORT if port is None else port), handler)
+        where = "http://{}:{}".format(*server.server_address[:2])
+    threading.Thread(target=server.serve_forever, name="inference-http", daemon=True).start()
+    print(f"[INFERENCE] serving {where} (max batch {batcher.max_batch}, "
+          f"max wait {batcher.max_wait * 1000:g} ms, max queue {batcher.max_queue})")
+    return server
+
+# ---------- client ----------
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+class InferenceClient:
+    """Blocking client for the inference server, one keep-alive connection
+    per calling thread. Requests are sent ``chunk`` texts at a time; 503s
+    (queue full) and dropped connections are retried with jittered backoff.
+    """
+
+    def __init__(self, url=None, timeout=None, retries=None, chunk=None, backoff=0.05, max_backoff=2.0):
+        self.url = url or config.INFERENCE_SERVER_URL
+        parts = urlsplit(self.url)
+        self._unix = parts.path if parts.scheme == "unix" else None
+        self._netloc = parts.netloc
+        self.timeout = timeout or config.INFERENCE_CLIENT_TIMEOUT
+        self.retries = retries or config.INFERENCE_CLIENT_RETRIES
+        self.chunk = chunk or config.INFERENCE_CLIENT_CHUNK
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._unix:
+                conn = _UnixConnection(self._unix, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self._netloc, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _request(self, method, path, payload=None):
+        err = "no attempts"
+        for attempt in range(self.retries):
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            try:
+                conn = self._conn()
+                body = None if payload is None else json.dumps(payload).encode("utf-8")
+                conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                data = resp.read()
+                if resp.status == 200:
+                    return json.loads(data)
+                err = f"{resp.status}: {data[:200].decode('utf-8', 'replace')}"
+                if resp.status != 503:
+                    raise InferenceUnavailable(err)
+                delay = max(delay, float(resp.getheader("Retry-After") or 0))
+            except (OSError, http.client.HTTPException) as e:
+                self._drop()
+                err = f"{type(e).__name__}: {e}"
+            if attempt < self.retries - 1:
+                time.sleep(delay)
+        raise InferenceUnavailable(f"{self.url} failed after {self.retries} attempts ({err})")
+
+    def score_texts(self, texts):
+        """(labels, scores) for ``texts``, in order."""
+        labels, scores = [], []
+        for start in range(0, len(texts), self.chunk):
+            out = self._request("POST", "/score", {"texts": list(texts[start:start + self.chunk])})
+            labels.extend(out["labels"])
+            scores.extend(out["scores"])
+        return labels, scores
+
+    def stats(self) -> dict:
+        return self._request("GET", "/stats")
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(url=None) -> InferenceClient:
+    """Process-wide client per server URL."""
+    url = url or config.INFERENCE_SERVER_URL
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = InferenceClient(url)
+        return _clients[url]
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the sentiment model with cross-request micro-batching")
+    ap.add_argument("--host", default=config.INFERENCE_SERVER_HOST)
+    ap.add_argument("--port", type=int, default=config.INFERENCE_SERVER_PORT)
+    ap.add_argument("--socket", default=config.INFERENCE_SERVER_SOCKET, help="listen on this Unix socket instead")
+    ap.add_argument("--max-batch", type=int, default=config.INFERENCE_MAX_BATCH)
+    ap.add_argument("--max-wait-ms", type=float, default=config.INFERENCE_MAX_WAIT_MS)
+    ap.add_argument("--max-queue", type=int, default=config.INFERENCE_MAX_QUEUE)
+    args = ap.parse_args()
+
+    from src import sentiment
+    print(f"[INFERENCE] loading {sentiment.model_key()} ...")
+    sentiment._score_batched(["warm up"])
+    batcher = MicroBatcher(sentiment._score_batched, args.max_batch, args.max_wait_ms / 1000, args.max_queue)
+    server = serve(batcher, args.host, args.port, args.socket or None)
+    try:
+        while True:
+            time.sleep(60)
+            print(f"[INFERENCE] {json.dumps(batcher.report())}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
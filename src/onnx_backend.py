@@ -0,0 +1,100 @@
+# src/onnx_backend.py
+"""ONNX Runtime (CPU) backend for the sentiment model.
+
+``python -m src.onnx_backend`` exports config.SENTIMENT_MODEL to
+SENTIMENT_ONNX_DIR as model.onnx, plus model.int8.onnx with dynamic int8
+quantization, next to its tokenizer and config. Selected with
+SENTIMENT_BACKEND=onnx; if the export is missing it is made on first use.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from src import config
+
+_sessions = {}
+_lock = threading.Lock()
+
+def model_path(quantize=None, out_dir=None) -> str:
+    quantize = config.SENTIMENT_ONNX_QUANTIZE if quantize is None else quantize
+    out_dir = out_dir or config.SENTIMENT_ONNX_DIR
+    return os.path.join(out_dir, "model.int8.onnx" if quantize else "model.onnx")
+
+def _exported_model(out_dir: str):
+    try:
+        with open(os.path.join(out_dir, "export.json")) as f:
+            return json.load(f).get("model")
+    except (OSError, ValueError):
+        return None
+
+def export(model_id=None, out_dir=None, quantize=True, opset=14) -> str:
+    """Export the torch model to ONNX (and an int8 copy); needs torch once."""
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    model_id = model_id or config.SENTIMENT_MODEL
+    out_dir = out_dir or config.SENTIMENT_ONNX_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForSequenceClassification.from_pretrained(model_id)
+    model.eval()
+
+    sample = tokenizer(["an example to trace"], return_tensors="pt")
+    fp32 = model_path(False, out_dir)
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (sample["input_ids"], sample["attention_mask"]), fp32,
+            input_names=["input_ids", "attention_mask"], output_names=["logits"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "sequence"},
+                          "attention_mask": {0: "batch", 1: "sequence"},
+                          "logits": {0: "batch"}},
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32, model_path(True, out_dir), weight_type=QuantType.QInt8)
+    with open(os.path.join(out_dir, "export.json"), "w") as f:
+        json.dump({"model": model_id, "opset": opset, "quantized": bool(quantize)}, f)
+    print(f"[ONNX] exported {model_id} to {out_dir}")
+    return out_dir
+
+def get_session(quantize=None, threads=None):
+    """Process-wide (tokenizer, session, id2label) for the exported model."""
+    quantize = config.SENTIMENT_ONNX_QUANTIZE if quantize is None else quantize
+    threads = config.SENTIMENT_ONNX_THREADS if threads is None else threads
+    key = (quantize, threads)
+    if key not in _sessions:
+        with _lock:
+            if key not in _sessions:
+                import onnxruntime as ort
+                from transformers import AutoTokenizer
+
+                out_dir = config.SENTIMENT_ONNX_DIR
+                path = model_path(quantize, out_dir)
+                if _exported_model(out_dir) != config.SENTIMENT_MODEL or not os.path.exists(path):
+                    export(config.SENTIMENT_MODEL, out_dir, quantize=True)
+                opts = ort.SessionOptions()
+                opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                if threads:
+                    opts.intra_op_num_threads = threads
+                session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+                with open(os.path.join(out_dir, "config.json")) as f:
+                    id2label = {int(k): v for k, v in json.load(f)["id2label"].items()}
+                _sessions[key] = (AutoTokenizer.from_pretrained(out_dir), session, id2label)
+    return _sessions[key]
+
+def predict_proba(session, batch) -> np.ndarray:
+    """Softmax over the logits for a padded numpy batch."""
+    logits = session.run(["logits"], {
+        "input_ids": np.asarray(batch["input_ids"], dtype=np.int64),
+        "attention_mask": np.asarray(batch["attention_mask"], dtype=np.int64),
+    })[0]
+    e = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+if __name__ == "__main__":
+    export(quantize=True)
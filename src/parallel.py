@@ -0,0 +1,178 @@
+# src/parallel.py
+"""Score a large CSV on all cores.
+
+The input is read in chunks of PARALLEL_CHUNK_ROWS; each chunk's texts go
+to one of N worker processes, which load the model once with a pinned
+thread count. Results are written to the output in input order as soon
+as the next chunk is done, and at most two chunks per worker are held in
+the parent, so memory does not grow with the file. A chunk whose worker
+fails is retried up to PARALLEL_RETRIES times. When a worker crashes the
+pool, only the chunk whose result reported the crash is charged a retry;
+the other chunks in flight are resubmitted as they were.
+
+    python -m src.parallel data/archive.csv data/archive_scored.csv [--workers 16] [--threads 2]
+"""
+import multiprocessing as mp
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from src import config
+
+THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+def _init_worker(threads: int):
+    # Runs in a fresh (spawned) interpreter before torch is imported. The
+    # THREAD_VARS come from the parent's environment: numpy (and its BLAS)
+    # is already loaded by the time this runs, so setting them here is too late.
+    config.SENTIMENT_ONNX_THREADS = threads
+    if config.SENTIMENT_BACKEND != "onnx":
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    from src.sentiment import warm_up
+    warm_up(background=False)
+
+def _score_chunk(texts, use_cache):
+    from src.sentiment import score_texts
+    return score_texts(texts, use_cache=use_cache)
+
+def _report(rows, chunks, started):
+    elapsed = time.time() - started
+    print(f"[PARALLEL] {chunks} chunks, {rows} rows, {rows / max(elapsed, 1e-9):.1f} rows/s")
+
+def score_csv_parallel(src, dst, workers=None, threads=None, chunk_rows=None, retries=None,
+                       use_cache=True, progress=_report) -> int:
+    """Score ``src`` (timestamp,text CSV, as analyze_sentiment reads it) into
+    ``dst`` with sentiment and confidence columns; returns rows written."""
+    threads = threads or config.PARALLEL_THREADS_PER_WORKER
+    workers = workers or config.PARALLEL_WORKERS or max(1, (os.cpu_count() or 1) // threads)
+    chunk_rows = chunk_rows or config.PARALLEL_CHUNK_ROWS
+    retries = config.PARALLEL_RETRIES if retries is None else retries
+    window = workers * 2  # chunks held in the parent at once
+
+    ctx = mp.get_context("spawn")  # no torch state inherited through fork
+    def new_pool():
+        return ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(threads,))
+
+    reader = pd.read_csv(src, names=["timestamp", "text"], header=0, chunksize=chunk_rows)
+    chunks, done, futures = {}, {}, {}
+    attempts = defaultdict(int)
+    next_read = next_write = rows = 0
+    exhausted = False
+    started = time.time()
+    pool = None
+
+    def submit(idx):
+        try:
+            futures[pool.submit(_score_chunk, chunks[idx]["text"].tolist(), use_cache)] = idx
+        except BrokenProcessPool as e:
+            restart(e, unsent=[idx])
+
+    def retry(idx, err):
+        attempts[idx] += 1
+        if attempts[idx] > retries:
+            raise RuntimeError(f"chunk {idx} failed {attempts[idx]} times") from err
+        print(f"[PARALLEL] chunk {idx} failed ({type(err).__name__}: {err}); retry {attempts[idx]}/{retries}")
+        submit(idx)
+
+    def restart(err, failed=None, unsent=()):
+        # A worker died and took the pool with it: keep any results that made
+        # it back and resend every other in-flight chunk to a fresh pool. Only
+        # ``failed`` (the chunk whose result reported the crash) uses a retry.
+        nonlocal pool
+        lost = []
+        for fut, idx in futures.items():
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                done[idx] = fut.result()
+            else:
+                lost.append(idx)
+        futures.clear()
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = new_pool()
+        for idx in sorted(lost):
+            if idx == failed:
+                retry(idx, err)
+            else:
+                submit(idx)
+        for idx in unsent:
+            submit(idx)
+
+    tmp = dst + ".tmp"
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    # Spawned workers inherit the environment as it is when they start, so the
+    # thread caps are in place before their interpreter imports numpy/torch
+    saved_env = {var: os.environ.get(var) for var in THREAD_VARS}
+    os.environ.update(dict.fromkeys(THREAD_VARS, str(threads)))
+    pool = new_pool()
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as out:
+            while True:
+                while not exhausted and next_read < next_write + window:
+                    chunk = next(reader, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    chunks[next_read] = chunk
+                    submit(next_read)
+                    next_read += 1
+                if exhausted and next_write == next_read:
+                    break
+
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    if fut not in futures:
+                        continue  # already handled by a restart
+                    try:
+                        result = fut.result()
+                    except BrokenProcessPool as e:
+                        restart(e, failed=futures[fut])
+                        continue
+                    except Exception as e:
+                        retry(futures.pop(fut), e)
+                        continue
+                    done[futures.pop(fut)] = result
+
+                while next_write in done:
+                    labels, scores = done.pop(next_write)
+                    chunk = chunks.pop(next_write)
+                    chunk["sentiment"] = labels
+                    chunk["confidence"] = scores
+                    chunk.to_csv(out, header=next_write == 0, index=False)
+                    rows += len(chunk)
+                    next_write += 1
+                    if progress:
+                        progress(rows, next_write, started)
+            if next_write == 0:
+                out.write("timestamp,text,sentiment,confidence\n")
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        for var, value in saved_env.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+    return rows
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Score a CSV with a pool of model processes")
+    ap.add_argument("src")
+    ap.add_argument("dst")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--threads", type=int, default=None, help="torch/onnx threads per worker")
+    ap.add_argument("--chunk-rows", type=int, default=None)
+    ap.add_argument("--no-cache", action="store_true")
+    args = ap.parse_args()
+    n = score_csv_parallel(args.src, args.dst, args.workers, args.threads, args.chunk_rows,
+                           use_cache=not args.no_cache)
+    print(f"[PARALLEL] wrote {n} rows to {args.dst}")
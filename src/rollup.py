@@ -0,0 +1,140 @@
+# src/rollup.py
+import threading
+
+import numpy as np
+import pandas as pd
+
+SENTIMENT_ORDER = ["NEGATIVE", "NEUTRAL", "POSITIVE"]
+
+# Confidence bins line up with the dashboard slider (0.00, 0.05, ..., 1.00):
+# a row is in bin k when CONF_THRESHOLDS[k] <= confidence < CONF_THRESHOLDS[k+1],
+# so "confidence >= CONF_THRESHOLDS[k]" is exactly "bin >= k".
+CONF_STEP = 0.05
+CONF_THRESHOLDS = np.round(np.arange(21) * CONF_STEP, 2)
+
+def conf_bins(confidence: pd.Series) -> np.ndarray:
+    # Compare in the column's own dtype, like the dashboard's ">= conf" filter:
+    # 0.7 stored as float32 is 0.69999998 once widened to float64.
+    conf = confidence.fillna(0).to_numpy()
+    if conf.dtype.kind != "f":
+        conf = conf.astype("float64")
+    return np.searchsorted(CONF_THRESHOLDS.astype(conf.dtype), conf, side="right") - 1
+
+def finish_time_aggregate(g: pd.DataFrame) -> pd.DataFrame:
+    """Add TOTAL and the rolling sentiment index to per-bucket sentiment counts."""
+    g = g.reindex(columns=SENTIMENT_ORDER, fill_value=0).sort_index()
+    g["TOTAL"] = g.sum(axis=1)
+    # Rolling RSI (centered not ideal for streaming; use simple trailing window)
+    window = max(3, min(30, int(len(g) * 0.2)))  # adaptive
+    pos = g.get("POSITIVE", pd.Series(0, index=g.index))
+    neg = g.get("NEGATIVE", pd.Series(0, index=g.index))
+    rsi = (pos - neg) / g["TOTAL"].replace({0: np.nan})
+    g["RSI"] = rsi.rolling(window=window, min_periods=1).mean().fillna(0)
+    return g
+
+class MinuteRollup:
+    """Per-minute tweet counts by sentiment and confidence bin.
+
+    ``sync(frame)`` folds in only rows added to ``frame`` since the last
+    call (pass ``generation`` so a reloaded frame starts over). Queries
+    then run over minute buckets instead of tweets.
+    """
+
+    COLUMNS = ["count", "conf_sum", "conf_n"]
+
+    def __init__(self):
+        self._table = self._empty()
+        self._parts = []
+        self._rows_seen = 0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _empty(cls):
+        idx = pd.MultiIndex.from_arrays(
+            [pd.DatetimeIndex([], tz="UTC"), pd.Index([], dtype=object), pd.Index([], dtype="int64")],
+            names=["minute", "sentiment", "bin"],
+        )
+        return pd.DataFrame({c: pd.Series(dtype="float64") for c in cls.COLUMNS}, index=idx)
+
+    def sync(self, frame: pd.DataFrame, generation=None):
+        with self._lock:
+            if generation != self._generation:
+                self._table = self._empty()
+                self._parts = []
+                self._rows_seen = 0
+                self._generation = generation
+            elif len(frame) < self._rows_seen:
+                return  # an older snapshot of the same frame: already folded in
+            new = frame.iloc[self._rows_seen:]
+            self._rows_seen = len(frame)
+            new = new[new["timestamp"].notna()]
+            if len(new):
+                conf = new["confidence"]
+                grouped = pd.DataFrame({
+                    "minute": new["timestamp"].dt.floor("min"),
+                    "sentiment": new["sentiment"].astype(str),
+                    "bin": conf_bins(conf),
+                    "count": 1.0,
+                    "conf_sum": conf.fillna(0).astype("float64"),
+                    "conf_n": conf.notna().astype("float64"),
+                }).groupby(["minute", "sentiment", "bin"]).sum()
+                self._parts.append(grouped)
+
+    def table(self) -> pd.DataFrame:
+        with self._lock:
+            if self._parts:
+                self._table = (pd.concat([self._table] + self._parts)
+                                 .groupby(level=["minute", "sentiment", "bin"]).sum())
+                self._parts = []
+            return self._table
+
+    @staticmethod
+    def threshold_bin(conf):
+        """Bin index for a slider threshold, or None if it isn't on a bin edge."""
+        conf = float(conf or 0)
+        k = round(conf / CONF_STEP)  # slider values carry float noise (0.15000000000000002)
+        return k if 0 <= k < len(CONF_THRESHOLDS) and abs(CONF_THRESHOLDS[k] - conf) < 1e-9 else None
+
+    def select(self, conf, start_date=None, end_date=None) -> pd.DataFrame:
+        """Buckets matching the dashboard's date-range and confidence filters."""
+        k = self.threshold_bin(conf)
+        if k is None:
+            raise ValueError(f"confidence threshold {conf!r} is not a bin edge")
+        t = self.table()
+        minute = t.index.get_level_values("minute")
+        mask = t.index.get_level_values("bin") >= k
+        if start_date:
+            mask &= minute >= pd.Timestamp(start_date).tz_localize("UTC")
+        if end_date:
+            # A bucket holds its whole minute, so one starting at the bound is past it
+            mask &= minute < (pd.Timestamp(end_date) + pd.Timedelta(days=1)).tz_localize("UTC")
+        return t[mask]
+
+    def aggregate(self, freq, conf, start_date=None, end_date=None) -> pd.DataFrame:
+        """Same frame as ``aggregate_time`` on the filtered tweets."""
+        sub = self.select(conf, start_date, end_date)
+        if sub.empty:
+            idx = pd.date_range(pd.Timestamp.utcnow().floor(freq), periods=1, freq=freq)
+            return pd.DataFrame(index=idx)
+        g = (sub["count"].reset_index()
+                 .set_index("minute")
+                 .groupby([pd.Grouper(freq=freq), "sentiment"])["count"].sum()
+                 .unstack(fill_value=0)
+                 .astype("int64"))
+        return finish_time_aggregate(g)
+
+    def hourly(self, conf, start_date=None, end_date=None) -> pd.Series:
+        sub = self.select(conf, start_date, end_date)
+        per_minute = sub["count"].groupby(level="minute").sum()
+        return per_minute.groupby(per_minute.index.floor("h")).sum().astype("int64")
+
+    def totals(self, conf, start_date=None, end_date=None) -> dict:
+        """Tweet count per sentiment plus the mean confidence."""
+        sub = self.select(conf, start_date, end_date)
+        by_sent = sub["count"].groupby(level="sentiment").sum()
+        n = sub["conf_n"].sum()
+        out = {s: int(by_sent.get(s, 0)) for s in by_sent.index}
+        out["TOTAL"] = int(sub["count"].sum())
+        out["AVG_CONF"] = float(sub["conf_sum"].sum() / n) if n else 0.0
+        return out
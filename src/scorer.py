@@ -0,0 +1,240 @@
+# src/scorer.py
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from src import config
+from src.dedup import NearDuplicateIndex
+from src.sentiment import score_texts
+from src.utils import complete_records_end, read_csv_header
+
+RAW_CSV = "data/tweets.csv"
+SCORED_CSV = "data/tweets_with_sentiment.csv"
+CHECKPOINT = "data/scorer_checkpoint.json"
+OUT_COLUMNS = ["timestamp", "text", "sentiment", "confidence"]
+
+class StreamingScorer:
+    """Tail the raw tweet CSV and append scored rows to the sentiment CSV.
+
+    Progress is a checkpoint of (input inode, input byte offset, output byte
+    offset). Each micro-batch is appended to the output and fsynced before
+    the checkpoint is replaced, and on start-up any output bytes past the
+    checkpointed offset (a batch that was written but not committed) are
+    truncated, so a restart neither re-scores committed rows nor skips any.
+    Without a checkpoint an existing non-empty output (e.g. from batch
+    scoring) is left alone and the scorer refuses to start unless ``reset``
+    is passed, which re-scores the input from the top into a fresh output.
+    """
+
+    def __init__(self, src=RAW_CSV, dst=SCORED_CSV, checkpoint=CHECKPOINT,
+                 max_batch_bytes=None, poll_interval=None, dedup=None, reset=False, cascade=None):
+        self.src = src
+        self.dst = dst
+        self.checkpoint_path = checkpoint
+        self.max_batch_bytes = max_batch_bytes or config.SCORER_MAX_BATCH_BYTES
+        self.poll_interval = poll_interval or config.SCORER_POLL_INTERVAL
+        self.state = {"inode": None, "offset": 0, "out_offset": 0, "header": None}
+        self.rows_scored = 0
+        self.last_lag = None  # seconds from ingest to scored, newest row of the last batch
+        # Near-duplicates share one model call (src/dedup.py) and get a cluster_id column
+        self.dedup = NearDuplicateIndex() if (config.DEDUP_ENABLED if dedup is None else dedup) else None
+        # With the lexicon-first cascade (src/cascade.py) a stage column records who labelled each row
+        self.cascade = config.SENTIMENT_CASCADE if cascade is None else cascade
+        loaded = False if reset else self._load_checkpoint()
+        self._recover_output(loaded, reset)
+        self.out_columns = self._out_columns()
+
+    # ---------- checkpoint ----------
+    def _load_checkpoint(self) -> bool:
+        try:
+            with open(self.checkpoint_path) as f:
+                self.state.update(json.load(f))
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _save_checkpoint(self):
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def _recover_output(self, loaded, reset):
+        try:
+            size = os.path.getsize(self.dst)
+        except OSError:
+            size = 0
+        if size and not loaded and not reset:
+            raise RuntimeError(f"{self.dst} already holds {size} bytes of scored rows but there is no "
+                               f"checkpoint at {self.checkpoint_path}; pass --reset to re-score "
+                               f"{self.src} from the top and overwrite it")
+        if size > self.state["out_offset"]:
+            # Written but never committed: drop it, those rows get re-scored
+            with open(self.dst, "r+b") as f:
+                f.truncate(self.state["out_offset"])
+        elif size < self.state["out_offset"]:
+            print(f"[SCORER] {self.dst} is shorter than the checkpoint; continuing from its end")
+            self.state["out_offset"] = size
+
+    def _out_columns(self):
+        # An existing output keeps its header whether or not dedup/cascade is on now
+        if self.state["out_offset"]:
+            header = read_csv_header(self.dst)
+            if header:
+                return header
+        return OUT_COLUMNS + (["cluster_id"] if self.dedup is not None else []) + (["stage"] if self.cascade else [])
+
+    def _score(self, texts):
+        # (labels, scores) or, with the cascade, (labels, scores, stages)
+        if self.cascade:
+            from src.cascade import score_cascade
+            return score_cascade(texts)
+        return score_texts(texts, cascade=False)
+
+    # ---------- input ----------
+    def _rotated_sources(self):
+        """Rotated siblings of the source (see BufferedCSVWriter), oldest first."""
+        root, ext = os.path.splitext(self.src)
+        files = []
+        for path in glob.glob(f"{root}-*{ext}"):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime_ns, path, st.st_ino, st.st_size))
+        return sorted(files)
+
+    def _read_batch(self, path):
+        """Return (records bytes, new offset) for complete records after the checkpoint."""
+        with open(path, "rb") as f:
+            f.seek(self.state["offset"])
+            buf = f.read(self.max_batch_bytes)
+            end = complete_records_end(buf)
+            while end == 0 and len(buf) == self.max_batch_bytes:
+                # A single record larger than the read size: keep reading
+                more = f.read(self.max_batch_bytes)
+                if not more:
+                    break
+                buf += more
+                end = complete_records_end(buf)
+        return buf[:end], self.state["offset"] + end
+
+    def _parse(self, data: bytes) -> pd.DataFrame:
+        if self.state["offset"] == 0:
+            first = complete_records_end(data[:data.find(b"\n") + 1]) or len(data)
+            self.state["header"] = next(csv.reader(io.StringIO(data[:first].decode("utf-8"))))
+            data = data[first:]
+        if not data:
+            return pd.DataFrame(columns=self.state["header"] or ["timestamp", "text"])
+        return pd.read_csv(io.BytesIO(data), names=self.state["header"], header=None,
+                           dtype=str, keep_default_na=False, on_bad_lines="skip")
+
+    def _next_source(self):
+        """Pick the file to read from, following rotation and truncation."""
+        try:
+            st = os.stat(self.src)
+        except OSError:
+            return None
+        if self.state["inode"] is None:
+            self.state["inode"] = st.st_ino
+        if st.st_ino == self.state["inode"]:
+            if st.st_size < self.state["offset"]:
+                print(f"[SCORER] {self.src} was truncated; starting over from the top")
+                self.state["offset"] = 0
+            return self.src
+
+        # The file we were reading has been rotated away: finish it, then
+        # walk any later rotated files in order before the live one.
+        rotated = self._rotated_sources()
+        inodes = [ino for _, _, ino, _ in rotated]
+        if self.state["inode"] in inodes:
+            i = inodes.index(self.state["inode"])
+            _, path, _, size = rotated[i]
+            if size > self.state["offset"]:
+                return path
+            if i + 1 < len(rotated):
+                _, path, ino, _ = rotated[i + 1]
+                self.state.update(inode=ino, offset=0)
+                return path
+        else:
+            print(f"[SCORER] lost track of the file being read; continuing with {self.src}")
+        self.state.update(inode=st.st_ino, offset=0)
+        return self.src
+
+    # ---------- scoring ----------
+    def run_once(self) -> int:
+        path = self._next_source()
+        if path is None:
+            return 0
+        data, new_offset = self._read_batch(path)
+        if not data:
+            return 0
+        df = self._parse(data)
+
+        if len(df):
+            timestamps = df["timestamp"] if "timestamp" in df.columns else None
+            clusters = None
+            if self.dedup is not None:
+                scored = self.dedup.stats["scored"]
+                *results, clusters = self.dedup.score(df["text"].tolist(), timestamps, score=self._score)
+                print(f"[DEDUP] {len(df)} rows -> {self.dedup.stats['scored'] - scored} scored, reduction "
+                      f"{self.dedup.reduction_ratio:.1%} overall, {len(self.dedup)} clusters in window")
+            else:
+                results = self._score(df["text"].tolist())
+            out = pd.DataFrame({
+                "timestamp": timestamps if timestamps is not None else "",
+                "text": df["text"],
+                "sentiment": results[0],
+                "confidence": results[1],
+                "cluster_id": clusters,
+                "stage": results[2] if len(results) > 2 else None,
+            }, columns=self.out_columns)
+            payload = out.to_csv(header=self.state["out_offset"] == 0, index=False,
+                                 lineterminator="\n").encode("utf-8")
+            os.makedirs(os.path.dirname(self.dst) or ".", exist_ok=True)
+            fd = os.open(self.dst, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, payload)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self.state["out_offset"] += len(payload)
+            self._report_lag(out["timestamp"])
+
+        self.state["offset"] = new_offset
+        self._save_checkpoint()
+        self.rows_scored += len(df)
+        return len(df)
+
+    def _report_lag(self, timestamps: pd.Series):
+        ts = pd.to_datetime(timestamps, errors="coerce", utc=True).dropna()
+        if ts.empty:
+            return
+        now = pd.Timestamp(datetime.now(timezone.utc))
+        lags = (now - ts).dt.total_seconds()
+        self.last_lag = float(lags.min())
+        print(f"[SCORER] {len(timestamps)} rows, lag newest {lags.min():.1f}s "
+              f"median {lags.median():.1f}s max {lags.max():.1f}s, total {self.rows_scored + len(timestamps)}")
+
+    def run_forever(self):
+        print(f"[SCORER] {self.src} -> {self.dst} from offset {self.state['offset']}")
+        while True:
+            if self.run_once() == 0:
+                time.sleep(self.poll_interval)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Tail the raw tweet CSV and append scored rows")
+    ap.add_argument("--reset", action="store_true",
+                    help="ignore any checkpoint and overwrite the scored CSV, re-scoring from the top")
+    args = ap.parse_args()
+    StreamingScorer(reset=args.reset).run_forever()
@@ -1,22 +1,180 @@
 # src/sentiment.py
-import pandas as pd
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, TextClassificationPipeline
 import os
+import threading
+
+import pandas as pd
+
+from src import config, metrics
+from src.cache import get_cache
+
+# Hugging Face sentiment model (distilbert), loaded on first use.
+# torch/transformers are imported lazily so importing this module is cheap.
+_handles = {}
+_load_lock = threading.Lock()
+
+INFERENCE_SECONDS = metrics.histogram("sentiment_inference_seconds", "Model forward pass time per batch", ["backend"])
+BATCH_SIZE = metrics.histogram("sentiment_batch_size", "Texts per model batch", ["backend"],
+                               buckets=metrics.SIZE_BUCKETS)
+
+def get_model():
+    """Process-wide (tokenizer, model) singleton."""
+    if "model" not in _handles:
+        with _load_lock:
+            if "model" not in _handles:
+                from transformers import AutoTokenizer, AutoModelForSequenceClassification
+                tokenizer = AutoTokenizer.from_pretrained(config.SENTIMENT_MODEL)
+                model = AutoModelForSequenceClassification.from_pretrained(config.SENTIMENT_MODEL)
+                model.eval()
+                _handles["tokenizer"] = tokenizer
+                _handles["model"] = model
+    return _handles["tokenizer"], _handles["model"]
+
+def get_pipeline():
+    """Process-wide TextClassificationPipeline built on the shared model."""
+    if "pipeline" not in _handles:
+        tokenizer, model = get_model()
+        with _load_lock:
+            if "pipeline" not in _handles:
+                from transformers import TextClassificationPipeline
+                _handles["pipeline"] = TextClassificationPipeline(model=model, tokenizer=tokenizer)
+    return _handles["pipeline"]
+
+def warm_up(background: bool = True):
+    """Load the model (and run one tiny forward pass) ahead of the first request."""
+    if config.INFERENCE_SERVER_URL:
+        return None  # the inference server holds the model
+    def _run():
+        _score_batched(["warm up"])
+    if not background:
+        _run()
+        return None
+    t = threading.Thread(target=_run, name="sentiment-warmup", daemon=True)
+    t.start()
+    return t
+
+def model_key(backend=None) -> str:
+    """Cache namespace for the current model; quantized ONNX scores differ
+    slightly from torch, so each backend gets its own entries."""
+    backend = backend or config.SENTIMENT_BACKEND
+    if backend == "onnx":
+        return f"{config.SENTIMENT_MODEL}#onnx{'-int8' if config.SENTIMENT_ONNX_QUANTIZE else ''}"
+    return config.SENTIMENT_MODEL
+
+def score_texts(texts, batch_size=None, max_length=None, use_cache=True, cascade=None):
+    """Score many texts at once; returns (labels, scores) in input order.
+
+    Cached results are reused and duplicate texts are scored only once.
+    With ``cascade`` (default SENTIMENT_CASCADE) confidently polarized texts
+    are labelled by the lexicon stage in src/cascade.py instead.
+    """
+    if config.SENTIMENT_CASCADE if cascade is None else cascade:
+        from src.cascade import score_cascade
+        labels, scores, _ = score_cascade(texts, batch_size=batch_size, max_length=max_length, use_cache=use_cache)
+        return labels, scores
+    texts = ["" if pd.isna(t) else str(t) for t in texts]
+    if not use_cache:
+        return _score(texts, batch_size, max_length)
 
-# Load Hugging Face sentiment model (distilbert)
-tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased-finetuned-sst-2-english")
-model = AutoModelForSequenceClassification.from_pretrained("distilbert-base-uncased-finetuned-sst-2-english")
-pipeline = TextClassificationPipeline(model=model, tokenizer=tokenizer)
+    cache = get_cache()
+    key = model_key()
+    cached = cache.get_many(texts, key)
+    todo = list(dict.fromkeys(t for t, hit in zip(texts, cached) if hit is None))
+    fresh = {}
+    if todo:
+        labels, scores = _score(todo, batch_size, max_length)
+        cache.put_many(todo, list(zip(labels, scores)), key)
+        fresh = dict(zip(todo, zip(labels, scores)))
 
-def analyze_sentiment(input_text):
+    results = [hit if hit is not None else fresh[t] for t, hit in zip(texts, cached)]
+    return [r[0] for r in results], [r[1] for r in results]
+
+def _score(texts, batch_size=None, max_length=None):
+    # With INFERENCE_SERVER_URL set the shared server scores the texts (with
+    # its own batch size and max length); otherwise the model runs here.
+    if config.INFERENCE_SERVER_URL:
+        from src.inference_server import get_client
+        return get_client().score_texts(texts)
+    return _score_batched(texts, batch_size, max_length)
+
+def _backend(backend=None, quantize=None):
+    """(tokenizer, id2label, tensor type, forward) where forward maps a padded
+    batch to a numpy array of class probabilities."""
+    if (backend or config.SENTIMENT_BACKEND) == "onnx":
+        from src import onnx_backend
+        tokenizer, session, id2label = onnx_backend.get_session(quantize)
+        return tokenizer, id2label, "np", lambda batch: onnx_backend.predict_proba(session, batch)
+
+    import torch
+    tokenizer, model = get_model()
+    def forward(batch):
+        with torch.inference_mode():
+            return model(**batch).logits.softmax(dim=-1).numpy()
+    return tokenizer, model.config.id2label, "pt", forward
+
+def _score_batched(texts, batch_size=None, max_length=None, backend=None, quantize=None):
+    # Texts are sorted by token length so each batch holds similarly sized
+    # inputs and is only padded to its own longest member.
+    batch_size = batch_size or config.SENTIMENT_BATCH_SIZE
+    max_length = max_length or config.SENTIMENT_MAX_LENGTH
+    if not texts:
+        return [], []
+
+    backend = backend or config.SENTIMENT_BACKEND
+    tokenizer, id2label, tensors, forward = _backend(backend, quantize)
+    enc = tokenizer(texts, truncation=True, max_length=max_length)
+    input_ids, attention_mask = enc["input_ids"], enc["attention_mask"]
+    order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
+
+    labels = [None] * len(texts)
+    scores = [0.0] * len(texts)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        batch = tokenizer.pad(
+            {"input_ids": [input_ids[i] for i in idx],
+             "attention_mask": [attention_mask[i] for i in idx]},
+            return_tensors=tensors,
+        )
+        with INFERENCE_SECONDS.time(backend=backend):
+            probs = forward(batch)
+        BATCH_SIZE.observe(len(idx), backend=backend)
+        for i, k, p in zip(idx, probs.argmax(axis=-1).tolist(), probs.max(axis=-1).tolist()):
+            labels[i] = id2label[k]
+            scores[i] = p
+    return labels, scores
+
+def _analyze(texts, batch_size=None, max_length=None, timestamps=None, dedup=False):
+    # Output columns: sentiment and confidence, plus stage when the cascade is
+    # on and cluster_id when near-duplicates are collapsed (src/dedup.py)
+    if config.SENTIMENT_CASCADE:
+        from src.cascade import score_cascade
+        score = lambda t: score_cascade(t, batch_size=batch_size, max_length=max_length)
+        names = ["sentiment", "confidence", "stage"]
+    else:
+        score = lambda t: score_texts(t, batch_size=batch_size, max_length=max_length)
+        names = ["sentiment", "confidence"]
+    if dedup:
+        from src.dedup import NearDuplicateIndex
+        index = NearDuplicateIndex()
+        results = index.score(texts, timestamps, score=score)
+        names.append("cluster_id")
+        print(f"[DEDUP] {len(texts)} rows, reduction {index.reduction_ratio:.1%}")
+    else:
+        results = score(texts)
+    return dict(zip(names, results))
+
+def analyze_sentiment(input_text, batch_size=None, max_length=None):
     # Check if input is a CSV file
     if os.path.exists(input_text) and input_text.endswith(".csv"):
         df = pd.read_csv(input_text, names=["timestamp","text"], header=0)
-        df["sentiment"] = df["text"].apply(lambda x: pipeline(x)[0]["label"])
+        columns = _analyze(df["text"].tolist(), batch_size, max_length,
+                           timestamps=df["timestamp"], dedup=config.DEDUP_ENABLED)
+        for name, values in columns.items():
+            df[name] = values
         return df
     else:
         # Input is normal text
-        result = pipeline(input_text)[0]
-        return {"text": input_text, "label": result["label"], "score": result["score"]}
-
-
+        columns = _analyze([input_text], batch_size, max_length)
+        result = {"text": input_text, "label": columns["sentiment"][0], "score": columns["confidence"][0]}
+        if "stage" in columns:
+            result["stage"] = columns["stage"][0]
+        return result
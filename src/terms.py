@@ -0,0 +1,142 @@
+# src/terms.py
+import base64
+import hashlib
+import io
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from src.rollup import conf_bins, MinuteRollup
+
+# Mirrors WordCloud.process_text with its defaults (collocations=False as the
+# dashboard uses): split on r"\w[\w']*", drop trailing 's, numbers and
+# stopwords, then fold case variants and plurals.
+WORD_RE = re.compile(r"\w[\w']*")
+MAX_WORDS = 200  # WordCloud's max_words default
+
+_stopwords = None
+
+def _get_stopwords():
+    global _stopwords
+    if _stopwords is None:
+        from wordcloud import STOPWORDS
+        _stopwords = {w.lower() for w in STOPWORDS}
+    return _stopwords
+
+def tokenize(text: str):
+    stopwords = _get_stopwords()
+    words = WORD_RE.findall(text)
+    words = [w[:-2] if w.lower().endswith("'s") else w for w in words]
+    return [w for w in words if not w.isdigit() and w.lower() not in stopwords]
+
+def count_terms(texts) -> Counter:
+    counts = Counter()
+    for text in texts:
+        if isinstance(text, str):
+            counts.update(tokenize(text))
+    return counts
+
+def fold_counts(counts: Counter) -> dict:
+    """wordcloud.tokenization.process_tokens, applied to counts instead of a token list."""
+    d = defaultdict(dict)
+    for word, n in counts.items():
+        case_dict = d[word.lower()]
+        case_dict[word] = case_dict.get(word, 0) + n
+    for key in list(d.keys()):
+        if key.endswith("s") and not key.endswith("ss"):
+            key_singular = key[:-1]
+            if key_singular in d:
+                dict_singular = d[key_singular]
+                for word, n in d[key].items():
+                    dict_singular[word[:-1]] = dict_singular.get(word[:-1], 0) + n
+                del d[key]
+    item1 = itemgetter(1)
+    return {max(case_dict.items(), key=item1)[0]: sum(case_dict.values()) for case_dict in d.values()}
+
+def top_frequencies(counts: Counter, n: int = MAX_WORDS):
+    folded = fold_counts(counts)
+    return sorted(folded.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+class TermFrequencyIndex:
+    """Word counts per (hour, confidence bin), updated as rows arrive.
+
+    Like MinuteRollup, ``sync(frame, generation)`` only tokenizes rows added
+    since the previous call. ``counts()`` merges the buckets for a date
+    range and confidence threshold.
+    """
+
+    def __init__(self):
+        self._buckets = defaultdict(Counter)
+        self._rows_seen = 0
+        self._generation = None
+        self._lock = threading.Lock()
+
+    def sync(self, frame: pd.DataFrame, generation=None, texts=None):
+        # texts(rows) supplies new rows' text when the frame has none (lazy_text)
+        with self._lock:
+            if generation != self._generation:
+                self._buckets = defaultdict(Counter)
+                self._rows_seen = 0
+                self._generation = generation
+            elif len(frame) < self._rows_seen:
+                return  # an older snapshot of the same frame: already folded in
+            start = self._rows_seen
+            new = frame.iloc[start:]
+            self._rows_seen = len(frame)
+            dated = new["timestamp"].notna().to_numpy()
+            new = new[dated]
+            if not len(new):
+                return
+            text = new["text"] if "text" in new.columns else texts(np.flatnonzero(dated) + start)
+            hours = new["timestamp"].dt.floor("h")
+            for hour, b, text in zip(hours, conf_bins(new["confidence"]), text):
+                if isinstance(text, str):
+                    self._buckets[(hour, int(b))].update(tokenize(text))
+
+    def counts(self, conf, start_date=None, end_date=None) -> Counter:
+        k = MinuteRollup.threshold_bin(conf)
+        if k is None:
+            raise ValueError(f"confidence threshold {conf!r} is not a bin edge")
+        start = pd.Timestamp(start_date).tz_localize("UTC") if start_date else None
+        end = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).tz_localize("UTC") if end_date else None
+        total = Counter()
+        with self._lock:
+            for (hour, b), counter in self._buckets.items():
+                if b < k or (start is not None and hour < start) or (end is not None and hour >= end):
+                    continue
+                total.update(counter)
+        return total
+
+# ---------- Rendering ----------
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+RENDER_CACHE_SIZE = 32
+
+def render_wordcloud(counts: Counter) -> str:
+    """PNG data URI for the cloud; identical top-N frequencies reuse the last render."""
+    top = top_frequencies(counts)
+    if not top:
+        top = [("data", 1)]  # what WordCloud makes of the "no data" placeholder
+    key = hashlib.sha1(repr(top).encode("utf-8")).hexdigest()
+    with _render_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+
+    from wordcloud import WordCloud
+    wc = WordCloud(width=900, height=450, background_color="white",
+                   collocations=False).generate_from_frequencies(dict(top))
+    buf = io.BytesIO()
+    wc.to_image().save(buf, format="PNG")
+    encoded = base64.b64encode(buf.getvalue()).decode()
+    uri = f"data:image/png;base64,{encoded}"
+
+    with _render_lock:
+        _render_cache[key] = uri
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return uri
@@ -1,10 +1,29 @@
 # src/utils.py
+import io
+import os
 import re
+import threading
 from typing import List
+import numpy as np
 import pandas as pd
 
+from src import metrics
+from src.rollup import SENTIMENT_ORDER
+
 HASHTAG_RE = re.compile(r"#\w+")
 MENTION_RE = re.compile(r"@\w+")
+TOKEN_PATTERNS = {"hashtags": HASHTAG_RE, "mentions": MENTION_RE}
+
+CSV_LOAD_SECONDS = metrics.histogram("sentiment_csv_load_seconds", "Time to parse and enrich sentiment CSV rows", ["loader"])
+CSV_ROWS = metrics.counter("sentiment_csv_rows_parsed_total", "Sentiment CSV rows parsed", ["loader"])
+CSV_PARSE_ERRORS = metrics.counter("sentiment_csv_parse_errors_total", "Appended CSV chunks that failed to parse",
+                                   ["loader"])
+
+# Compact frame: sentiment is categorical, confidence float32 and timestamps
+# datetime64 (int64 epoch under the hood); hashtags/mentions are interned
+# (int codes into one copy of each distinct token, see intern_tokens).
+SENTIMENT_DTYPE = pd.CategoricalDtype(pd.Index(SENTIMENT_ORDER, dtype=object))
+TEXT_READ_GAP = 64 * 1024  # lazy text: rows closer than this share one read
 
 def extract_hashtags(text: str) -> List[str]:
     return [h.lower() for h in HASHTAG_RE.findall(text or "")]
@@ -12,11 +31,73 @@ def extract_hashtags(text: str) -> List[str]:
 def extract_mentions(text: str) -> List[str]:
     return [m.lower() for m in MENTION_RE.findall(text or "")]
 
+def intern_tokens(values) -> pd.Categorical:
+    """Token strings as a categorical with object categories (first-seen order)."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return pd.Categorical.from_codes(codes, categories=pd.Index(uniques, dtype=object))
+
+def concat_interned(parts) -> pd.Categorical:
+    """Concatenate interned token columns, merging their vocabularies."""
+    parts = [pd.Categorical(p) if not isinstance(p, pd.Categorical) else p for p in parts]
+    cats = pd.Index(np.concatenate([np.asarray(p.categories, dtype=object) for p in parts]), dtype=object).unique()
+    codes = np.concatenate([cats.get_indexer(p.categories)[p.codes] for p in parts]) if parts else []
+    return pd.Categorical.from_codes(codes, categories=cats)
+
+def extract_tokens(text: pd.Series, pattern=HASHTAG_RE) -> pd.DataFrame:
+    """Flat (row, token) frame with the tokens extract_hashtags/extract_mentions
+    would give for each row; ``row`` is the position in ``text``.
+
+    One regex pass over all texts joined by newlines (not \\w, so no match
+    spans two rows) instead of a Python call and list per row.
+    """
+    values = text.fillna("").astype(str).tolist()
+    if not values:
+        return pd.DataFrame({"row": np.empty(0, dtype=np.int32), "token": intern_tokens([])})
+    starts = np.cumsum([0] + [len(v) + 1 for v in values[:-1]])
+    positions, tokens = [], []
+    for m in pattern.finditer("\n".join(values)):
+        positions.append(m.start())
+        tokens.append(m.group())
+    rows = np.searchsorted(starts, np.asarray(positions, dtype=np.int64), side="right") - 1
+    tokens = "\n".join(tokens).lower().split("\n") if tokens else []
+    return pd.DataFrame({"row": rows.astype(np.int32), "token": intern_tokens(tokens)})
+
+def token_tables(text: pd.Series) -> dict:
+    """{"hashtags": flat frame, "mentions": flat frame} for a text column."""
+    return {name: extract_tokens(text, pattern) for name, pattern in TOKEN_PATTERNS.items()}
+
+def concat_tokens(tables: dict, new: dict, row_offset: int) -> dict:
+    """Append token tables of rows that were appended at ``row_offset``."""
+    return {name: pd.DataFrame({
+                "row": np.concatenate([tables[name]["row"].to_numpy(),
+                                       new[name]["row"].to_numpy() + row_offset]).astype(np.int32),
+                "token": concat_interned([tables[name]["token"].array, new[name]["token"].array]),
+            })
+            for name in tables}
+
+def select_tokens(tables: dict, rows: np.ndarray, n: int, row_offset: int = 0) -> dict:
+    """Token tables of a subset of an ``n``-row frame, given as sorted positions;
+    the rows are renumbered ``row_offset``, ``row_offset + 1``, ... in that order."""
+    remap = np.full(n, -1, dtype=np.int64)
+    remap[rows] = np.arange(len(rows)) + row_offset
+    out = {}
+    for name, t in tables.items():
+        r = remap[t["row"].to_numpy()]
+        keep = r >= 0
+        out[name] = pd.DataFrame({"row": r[keep].astype(np.int32), "token": t["token"].array[keep]})
+    return out
+
 def load_sentiment_csv(path: str) -> pd.DataFrame:
-    try:
-        df = pd.read_csv(path)
-    except Exception:
-        return pd.DataFrame(columns=["timestamp","text","sentiment","confidence"])
+    with CSV_LOAD_SECONDS.time(loader="full"):
+        try:
+            df = pd.read_csv(path)
+        except Exception:
+            return pd.DataFrame(columns=["timestamp","text","sentiment","confidence"])
+        df = enrich_sentiment_frame(df)
+    CSV_ROWS.inc(len(df), loader="full")
+    return df
+
+def enrich_sentiment_frame(df: pd.DataFrame) -> pd.DataFrame:
     if "timestamp" in df.columns:
         df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", utc=True)
     else:
@@ -24,14 +105,247 @@ def load_sentiment_csv(path: str) -> pd.DataFrame:
     # Normalize sentiment labels
     if "sentiment" not in df.columns:
         df["sentiment"] = "NEUTRAL"
-    df["sentiment"] = df["sentiment"].astype(str).str.upper()
+    labels = df["sentiment"].astype(str).str.upper()
+    extra = sorted(set(labels.dropna().unique()) - set(SENTIMENT_ORDER))
+    dtype = SENTIMENT_DTYPE if not extra else \
+        pd.CategoricalDtype(pd.Index(SENTIMENT_ORDER + extra, dtype=object))
+    df["sentiment"] = labels.astype(dtype)
     # Confidence to float [0,1]
     if "confidence" in df.columns:
-        df["confidence"] = pd.to_numeric(df["confidence"], errors="coerce").clip(lower=0, upper=1)
+        df["confidence"] = pd.to_numeric(df["confidence"], errors="coerce").clip(lower=0, upper=1).astype("float32")
     else:
-        df["confidence"] = 0.0
-    # Features
-    df["hashtags"] = df["text"].fillna("").apply(extract_hashtags)
-    df["mentions"] = df["text"].fillna("").apply(extract_mentions)
+        df["confidence"] = np.float32(0.0)
+    # Hashtags / mentions are kept apart in flat form, see token_tables
     return df
 
+def concat_frames(parts, **kwargs) -> pd.DataFrame:
+    """pd.concat that keeps ``sentiment`` categorical when parts saw different labels."""
+    dtypes = [p["sentiment"].dtype for p in parts if "sentiment" in p.columns]
+    if any(d != dtypes[0] for d in dtypes[1:]):
+        cats = pd.Index(SENTIMENT_ORDER, dtype=object)
+        for p in parts:
+            if "sentiment" in p.columns:
+                labels = p["sentiment"].cat.categories if isinstance(p["sentiment"].dtype, pd.CategoricalDtype) \
+                    else p["sentiment"].dropna().unique()
+                cats = cats.append(pd.Index(labels, dtype=object)).unique()
+        dtype = pd.CategoricalDtype(cats)
+        parts = [p.assign(sentiment=p["sentiment"].astype(object).astype(dtype)) if "sentiment" in p.columns else p
+                 for p in parts]
+    return pd.concat(parts, **kwargs)
+
+
+def complete_records_end(buf: bytes) -> int:
+    """Length of the prefix of ``buf`` made of complete CSV records.
+
+    ``buf`` must start at a record boundary. A newline only ends a record
+    when it is outside a quoted field, i.e. preceded by an even number of
+    quote characters (escaped quotes are doubled, so parity still works).
+    """
+    end = buf.rfind(b"\n")
+    if end < 0:
+        return 0
+    quotes = buf.count(b'"', 0, end)
+    while quotes % 2:
+        prev = buf.rfind(b"\n", 0, end)
+        if prev < 0:
+            return 0
+        quotes -= buf.count(b'"', prev, end)
+        end = prev
+    return end + 1
+
+def record_ends(buf: bytes) -> np.ndarray:
+    """Offsets just past the end of each complete CSV record in ``buf``."""
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    newlines = np.flatnonzero(arr == ord("\n"))
+    if not len(newlines):
+        return newlines
+    quotes = np.cumsum(arr == ord('"'))
+    return newlines[quotes[newlines] % 2 == 0] + 1
+
+def read_csv_header(path: str) -> List[str]:
+    with open(path, "rb") as f:
+        head = f.read(64 * 1024)
+    end = complete_records_end(head[:head.find(b"\n") + 1])
+    return list(pd.read_csv(io.BytesIO(head[:end]), nrows=0).columns) if end else []
+
+class TailingCSVLoader:
+    """Incremental ``load_sentiment_csv`` for a file that is only appended to.
+
+    The parsed, enriched frame is kept in memory together with the byte
+    offset (and inode) it covers. Each ``load()`` parses and enriches only
+    the bytes appended since the previous call; a truncated or replaced
+    (rotated) file triggers a full reload. ``last_new_rows`` is the number
+    of rows parsed by the most recent call. ``start_offset`` skips records
+    before that byte offset (e.g. rows already compacted into the archive).
+    ``tokens`` holds the hashtag/mention tables (see token_tables) for the
+    frame, extracted once per row as it is read.
+
+    With ``lazy_text`` the frame has no text column: only the byte offset
+    of each record is kept (``row_offsets``, row i spans
+    ``row_offsets[i]:row_offsets[i + 1]``) and ``texts(rows)`` reads the
+    text of just the rows a caller needs back from the file.
+
+    A chunk that fails to parse is logged and skipped for this call: the
+    previous frame is kept and the next ``load()`` retries from the same
+    offset. Appending still concatenates onto the whole frame, so a load
+    costs O(rows held) rather than O(rows appended); callers take the full
+    frame on every refresh, which would force a deferred concat anyway.
+    """
+
+    def __init__(self, path: str, start_offset: int = 0, lazy_text: bool = False):
+        self.path = path
+        self.start_offset = start_offset
+        self.lazy_text = lazy_text
+        self.row_offsets = None
+        self.frame = None
+        self.tokens = token_tables(pd.Series([], dtype=object))
+        self.header = None
+        self.offset = start_offset
+        self.inode = None
+        self.last_new_rows = 0
+        self.full_reloads = 0
+        self._lock = threading.RLock()
+
+    @property
+    def version(self):
+        """Changes whenever the loaded frame does."""
+        return (self.inode, self.full_reloads, self.offset)
+
+    def snapshot(self):
+        """load(), plus the tokens, reload count and version that go with that
+        frame; reading them separately could see a later load's state."""
+        with self._lock:
+            frame = self.load()
+            return frame, self.tokens, self.full_reloads, self.version
+
+    def load(self) -> pd.DataFrame:
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except OSError:
+                self._reset()
+                return self._empty_frame()
+            if self.frame is None or st.st_ino != self.inode or st.st_size < self.offset:
+                self._reset()
+                self.inode = st.st_ino
+                self.full_reloads += 1
+            if st.st_size == self.offset:
+                self.last_new_rows = 0
+                if self.frame is None:
+                    self.frame = self._empty_frame()
+                return self.frame
+            with CSV_LOAD_SECONDS.time(loader="tailing"):
+                self._read_tail()
+            CSV_ROWS.inc(self.last_new_rows, loader="tailing")
+            return self.frame
+
+    def _reset(self):
+        self.frame = None
+        self.tokens = token_tables(pd.Series([], dtype=object))
+        self.row_offsets = None
+        self.header = None
+        self.offset = self.start_offset
+        self.last_new_rows = 0
+
+    def _read_tail(self):
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            buf = f.read()
+        end = complete_records_end(buf)
+        data = buf[:end]
+        if self.header is None and self.offset > 0:
+            self.header = read_csv_header(self.path)
+        if self.header is None:
+            first = complete_records_end(data[:data.find(b"\n") + 1])
+            if not first:
+                self.last_new_rows = 0
+                if self.frame is None:
+                    self.frame = self._empty_frame()
+                return
+            self.header = list(pd.read_csv(io.BytesIO(data[:first]), nrows=0).columns)
+            data = data[first:]
+        base = self.offset + end - len(data)  # file offset of the first record in data
+
+        try:
+            if data:
+                # Blank lines are kept as (empty) rows in lazy mode so rows and records line up
+                new = pd.read_csv(io.BytesIO(data), names=self.header, header=None, dtype={"text": str},
+                                  skip_blank_lines=not self.lazy_text)
+            else:
+                new = pd.DataFrame(columns=self.header)
+            new = enrich_sentiment_frame(new)
+            new_tokens = token_tables(new["text"])
+            if self.lazy_text:
+                ends = record_ends(data)
+                if len(ends) != len(new):
+                    raise ValueError(f"could not align {len(ends)} records with {len(new)} rows")
+        except (ValueError, pd.errors.ParserError) as e:
+            # Keep the previous frame; the next load retries these records
+            print(f"[LOADER] {self.path}: failed to parse {len(data)} bytes at offset {base}, "
+                  f"will retry: {type(e).__name__}: {e}")
+            CSV_PARSE_ERRORS.inc(loader="tailing")
+            self.offset = base
+            self.last_new_rows = 0
+            if self.frame is None:
+                self.frame = self._empty_frame()
+            return
+        self.offset = base + len(data)
+        if self.lazy_text:
+            offsets = base + np.concatenate([[0], ends]).astype(np.int64)
+            self.row_offsets = offsets if self.row_offsets is None else \
+                np.concatenate([self.row_offsets[:-1], offsets])
+            new = new.drop(columns="text")
+        self.last_new_rows = len(new)
+        if self.frame is None:
+            self.frame = new
+            self.tokens = new_tokens
+        elif len(new):
+            self.tokens = concat_tokens(self.tokens, new_tokens, len(self.frame))
+            new.index = pd.RangeIndex(len(self.frame), len(self.frame) + len(new))
+            self.frame = concat_frames([self.frame, new])
+
+    def _empty_frame(self) -> pd.DataFrame:
+        frame = enrich_sentiment_frame(pd.DataFrame(columns=["timestamp", "text"]))
+        return frame.drop(columns="text") if self.lazy_text else frame
+
+    def texts(self, rows) -> pd.Series:
+        """Text of the given frame rows (positions), indexed by position.
+
+        In lazy mode the records are read back from the CSV, one read per run
+        of rows less than TEXT_READ_GAP bytes apart. Rows that can no longer
+        be read (file rotated since the last load) come back as None.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if not self.lazy_text:
+            return self.frame["text"].iloc[rows].set_axis(rows)
+        out = pd.Series(None, index=rows, dtype=object)
+        with self._lock:
+            offsets, header, inode, size = self.row_offsets, self.header, self.inode, self.offset
+        if not len(rows) or offsets is None:
+            return out
+        order = np.argsort(rows, kind="stable")
+        ordered = rows[order]
+        starts, ends = offsets[ordered], offsets[ordered + 1]
+        cuts = np.flatnonzero(starts[1:] - ends[:-1] > TEXT_READ_GAP) + 1
+        firsts, lasts = np.r_[0, cuts], np.r_[cuts, len(ordered)] - 1
+        chunks, positions, parsed_rows = [], [], 0
+        try:
+            with open(self.path, "rb") as f:
+                st = os.fstat(f.fileno())
+                if st.st_ino != inode or st.st_size < size:
+                    return out
+                for lo, hi in zip(firsts, lasts):
+                    # Every record between the run's first and last row is parsed
+                    f.seek(starts[lo])
+                    chunks.append(f.read(ends[hi] - starts[lo]))
+                    positions.append(parsed_rows + ordered[lo:hi + 1] - ordered[lo])
+                    parsed_rows += ordered[hi] - ordered[lo] + 1
+        except OSError:
+            return out
+        parsed = pd.read_csv(io.BytesIO(b"".join(chunks)), names=header, header=None, usecols=["text"],
+                             dtype={"text": str}, skip_blank_lines=False)
+        if len(parsed) != parsed_rows:
+            return out
+        text = parsed["text"].to_numpy(dtype=object)[np.concatenate(positions)]
+        out.iloc[order] = np.where(pd.isna(text), None, text)
+        return out
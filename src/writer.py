@@ -0,0 +1,197 @@
+# src/writer.py
+import csv
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+class BufferedCSVWriter:
+    """Append rows to a CSV from a background thread.
+
+    ``write()`` only enqueues, so producers (e.g. the streaming callback)
+    never touch the disk. Rows are flushed every ``flush_rows`` rows or
+    ``flush_interval`` seconds. ``fsync`` is "always" (every flush),
+    "interval" (at most every ``fsync_interval`` seconds) or "never".
+    The file is rotated to ``<name>-<YYYYmmddHH>[.n].csv`` when it reaches
+    ``rotate_bytes`` and/or when the UTC hour changes (``rotate_hourly``).
+    When the queue is full new rows are dropped and counted. If a flush
+    fails the thread logs and records the error and stops; ``write()`` and
+    ``close()`` then raise it.
+    """
+
+    def __init__(self, path, columns, max_queue=10_000, flush_rows=500, flush_interval=1.0,
+                 fsync="interval", fsync_interval=5.0, rotate_bytes=0, rotate_hourly=False):
+        if fsync not in ("always", "interval", "never"):
+            raise ValueError(f"unknown fsync policy: {fsync!r}")
+        self.path = path
+        self.columns = list(columns)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_hourly = rotate_hourly
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._writer = None
+        self._opened_hour = None
+        self._last_fsync = 0.0
+        self._error = None
+
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.rotations = 0
+        self._started_at = None
+
+    # ---------- producer side ----------
+    def start(self):
+        if self._thread is None:
+            self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="csv-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def write(self, row: dict) -> bool:
+        self._raise_error()
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout=10.0):
+        """Stop the writer thread after draining everything already queued.
+        The thread closes the file itself, so a join that times out leaves it
+        to finish rather than closing the file under it."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                print(f"[WRITER] thread still draining after {timeout}s; it closes the file when done")
+                return
+            self._thread = None
+        else:
+            self._close_file()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"CSV writer for {self.path} failed") from self._error
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "queue_depth": self._queue.qsize(),
+            "rows_written": self.rows_written,
+            "bytes_written": self.bytes_written,
+            "rows_per_sec": self.rows_written / elapsed if elapsed else 0.0,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "rotations": self.rotations,
+        }
+
+    # ---------- writer thread ----------
+    def _run(self):
+        try:
+            self._loop()
+        except Exception as e:
+            print(f"[WRITER] {self.path}: {type(e).__name__}: {e}; writer stopped")
+            self._error = e
+        finally:
+            try:
+                self._close_file()
+            except Exception as e:
+                print(f"[WRITER] {self.path}: close failed: {type(e).__name__}: {e}")
+                self._error = self._error or e
+
+    def _loop(self):
+        buf = []
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                buf.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+            stopping = self._stop.is_set()
+            if stopping:
+                while True:
+                    try:
+                        buf.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+            if buf and (stopping or len(buf) >= self.flush_rows
+                        or time.monotonic() - last_flush >= self.flush_interval):
+                try:
+                    self._flush(buf)
+                except Exception:
+                    self.dropped += len(buf)
+                    raise
+                buf = []
+            if not buf:
+                last_flush = time.monotonic()
+            if stopping:
+                return
+
+    def _flush(self, rows):
+        self._maybe_rotate()
+        if self._file is None:
+            self._open()
+        for row in rows:
+            self._writer.writerow([row.get(c, "") for c in self.columns])
+        self._file.flush()
+        now = time.monotonic()
+        if self.fsync == "always" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+        new_size = self._file.tell()
+        self.bytes_written += new_size - self._size
+        self._size = new_size
+        self.rows_written += len(rows)
+        self.flushes += 1
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._size = self._file.tell()
+        self._opened_hour = _utc_hour()
+        if self._size == 0:
+            self._writer.writerow(self.columns)
+            # Header counts towards the file size (rotation), not bytes_written
+            self._size = self._file.tell()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.flush()
+            if self.fsync != "never":
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        by_size = self.rotate_bytes and self._size >= self.rotate_bytes
+        by_hour = self.rotate_hourly and _utc_hour() != self._opened_hour
+        if not (by_size or by_hour):
+            return
+        self._close_file()
+        root, ext = os.path.splitext(self.path)
+        target = f"{root}-{self._opened_hour}{ext}"
+        n = 1
+        while os.path.exists(target):
+            target = f"{root}-{self._opened_hour}.{n}{ext}"
+            n += 1
+        os.rename(self.path, target)
+        self.rotations += 1
+
+def _utc_hour() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%d%H")